@@ -0,0 +1,38 @@
+"""
+Local Apibay stand-in for benchmarks: serves /q.php with an artificial latency.
+
+Run: FAKE_APIBAY_LATENCY=0.5 uvicorn fake_apibay:app --port 8090
+Results are deterministic per query and look like well-seeded English video releases,
+so media-requests' pickers always find a candidate. FAKE_APIBAY_JITTER / _ERROR_RATE /
+_ERROR_STATUS inject variance and failures (see fake_common.py).
+"""
+from __future__ import annotations
+
+import hashlib
+import os
+
+from fastapi import Depends, FastAPI
+
+from fake_common import Faults
+
+RESULTS = int(os.environ.get("FAKE_APIBAY_RESULTS", "20"))
+
+app = FastAPI(title="Fake Apibay")
+faults = Faults("FAKE_APIBAY", latency=0.5)
+
+
+def _fake_torrent(query: str, cat: int, i: int) -> dict:
+    info_hash = hashlib.sha1(f"{query}|{cat}|{i}".encode()).hexdigest().upper()
+    return {
+        "id": str(100000 + i),
+        "name": f"{query} 720p English x264 {i}",
+        "info_hash": info_hash,
+        "size": str((1 + i % 8) * 1024**3),
+        "seeders": str(5 + i),
+        "leechers": str(i),
+    }
+
+
+@app.get("/q.php", dependencies=[Depends(faults)])
+async def q(q: str = "", cat: int = 0):
+    return [_fake_torrent(q, cat, i) for i in range(RESULTS)]
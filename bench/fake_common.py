@@ -0,0 +1,31 @@
+"""
+Latency and error injection shared by the fake upstream servers.
+
+Each fake reads <PREFIX>_LATENCY (seconds), <PREFIX>_JITTER (± seconds, uniform),
+<PREFIX>_ERROR_RATE (0..1) and <PREFIX>_ERROR_STATUS (default 503) from the environment,
+e.g. FAKE_QBIT_ERROR_RATE=0.1 makes one qBittorrent call in ten fail.
+"""
+from __future__ import annotations
+
+import asyncio
+import os
+import random
+
+from fastapi import HTTPException
+
+
+class Faults:
+    """FastAPI dependency that delays each request and fails a fraction of them."""
+
+    def __init__(self, prefix: str, latency: float = 0.0):
+        self.latency = float(os.environ.get(f"{prefix}_LATENCY", str(latency)))
+        self.jitter = float(os.environ.get(f"{prefix}_JITTER", "0"))
+        self.error_rate = float(os.environ.get(f"{prefix}_ERROR_RATE", "0"))
+        self.error_status = int(os.environ.get(f"{prefix}_ERROR_STATUS", "503"))
+
+    async def __call__(self) -> None:
+        delay = self.latency + random.uniform(-self.jitter, self.jitter) if self.jitter else self.latency
+        if delay > 0:
+            await asyncio.sleep(delay)
+        if self.error_rate and random.random() < self.error_rate:
+            raise HTTPException(status_code=self.error_status, detail="injected failure")
@@ -0,0 +1,113 @@
+"""
+Local music-requests backend stand-in for benchmarks: the /api/* routes music-requests-chat calls.
+
+Run: FAKE_MUSIC_LATENCY=0.2 uvicorn fake_music_backend:app --port 8092
+Then point music-requests-chat at it with MUSIC_REQUESTS_BACKEND_URL=http://127.0.0.1:8092.
+Any non-empty username/password is accepted. Artist search echoes the query as the top
+result; FAKE_MUSIC_TPB_EMPTY_RATE (default 0.2) of TPB searches return no seeded torrents so
+the YouTube fallback is exercised. FAKE_MUSIC_JITTER / _ERROR_RATE / _ERROR_STATUS inject
+variance and failures (see fake_common.py).
+"""
+from __future__ import annotations
+
+import base64
+import hashlib
+import os
+import uuid
+
+from fastapi import Depends, FastAPI, HTTPException, Request
+
+from fake_common import Faults
+
+TPB_EMPTY_RATE = float(os.environ.get("FAKE_MUSIC_TPB_EMPTY_RATE", "0.2"))
+ALBUMS_PER_ARTIST = int(os.environ.get("FAKE_MUSIC_ALBUMS", "40"))
+
+app = FastAPI(title="Fake music-requests backend")
+faults = Faults("FAKE_MUSIC", latency=0.2)
+
+
+def _require_auth(request: Request) -> None:
+    header = request.headers.get("authorization", "")
+    try:
+        user, _, password = base64.b64decode(header.removeprefix("Basic ")).decode().partition(":")
+    except Exception:
+        user = password = ""
+    if not user or not password:
+        raise HTTPException(status_code=401, detail="Unauthorized")
+
+
+def _digest(*parts: str) -> str:
+    return hashlib.sha1("|".join(parts).encode()).hexdigest()
+
+
+def _fraction(*parts: str) -> float:
+    """Deterministic 0..1 value per input, so repeated searches give the same answer."""
+    return int(_digest(*parts)[:8], 16) / 0xFFFFFFFF
+
+
+@app.post("/api/login", dependencies=[Depends(faults)])
+async def login(request: Request):
+    body = await request.json()
+    if not body.get("username") or not body.get("password"):
+        raise HTTPException(status_code=401, detail="Invalid credentials")
+    return {"ok": True}
+
+
+@app.get("/api/artists", dependencies=[Depends(_require_auth), Depends(faults)])
+async def artists(q: str = "", source: str = ""):
+    name = q.strip().title()
+    others = [f"{name} Tribute Band", f"The {name} Experience", f"{name} & Friends"]
+    return {"artists": [{"id": _digest("artist", n)[:12], "name": n, "image": None} for n in [name, *others]]}
+
+
+@app.get("/api/albums/{artist_id}", dependencies=[Depends(_require_auth), Depends(faults)])
+async def albums(artist_id: str):
+    titles = [f"Album {i}" for i in range(1, ALBUMS_PER_ARTIST + 1)]
+    titles += [f"Album {i} (Deluxe Edition)" for i in range(1, 4)] + ["Greatest Hits", "Live at the Fillmore"]
+    return {"albums": [{"id": _digest(artist_id, t)[:12], "title": t, "image": None} for t in titles]}
+
+
+@app.get("/api/search-tpb", dependencies=[Depends(_require_auth), Depends(faults)])
+async def search_tpb(q: str = ""):
+    if _fraction("tpb", q) < TPB_EMPTY_RATE:
+        return {"results": [{"name": f"{q} FLAC", "seeders": 0, "size": 400 * 1024**2, "magnet": ""}]}
+    results = []
+    for i in range(8):
+        info_hash = _digest(q, str(i))
+        results.append({
+            "name": f"{q} [FLAC] {i}",
+            "seeders": 40 - i * 4,
+            "size": (300 + i * 50) * 1024**2,
+            "magnet": f"magnet:?xt=urn:btih:{info_hash}&dn={q.replace(' ', '+')}",
+        })
+    return {"results": results}
+
+
+@app.get("/api/search-youtube", dependencies=[Depends(_require_auth), Depends(faults)])
+async def search_youtube(q: str = "", mode: str = "", artist: str = "", album: str = ""):
+    vid = _digest("yt", q)[:11]
+    return {"results": [{"id": vid, "url": f"https://www.youtube.com/watch?v={vid}", "title": f"{artist} - {album} (Full Album)"}]}
+
+
+@app.get("/api/playlist-preview", dependencies=[Depends(_require_auth), Depends(faults)])
+async def playlist_preview(url: str = ""):
+    return {"title": "Fake Playlist", "suggested_artist": "Fake Artist", "suggested_album": "Fake Album", "tracks": 10}
+
+
+@app.get("/api/archive-preview", dependencies=[Depends(_require_auth), Depends(faults)])
+async def archive_preview(url: str = ""):
+    return {"title": "Fake Archive Item", "suggested_artist": "Fake Artist", "suggested_album": "Fake Album", "tracks": 12}
+
+
+@app.post("/api/add-torrent", dependencies=[Depends(_require_auth), Depends(faults)])
+async def add_torrent(request: Request):
+    body = await request.json()
+    if not body.get("magnet"):
+        raise HTTPException(status_code=400, detail="magnet required")
+    return {"ok": True}
+
+
+@app.post("/api/rip-youtube", dependencies=[Depends(_require_auth), Depends(faults)])
+async def rip_youtube(request: Request):
+    await request.json()
+    return {"ok": True, "job_id": uuid.uuid4().hex[:8]}
@@ -0,0 +1,159 @@
+"""
+Local qBittorrent WebUI stand-in for benchmarks: auth, torrents add/info/delete, sync/maindata.
+
+Run: FAKE_QBIT_LATENCY=0.05 uvicorn fake_qbittorrent:app --port 8091
+Then point media-requests at it with QBIT_HOST=127.0.0.1:8091 (any non-empty user/password
+logs in). Added torrents download linearly over FAKE_QBIT_DOWNLOAD_SECONDS and then seed.
+FAKE_QBIT_JITTER / _ERROR_RATE / _ERROR_STATUS inject variance and failures on the torrents
+endpoints (see fake_common.py); FAKE_QBIT_SESSION_TTL expires the SID cookie to exercise re-login.
+sync/maindata answers rid-based requests with per-field diffs against the session's previous
+response, like the real WebUI (torrents only; no categories/tags/server_state).
+"""
+from __future__ import annotations
+
+import hashlib
+import os
+import re
+import time
+import urllib.parse
+import uuid
+
+from fastapi import Depends, FastAPI, HTTPException, Request
+from fastapi.responses import PlainTextResponse
+
+from fake_common import Faults
+
+DOWNLOAD_SECONDS = float(os.environ.get("FAKE_QBIT_DOWNLOAD_SECONDS", "30"))
+SESSION_TTL = float(os.environ.get("FAKE_QBIT_SESSION_TTL", "3600"))
+TORRENT_SIZE = 2 * 1024**3
+
+app = FastAPI(title="Fake qBittorrent")
+faults = Faults("FAKE_QBIT", latency=0.05)
+_sessions: dict[str, float] = {}  # SID -> expiry
+_torrents: dict[str, dict] = {}  # hash -> torrent record
+_sync_state: dict[str, tuple[int, dict[str, dict]]] = {}  # SID -> (rid, torrents as last sent)
+_BTIH_RE = re.compile(r"xt=urn:btih:([0-9a-fA-F]{40})")
+_MULTIPART_FIELD_RE = re.compile(rb'name="([^"]+)"\r\n(?:[^\r\n]+\r\n)*\r\n(.*?)\r\n--', re.S)
+
+
+async def _form(request: Request) -> dict[str, str]:
+    """Parse urlencoded or multipart form bodies without python-multipart."""
+    body = await request.body()
+    if request.headers.get("content-type", "").startswith("multipart/"):
+        return {k.decode(): v.decode(errors="replace") for k, v in _MULTIPART_FIELD_RE.findall(body)}
+    return {k: v[-1] for k, v in urllib.parse.parse_qs(body.decode(), keep_blank_values=True).items()}
+
+
+def _require_session(request: Request) -> None:
+    expiry = _sessions.get(request.cookies.get("SID", ""))
+    if expiry is None or expiry < time.time():
+        raise HTTPException(status_code=403, detail="Forbidden")
+
+
+def _snapshot(t: dict) -> dict:
+    progress = min(1.0, (time.time() - t["added_on"]) / DOWNLOAD_SECONDS) if DOWNLOAD_SECONDS > 0 else 1.0
+    done = progress >= 1.0
+    return {
+        **t,
+        "progress": round(progress, 4),
+        "downloaded": int(t["size"] * progress),
+        "amount_left": int(t["size"] * (1 - progress)),
+        "dlspeed": 0 if done else int(t["size"] / DOWNLOAD_SECONDS),
+        "eta": 8640000 if done else int(DOWNLOAD_SECONDS * (1 - progress)),
+        "state": "uploading" if done else "downloading",
+        "completion_on": int(t["added_on"] + DOWNLOAD_SECONDS) if done else -1,
+    }
+
+
+@app.post("/api/v2/auth/login")
+async def login(request: Request):
+    form = await _form(request)
+    if not form.get("username") or not form.get("password"):
+        return PlainTextResponse("Fails.")
+    sid = uuid.uuid4().hex
+    _sessions[sid] = time.time() + SESSION_TTL
+    response = PlainTextResponse("Ok.")
+    response.set_cookie("SID", sid, httponly=True)
+    return response
+
+
+@app.post("/api/v2/auth/logout")
+async def logout(request: Request):
+    _sessions.pop(request.cookies.get("SID", ""), None)
+    return PlainTextResponse("")
+
+
+@app.get("/api/v2/app/version")
+async def version():
+    return PlainTextResponse("v4.6.5")
+
+
+@app.get("/api/v2/app/webapiVersion")
+async def webapi_version():
+    return PlainTextResponse("2.9.3")
+
+
+@app.post("/api/v2/torrents/add", dependencies=[Depends(_require_session), Depends(faults)])
+async def torrents_add(request: Request):
+    form = await _form(request)
+    urls = [u.strip() for u in re.split(r"[\n|]", form.get("urls", "")) if u.strip()]
+    if not urls:
+        return PlainTextResponse("Fails.")
+    now = time.time()
+    for url in urls:
+        m = _BTIH_RE.search(url)
+        info_hash = (m.group(1) if m else hashlib.sha1(url.encode()).hexdigest()).lower()
+        dn = urllib.parse.parse_qs(urllib.parse.urlsplit(url).query).get("dn", [info_hash])[0]
+        _torrents.setdefault(info_hash, {
+            "hash": info_hash,
+            "name": dn,
+            "category": form.get("category", ""),
+            "save_path": form.get("savepath", ""),
+            "size": TORRENT_SIZE,
+            "added_on": now,
+        })
+    return PlainTextResponse("Ok.")
+
+
+@app.api_route("/api/v2/torrents/info", methods=["GET", "POST"], dependencies=[Depends(_require_session), Depends(faults)])
+async def torrents_info(request: Request):
+    params = {**request.query_params, **(await _form(request) if request.method == "POST" else {})}
+    category, hashes = params.get("category"), params.get("hashes")
+    wanted = set(hashes.lower().split("|")) if hashes else None
+    return [
+        _snapshot(t)
+        for t in _torrents.values()
+        if (category is None or t["category"] == category) and (wanted is None or t["hash"] in wanted)
+    ]
+
+
+@app.api_route("/api/v2/sync/maindata", methods=["GET", "POST"], dependencies=[Depends(_require_session), Depends(faults)])
+async def sync_maindata(request: Request):
+    params = {**request.query_params, **(await _form(request) if request.method == "POST" else {})}
+    rid = int(params.get("rid") or 0)
+    sid = request.cookies.get("SID", "")
+    last_rid, last = _sync_state.get(sid, (0, {}))
+    current = {h: {k: v for k, v in _snapshot(t).items() if k != "hash"} for h, t in _torrents.items()}
+    new_rid = last_rid + 1
+    _sync_state[sid] = (new_rid, current)
+    if rid == 0 or rid != last_rid:
+        return {"rid": new_rid, "full_update": True, "torrents": current}
+    changed = {}
+    for h, fields in current.items():
+        diff = {k: v for k, v in fields.items() if last.get(h, {}).get(k) != v}
+        if diff:
+            changed[h] = diff
+    body = {"rid": new_rid, "torrents": changed}
+    removed = [h for h in last if h not in current]
+    if removed:
+        body["torrents_removed"] = removed
+    return body
+
+
+@app.post("/api/v2/torrents/delete", dependencies=[Depends(_require_session), Depends(faults)])
+async def torrents_delete(request: Request):
+    form = await _form(request)
+    hashes = form.get("hashes", "")
+    for h in (list(_torrents) if hashes == "all" else hashes.lower().split("|")):
+        _torrents.pop(h, None)
+    return PlainTextResponse("")
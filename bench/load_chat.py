@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+"""
+Load test for media-requests and music-requests-chat against local stand-ins for Apibay,
+qBittorrent and the music backend (fake_apibay.py, fake_qbittorrent.py, fake_music_backend.py).
+
+Starts the fakes and the apps under uvicorn on free local ports, registers/logs in --users
+virtual users per app, then has each one replay scripted conversations back to back for
+--duration seconds:
+
+  media-requests:       movie search -> yes | season search -> no | multi-season batch -> yes | list requests
+  music-requests-chat:  album by artist -> add 1 | search artist | pasted artist list | streamed album request
+
+Reports, per route and conversation step, the request count, errors, throughput and
+p50/p95/p99 latency. Upstream latency and failure rates are set with the flags below (or any
+FAKE_* variable from fake_common.py in the environment).
+
+Usage:
+  python bench/load_chat.py                                     # both apps, 20 users each, 60 s
+  python bench/load_chat.py --apps music --users 50 --duration 30
+  python bench/load_chat.py --apibay-latency 1.0 --error-rate 0.05
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+
+from harness import BENCH_DIR, REPO_DIR, free_port, percentile, start_uvicorn, stop_all, wait_for_port
+
+MOVIES = ["The Matrix", "Inception", "Blade Runner 2049", "Heat", "Alien", "Arrival", "Dune", "Drive", "Up", "Her"]
+SHOWS = ["Breaking Bad", "The Wire", "Lost", "Fargo", "Dark", "Succession", "The Office", "Severance"]
+ARTISTS = ["Pink Floyd", "Radiohead", "Bjork", "Portishead", "Talk Talk", "Boards of Canada", "Low", "Can", "Slowdive", "Beyonce"]
+PASSWORD = "bench-password"
+
+
+class Recorder:
+    """Latencies and error counts per label ("app METHOD /path [step]")."""
+
+    def __init__(self):
+        self.latencies: dict[str, list[float]] = {}
+        self.errors: dict[str, int] = {}
+
+    async def call(self, label: str, coro):
+        start = time.perf_counter()
+        try:
+            r = await coro
+        except httpx.HTTPError:
+            self.errors[label] = self.errors.get(label, 0) + 1
+            self.latencies.setdefault(label, []).append(time.perf_counter() - start)
+            return None
+        self.latencies.setdefault(label, []).append(time.perf_counter() - start)
+        if r.status_code >= 400:
+            self.errors[label] = self.errors.get(label, 0) + 1
+        return r
+
+    def report(self, elapsed: float) -> None:
+        print(f"{'route':<52} {'reqs':>6} {'errs':>5} {'req/s':>7} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+        total = 0
+        for label in sorted(self.latencies):
+            lat = self.latencies[label]
+            total += len(lat)
+            print(
+                f"{label:<52} {len(lat):>6} {self.errors.get(label, 0):>5} {len(lat) / elapsed:>7.1f} "
+                f"{percentile(lat, 50) * 1000:>8.0f} {percentile(lat, 95) * 1000:>8.0f} {percentile(lat, 99) * 1000:>8.0f}"
+            )
+        print(f"{'total':<52} {total:>6} {sum(self.errors.values()):>5} {total / elapsed:>7.1f}")
+
+
+def _reply(r: httpx.Response | None) -> str:
+    try:
+        return (r.json().get("reply") or "") if r is not None and r.status_code == 200 else ""
+    except ValueError:
+        return ""
+
+
+# --- media-requests ---
+
+
+async def _media_setup(client: httpx.AsyncClient, users: int) -> list[str]:
+    """Register bench0 with the first invite, mint one invite per virtual user, register them all."""
+    r = await client.post("/api/register", json={"invite_code": "bench", "username": "bench0", "password": PASSWORD})
+    r.raise_for_status()
+    admin = {"Authorization": f"Bearer {r.json()['token']}"}
+    names = []
+    for i in range(1, users + 1):
+        code = f"bench-{i}"
+        (await client.post("/api/admin/invite", json={"code": code}, headers=admin)).raise_for_status()
+        r = await client.post("/api/register", json={"invite_code": code, "username": f"bench{i}", "password": PASSWORD})
+        r.raise_for_status()
+        names.append(f"bench{i}")
+    return names
+
+
+async def _media_user(client: httpx.AsyncClient, rec: Recorder, username: str, deadline: float) -> None:
+    r = await rec.call("media POST /api/login", client.post("/api/login", json={"username": username, "password": PASSWORD}))
+    if r is None or r.status_code != 200:
+        return
+    headers = {"Authorization": f"Bearer {r.json()['token']}"}
+
+    async def chat(step: str, message: str) -> str:
+        r = await rec.call(f"media POST /api/chat [{step}]", client.post("/api/chat", json={"message": message}, headers=headers))
+        return _reply(r)
+
+    while time.monotonic() < deadline:
+        script = random.random()
+        if script < 0.4:
+            if "Does that look like the right one" in await chat("movie search", f"Add {random.choice(MOVIES)}"):
+                await chat("confirm", "yes")
+        elif script < 0.7:
+            if "Does that look like the right one" in await chat("season search", f"I want {random.choice(SHOWS)} season {random.randint(1, 5)}"):
+                await chat("reject", "no")
+        elif script < 0.9:
+            first = random.randint(1, 3)
+            if "Do these look right" in await chat("season batch", f"{random.choice(SHOWS)} seasons {first}-{first + 2}"):
+                await chat("confirm", "yes")
+        else:
+            await rec.call("media GET /api/requests", client.get("/api/requests", headers=headers))
+
+
+# --- music-requests-chat ---
+
+
+async def _music_user(client: httpx.AsyncClient, rec: Recorder, user_id: int, deadline: float) -> None:
+    r = await rec.call("music POST /api/login", client.post("/api/login", json={"username": f"bench{user_id}", "password": PASSWORD}))
+    if r is None or r.status_code != 200:
+        return
+
+    async def chat(step: str, message: str) -> str:
+        return _reply(await rec.call(f"music POST /api/chat [{step}]", client.post("/api/chat", json={"message": message})))
+
+    async def stream(step: str, message: str) -> None:
+        async def consume():
+            async with client.stream("POST", "/api/chat/stream", json={"message": message}) as resp:
+                async for line in resp.aiter_lines():
+                    if line and json.loads(line).get("type") in ("reply", "error"):
+                        break
+                return resp
+
+        await rec.call(f"music POST /api/chat/stream [{step}]", consume())
+
+    while time.monotonic() < deadline:
+        script = random.random()
+        if script < 0.45:
+            reply = await chat("album request", f"Add Album {random.randint(1, 12)} by {random.choice(ARTISTS)}")
+            if "add 1" in reply:
+                await chat("add torrent", "add 1")
+            elif "Reply **rip**" in reply:
+                await chat("rip", "rip")
+        elif script < 0.65:
+            await chat("search artist", f"Search artist {random.choice(ARTISTS)}")
+        elif script < 0.8:
+            await chat("artist list", "\n".join(random.sample(ARTISTS, 5)))
+        else:
+            await stream("album request", f"Add Album {random.randint(1, 12)} by {random.choice(ARTISTS)}")
+
+
+# --- main ---
+
+
+async def _run(apps: list[str], media_url: str, music_url: str, users: int, duration: float) -> tuple[Recorder, float]:
+    """Set up users, run the load, return the recorder and the seconds of load (setup excluded)."""
+    rec = Recorder()
+    limits = httpx.Limits(max_connections=users * 2, max_keepalive_connections=users * 2)
+    tasks = []
+    clients = []
+    if "media" in apps:
+        media = httpx.AsyncClient(base_url=media_url, timeout=120.0, limits=limits)
+        clients.append(media)
+        names = await _media_setup(media, users)
+    start = time.monotonic()
+    deadline = start + duration
+    if "media" in apps:
+        tasks += [_media_user(media, rec, name, deadline) for name in names]
+    if "music" in apps:
+        for uid in range(1, users + 1):
+            # One client per user: music-requests-chat keeps the session in a cookie.
+            client = httpx.AsyncClient(base_url=music_url, timeout=120.0, limits=limits)
+            clients.append(client)
+            tasks.append(_music_user(client, rec, uid, deadline))
+    try:
+        await asyncio.gather(*tasks)
+    finally:
+        for client in clients:
+            await client.aclose()
+    return rec, time.monotonic() - start
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Replay chat conversations against both chat services.")
+    parser.add_argument("--apps", default="media,music", help="Comma-separated: media, music")
+    parser.add_argument("--users", type=int, default=20, help="Concurrent virtual users per app")
+    parser.add_argument("--duration", type=float, default=60.0, help="Seconds of load after setup")
+    parser.add_argument("--apibay-latency", type=float, default=0.5)
+    parser.add_argument("--qbit-latency", type=float, default=0.05)
+    parser.add_argument("--backend-latency", type=float, default=0.2, help="Fake music backend latency")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Injected failure rate for every fake upstream")
+    parser.add_argument("--bcrypt-rounds", type=int, default=None, help="Override MEDIA_REQUESTS_BCRYPT_ROUNDS")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    apps = [a.strip() for a in args.apps.split(",") if a.strip()]
+    random.seed(args.seed)
+
+    ports = {name: free_port() for name in ("apibay", "qbit", "backend", "media", "music")}
+    errors = str(args.error_rate)
+    procs = []
+    with tempfile.TemporaryDirectory() as tmp:
+        try:
+            if "media" in apps:
+                media_env = {
+                    "APIBAY_BASE": f"http://127.0.0.1:{ports['apibay']}",
+                    "QBIT_HOST": f"127.0.0.1:{ports['qbit']}",
+                    "QBIT_USER": "bench",
+                    "QBIT_PASS": "bench",
+                    "MEDIA_REQUESTS_DB": str(Path(tmp) / "media.db"),
+                    "MEDIA_REQUESTS_JWT_SECRET": "bench-secret",
+                    "MEDIA_REQUESTS_FIRST_INVITE": "bench",
+                }
+                if args.bcrypt_rounds:
+                    media_env["MEDIA_REQUESTS_BCRYPT_ROUNDS"] = str(args.bcrypt_rounds)
+                procs += [
+                    start_uvicorn("fake_apibay:app", BENCH_DIR, ports["apibay"], {"FAKE_APIBAY_LATENCY": str(args.apibay_latency), "FAKE_APIBAY_ERROR_RATE": errors}),
+                    start_uvicorn("fake_qbittorrent:app", BENCH_DIR, ports["qbit"], {"FAKE_QBIT_LATENCY": str(args.qbit_latency), "FAKE_QBIT_ERROR_RATE": errors}),
+                    start_uvicorn("main:app", REPO_DIR / "media-requests", ports["media"], media_env),
+                ]
+            if "music" in apps:
+                procs += [
+                    start_uvicorn("fake_music_backend:app", BENCH_DIR, ports["backend"], {"FAKE_MUSIC_LATENCY": str(args.backend_latency), "FAKE_MUSIC_ERROR_RATE": errors}),
+                    start_uvicorn(
+                        "main:app",
+                        REPO_DIR / "music-requests-chat",
+                        ports["music"],
+                        {"MUSIC_REQUESTS_BACKEND_URL": f"http://127.0.0.1:{ports['backend']}", "MUSIC_CHAT_SESSION_DB": str(Path(tmp) / "sessions.db")},
+                    ),
+                ]
+            wanted = {"media": ("apibay", "qbit", "media"), "music": ("backend", "music")}
+            for name in {p for a in apps for p in wanted[a]}:
+                wait_for_port(ports[name])
+            print(
+                f"{args.users} user(s) per app for {args.duration:.0f}s; latency apibay {args.apibay_latency:.2f}s, "
+                f"qbit {args.qbit_latency:.2f}s, backend {args.backend_latency:.2f}s; error rate {args.error_rate:.0%}"
+            )
+            rec, elapsed = asyncio.run(
+                _run(apps, f"http://127.0.0.1:{ports['media']}", f"http://127.0.0.1:{ports['music']}", args.users, args.duration)
+            )
+            rec.report(elapsed)
+        finally:
+            stop_all(procs)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Concurrency benchmark for media-requests /api/chat against the local Apibay stand-in.
+
+Starts fake_apibay and media-requests under uvicorn on free local ports, then for each
+concurrency level runs N simulated users that each send a few search messages (answering
+"no" in between so nothing is queued for qBittorrent). Prints p50/p95/p99 chat latency per
+level; with a non-blocking Apibay path p99 should stay close to the stand-in latency.
+
+Usage:
+  python bench/media_requests_chat.py                     # levels 1,5,10,25,50
+  python bench/media_requests_chat.py --levels 1,100 --apibay-latency 1.0
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+
+from harness import BENCH_DIR, REPO_DIR, free_port, percentile, start_uvicorn, stop_all, wait_for_port
+
+APP_DIR = REPO_DIR / "media-requests"
+JWT_SECRET = "bench-secret"
+PASSWORD = "bench-password"
+
+
+async def _register(base_url: str, users: int) -> list[str]:
+    """Register bench0 with the first invite, then mint an invite for and register each bench user.
+    Returns one token per user (tokens must belong to real users: get_current_user checks the DB)."""
+    async with httpx.AsyncClient(base_url=base_url, timeout=60.0) as client:
+        r = await client.post("/api/register", json={"invite_code": "bench", "username": "bench0", "password": PASSWORD})
+        r.raise_for_status()
+        admin = {"Authorization": f"Bearer {r.json()['token']}"}
+        tokens = []
+        for i in range(1, users + 1):
+            (await client.post("/api/admin/invite", json={"code": f"bench-{i}"}, headers=admin)).raise_for_status()
+            r = await client.post("/api/register", json={"invite_code": f"bench-{i}", "username": f"bench{i}", "password": PASSWORD})
+            r.raise_for_status()
+            tokens.append(r.json()["token"])
+    return tokens
+
+
+async def _user(client: httpx.AsyncClient, user_id: int, token: str, messages: int, latencies: list[float]) -> None:
+    headers = {"Authorization": f"Bearer {token}"}
+    for i in range(messages):
+        start = time.perf_counter()
+        r = await client.post("/api/chat", json={"message": f"Add Bench Movie {user_id}-{i}"}, headers=headers)
+        latencies.append(time.perf_counter() - start)
+        r.raise_for_status()
+        await client.post("/api/chat", json={"message": "no"}, headers=headers)
+
+
+async def _run_level(base_url: str, tokens: list[str], messages: int) -> list[float]:
+    latencies: list[float] = []
+    limits = httpx.Limits(max_connections=len(tokens), max_keepalive_connections=len(tokens))
+    async with httpx.AsyncClient(base_url=base_url, timeout=120.0, limits=limits) as client:
+        await asyncio.gather(*(_user(client, uid, token, messages, latencies) for uid, token in enumerate(tokens, 1)))
+    return latencies
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark media-requests chat latency under concurrency.")
+    parser.add_argument("--levels", default="1,5,10,25,50", help="Comma-separated concurrent user counts")
+    parser.add_argument("--messages", type=int, default=5, help="Search messages per user per level")
+    parser.add_argument("--apibay-latency", type=float, default=0.5, help="Stand-in Apibay latency in seconds")
+    args = parser.parse_args()
+    levels = [int(x) for x in args.levels.split(",") if x.strip()]
+
+    apibay_port, app_port = free_port(), free_port()
+    with tempfile.TemporaryDirectory() as tmp:
+        procs = [
+            start_uvicorn("fake_apibay:app", BENCH_DIR, apibay_port, {"FAKE_APIBAY_LATENCY": str(args.apibay_latency)}),
+            start_uvicorn(
+                "main:app",
+                APP_DIR,
+                app_port,
+                {
+                    "APIBAY_BASE": f"http://127.0.0.1:{apibay_port}",
+                    "MEDIA_REQUESTS_DB": str(Path(tmp) / "bench.db"),
+                    "MEDIA_REQUESTS_JWT_SECRET": JWT_SECRET,
+                    "MEDIA_REQUESTS_FIRST_INVITE": "bench",
+                    "MEDIA_REQUESTS_BCRYPT_ROUNDS": "4",  # registration is setup, not what is measured
+                },
+            ),
+        ]
+        try:
+            wait_for_port(apibay_port)
+            wait_for_port(app_port)
+            base_url = f"http://127.0.0.1:{app_port}"
+            tokens = asyncio.run(_register(base_url, max(levels)))
+            print(f"Apibay stand-in latency: {args.apibay_latency:.2f}s, {args.messages} message(s) per user")
+            print(f"{'users':>6} {'reqs':>6} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+            for users in levels:
+                lat = asyncio.run(_run_level(base_url, tokens[:users], args.messages))
+                print(
+                    f"{users:>6} {len(lat):>6} {percentile(lat, 50) * 1000:>9.0f} "
+                    f"{percentile(lat, 95) * 1000:>9.0f} {percentile(lat, 99) * 1000:>9.0f}"
+                )
+        finally:
+            stop_all(procs)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark for media-requests token checks: full jwt.decode (signature + claims)
+versus the verified-token cache used by get_current_user on repeat requests.
+
+Usage:
+  python bench/token_cache.py [--iterations 20000]
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+import tempfile
+import timeit
+from pathlib import Path
+
+APP_DIR = Path(__file__).resolve().parent.parent / "media-requests"
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Compare uncached vs cached JWT verification.")
+    parser.add_argument("--iterations", type=int, default=20000)
+    args = parser.parse_args()
+    n = args.iterations
+
+    os.environ.setdefault("MEDIA_REQUESTS_DB", str(Path(tempfile.gettempdir()) / "media-requests-bench.db"))
+    sys.path[:0] = [str(APP_DIR), str(APP_DIR.parent)]
+    import main as app  # noqa: E402  (needs the env above)
+
+    token = app._create_jwt(1, "bench")
+    uncached = timeit.timeit(lambda: app._decode_jwt(token), number=n) / n
+    app._verify_token_cached(token)  # first sight: verifies and fills the cache
+    cached = timeit.timeit(lambda: app._verify_token_cached(token), number=n) / n
+
+    print(f"jwt.decode per request:   {uncached * 1e6:8.1f} µs")
+    print(f"cached check per request: {cached * 1e6:8.1f} µs")
+    print(f"saving per request:       {(uncached - cached) * 1e6:8.1f} µs ({uncached / cached:.0f}x)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
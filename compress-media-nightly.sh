@@ -5,6 +5,7 @@
 # continues with the next if before 7am. In-progress conversions run to completion
 # even past 7am. Lock prevents multiple instances.
 #
+SCRIPT_DIR="$(cd "$(dirname "$0")" && pwd)"
 MEDIA_BASE="${MEDIA_BASE:-/mnt/media-storage}"
 MOVIES_DIR="${MOVIES_DIR:-$MEDIA_BASE/movies}"
 TV_DIR="${TV_DIR:-$MEDIA_BASE/tvshows}"
@@ -13,8 +14,13 @@ TEMP_DIR="${TEMP_DIR:-$MEDIA_BASE/.compress-temp}"
 BACKUP_DIR="${BACKUP_DIR:-$MEDIA_BASE/.compress-backup}"
 LOG="${LOG:-/var/log/compress-media-nightly.log}"
 LOCK_FILE="${LOCK_FILE:-/var/run/compress-media-nightly.lock}"
-# Shared with replace-movie-with-smaller: paths listed here are "in use" and must not be picked by the other script.
-CLAIMED_FILE="${MEDIA_STACK_CLAIMED_FILE:-/var/run/media-stack-claimed.txt}"
+# media_inventory.py and media_claims.py only need the standard library; their databases are
+# MEDIA_INVENTORY_DB and MEDIA_STACK_CLAIMS_DB.
+INVENTORY_PYTHON="${INVENTORY_PYTHON:-python3}"
+# Shared with replace-movie-with-smaller: claimed paths are "in use" and must not be picked by the other script.
+# Claims are tied to this script's PID, so a crashed run's claim is reaped; the TTL only bounds a hung one.
+CLAIMS=("$INVENTORY_PYTHON" "$SCRIPT_DIR/media_claims.py")
+CLAIM_TTL="${CLAIM_TTL:-86400}"
 START_HOUR=3
 END_HOUR=7
 VIDEO_CRF="${VIDEO_CRF:-23}"
@@ -44,34 +50,23 @@ if [[ "$run_one" -ne 1 ]]; then
     fi
 fi
 
-find_videos() {
-    find "$1" -type f \( -iname "*.mkv" -o -iname "*.mp4" -o -iname "*.avi" -o -iname "*.m4v" -o -iname "*.mov" \) \
-        2>/dev/null | while read -r f; do
-        size=$(stat -c%s "$f" 2>/dev/null || echo 0)
-        echo "$size $f"
-    done | sort -rn
-}
-
-# Pick largest file >= MIN_SIZE_GB. Pass paths to exclude (e.g. previously failed this run).
+# Largest video >= MIN_SIZE_GB from the shared media inventory (media_inventory.py), refreshed
+# incrementally first so only movie/season directories whose mtime changed are re-listed.
+# Claimed paths are skipped; pass further paths to exclude (e.g. previously failed this run).
 pick_largest() {
     local min_bytes=$((MIN_SIZE_GB * 1024 * 1024 * 1024))
-    local candidates=""
-    local exclude=("$@")
+    local args=(largest -n 1 --min-size "$min_bytes" --refresh)
+    local ex dir roots=()
+    for ex in "$@"; do
+        [[ -n "$ex" ]] && args+=(--exclude "$ex")
+    done
+    # Resolved roots, so paths match the resolved ones replace-movie-with-smaller claims
     for dir in "$MOVIES_DIR" "$TV_DIR"; do
-        [[ -d "$dir" ]] || continue
-        while read -r size path; do
-            [[ "$size" -ge "$min_bytes" ]] || break
-            [[ "$path" == *".compress-backup"* ]] && continue
-            [[ "$path" == *".compress-temp"* ]] && continue
-            local skip=0
-            for ex in "${exclude[@]}"; do
-                [[ -n "$ex" && "$path" == "$ex" ]] && { skip=1; break; }
-            done
-            [[ $skip -eq 1 ]] && continue
-            candidates+="$size $path"$'\n'
-        done < <(find_videos "$dir")
+        [[ -d "$dir" ]] && roots+=("$(realpath "$dir")")
     done
-    echo "$candidates" | sort -rn | head -1
+    [[ ${#roots[@]} -gt 0 ]] || return 0
+    "$INVENTORY_PYTHON" "$SCRIPT_DIR/media_inventory.py" "${args[@]}" \
+        --exclude-file <("${CLAIMS[@]}" list 2>>"$LOG") "${roots[@]}" 2>>"$LOG"
 }
 
 get_duration() {
@@ -180,15 +175,11 @@ log "=== compress-media-nightly started ==="
 conversions_done=0
 failed_paths=()
 while [[ "$run_one" -ne 1 ]] && in_window || { [[ "$run_one" -eq 1 ]] && [[ "$conversions_done" -lt 1 ]]; }; do
-    # Exclude paths claimed by replace-movie-with-smaller (or a previous compress run)
-    claimed_paths=()
-    if [[ -f "$CLAIMED_FILE" ]]; then
-        while IFS= read -r p; do [[ -n "$p" ]] && claimed_paths+=("$p"); done < "$CLAIMED_FILE"
-    fi
     if [[ -n "${CONVERT_THIS_FILE:-}" && -f "${CONVERT_THIS_FILE:-}" ]]; then
         candidate="$(stat -c%s "$CONVERT_THIS_FILE") $CONVERT_THIS_FILE"
     else
-        candidate=$(pick_largest "${failed_paths[@]}" "${claimed_paths[@]}")
+        # Skips paths claimed by replace-movie-with-smaller (claims of crashed runs are reaped)
+        candidate=$(pick_largest "${failed_paths[@]}")
     fi
     if [[ -z "$candidate" ]]; then
         if [[ ${#failed_paths[@]} -gt 0 ]]; then
@@ -204,7 +195,15 @@ while [[ "$run_one" -ne 1 ]] && in_window || { [[ "$run_one" -eq 1 ]] && [[ "$co
     log "Next candidate: $path (${size_gb} GB)"
 
     # Claim this path so replace-movie-with-smaller won't pick it
-    echo "$path" >> "$CLAIMED_FILE"
+    if ! "${CLAIMS[@]}" claim --owner compress-media-nightly --pid $$ --ttl "$CLAIM_TTL" "$path" 2>>"$LOG"; then
+        if [[ -n "${CONVERT_THIS_FILE:-}" ]]; then
+            log "Requested file is claimed by another job; exiting."
+            break
+        fi
+        log "Claimed by another job meanwhile; trying the next largest."
+        failed_paths+=("$path")
+        continue
+    fi
     if compress_file "$path"; then
         ((conversions_done++)) || true
     else
@@ -216,7 +215,7 @@ while [[ "$run_one" -ne 1 ]] && in_window || { [[ "$run_one" -eq 1 ]] && [[ "$co
         log "Skipping this file for rest of run; will try next largest."
     fi
     # Release claim so other script can pick this path in future
-    [[ -f "$CLAIMED_FILE" ]] && grep -v -Fx "$path" "$CLAIMED_FILE" > "$CLAIMED_FILE.tmp" && mv "$CLAIMED_FILE.tmp" "$CLAIMED_FILE"
+    "${CLAIMS[@]}" release --pid $$ "$path" 2>>"$LOG" || log "Warning: could not release claim on $path"
 
     if [[ "$run_one" -eq 1 ]] || { [[ "$MAX_CONVERSIONS" -gt 0 ]] && [[ "$conversions_done" -ge "$MAX_CONVERSIONS" ]]; }; then
         log "One-shot run: stopping after ${conversions_done} conversion(s)."
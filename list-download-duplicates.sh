@@ -1,21 +1,18 @@
 #!/bin/bash
-# List files in downloads that duplicate library (same size + basename as in movies/tvshows).
+# List files in downloads that duplicate library (same size + basename as a video in movies/tvshows).
 # Usage: ./list-download-duplicates.sh [output_file]
 # Output: one line per duplicate: SIZE PATH (bytes and full path in downloads).
+# Sizes and names come from the shared media inventory (media_inventory.py), refreshed incrementally
+# first, so only directories changed since the last run are re-listed.
 set -e
-DUPLICATE_KEYS="${DUPLICATE_KEYS:-/tmp/duplicate_sizename.txt}"
+SCRIPT_DIR="$(cd "$(dirname "$0")" && pwd)"
+MEDIA_BASE="${MEDIA_BASE:-/mnt/media-storage}"
+MOVIES_DIR="${MOVIES_DIR:-$MEDIA_BASE/movies}"
+TV_DIR="${TV_DIR:-$MEDIA_BASE/tvshows}"
+DOWNLOADS_DIR="${DOWNLOADS_DIR:-$MEDIA_BASE/downloads}"
+INVENTORY_PYTHON="${INVENTORY_PYTHON:-python3}"
 OUT="${1:-/tmp/download_duplicate_paths.txt}"
-: > "$OUT"
-if [[ ! -f "$DUPLICATE_KEYS" ]]; then
-    echo "Run duplicate check first to create $DUPLICATE_KEYS" >&2
-    exit 1
-fi
-declare -A keys
-while IFS= read -r line; do keys["$line"]=1; done < "$DUPLICATE_KEYS"
-echo "Loaded ${#keys[@]} duplicate keys. Scanning downloads..." >&2
-while read -r size path; do
-    base=$(basename "$path")
-    [[ -n "${keys[$size $base]}" ]] && echo "$size $path" >> "$OUT"
-done < <(find /mnt/media-storage/downloads -type f \( -iname "*.mkv" -o -iname "*.mp4" -o -iname "*.avi" -o -iname "*.m4v" \) -printf "%s %p\n" 2>/dev/null)
+echo "Refreshing inventory and matching downloads against library..." >&2
+"$INVENTORY_PYTHON" "$SCRIPT_DIR/media_inventory.py" duplicates --refresh --of "$MOVIES_DIR" --of "$TV_DIR" "$DOWNLOADS_DIR" > "$OUT"
 echo "Wrote duplicate paths to $OUT" >&2
 wc -l "$OUT" >&2
@@ -5,22 +5,31 @@ Media Request Chat – request movies/TV via chat; Apibay search + qBittorrent.
 """
 from __future__ import annotations
 
+import asyncio
+import hashlib
+import json
 import os
+import queue
 import re
 import sqlite3
+import threading
 import time
 import urllib.parse
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from contextlib import asynccontextmanager
 from pathlib import Path
 
-import requests
-from fastapi import Depends, FastAPI, HTTPException
+import httpx
+from fastapi import Depends, FastAPI, HTTPException, Request
 from fastapi.responses import FileResponse, HTMLResponse
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from pydantic import BaseModel
 
+import metrics
+
 try:
     import qbittorrentapi
 except ImportError:
@@ -33,118 +42,401 @@ except ImportError:
 # --- Config ---
 BASE_DIR = Path(__file__).resolve().parent
 DB_PATH = Path(os.environ.get("MEDIA_REQUESTS_DB", str(BASE_DIR / "media_requests.db")))
+DB_POOL_SIZE = int(os.environ.get("MEDIA_REQUESTS_DB_POOL", "4"))
 JWT_SECRET = os.environ.get("MEDIA_REQUESTS_JWT_SECRET", "change-me-in-production")
 JWT_ALGORITHM = "HS256"
 JWT_EXPIRE_HOURS = 168  # 1 week
-APIBAY_BASE = "https://apibay.org"
+APIBAY_BASE = os.environ.get("APIBAY_BASE", "https://apibay.org").rstrip("/")
+APIBAY_TIMEOUT = float(os.environ.get("APIBAY_TIMEOUT", "15"))  # overall deadline per search (seconds)
+APIBAY_MAX_CONNECTIONS = int(os.environ.get("APIBAY_MAX_CONNECTIONS", "20"))
+APIBAY_CACHE_SIZE = int(os.environ.get("APIBAY_CACHE_SIZE", "512"))  # max cached (query, category) pairs
+APIBAY_CACHE_TTL = float(os.environ.get("APIBAY_CACHE_TTL", "600"))  # seconds a result is fresh
+APIBAY_CACHE_STALE = float(os.environ.get("APIBAY_CACHE_STALE", "3600"))  # seconds a result may be served stale while refreshing
 APIBAY_CAT_MOVIES = 207
 APIBAY_CAT_TV = 199
 QBIT_HOST = os.environ.get("QBIT_HOST", "localhost:5080")
 QBIT_USER = os.environ.get("QBIT_USER", "admin")
 QBIT_PASS = os.environ.get("QBIT_PASS", "admin123")
+QBIT_SAVE_PATH = "/downloads"
+QBIT_BATCH_WINDOW = float(os.environ.get("QBIT_BATCH_WINDOW", "0.25"))  # seconds to collect adds into one call
+# Confirmed requests are queued in the DB and sent to qBittorrent by a background dispatcher.
+DISPATCH_INTERVAL = 2.0  # seconds between queue polls (enqueueing wakes the dispatcher immediately)
+DISPATCH_BATCH = 50  # max requests claimed per poll
+DISPATCH_LEASE = 120.0  # seconds a claimed request is reserved before another worker may retry it
+DISPATCH_MAX_ATTEMPTS = int(os.environ.get("MEDIA_REQUESTS_DISPATCH_ATTEMPTS", "10"))
+DISPATCH_BACKOFF = 30.0  # first retry delay; doubles per attempt
+DISPATCH_BACKOFF_MAX = 1800.0
 PREFER_MOVIE_MAX_GB = 5.0
 MIN_SEEDERS = 1
 PREFER_SEEDERS = 5
+MAX_BATCH_SEASONS = 10  # most seasons accepted in one "seasons 1-5" request
 USER_AGENT = "MediaRequests/1.0 (https://requests.romptele.com)"
-
-pwd_ctx = CryptContext(schemes=["bcrypt"], deprecated="auto")
+BCRYPT_ROUNDS = int(os.environ.get("MEDIA_REQUESTS_BCRYPT_ROUNDS", "12"))
+HASH_WORKERS = int(os.environ.get("MEDIA_REQUESTS_HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+HASH_QUEUE_LIMIT = int(os.environ.get("MEDIA_REQUESTS_HASH_QUEUE", "32"))  # running + waiting hashes before 503
+# Where "found this torrent, confirm?" state lives: "memory" (single worker) or "sqlite" (shared by all workers).
+PENDING_BACKEND = os.environ.get("MEDIA_REQUESTS_PENDING_BACKEND", "memory").strip().lower()
+PENDING_TTL = float(os.environ.get("MEDIA_REQUESTS_PENDING_TTL", "1800"))  # seconds before an unanswered proposal expires
+PENDING_SWEEP_INTERVAL = 60.0
+TOKEN_CACHE_SIZE = int(os.environ.get("MEDIA_REQUESTS_TOKEN_CACHE", "1024"))  # verified JWTs kept in memory
+TOKEN_RECHECK = float(os.environ.get("MEDIA_REQUESTS_TOKEN_RECHECK", "60"))  # seconds a user's token_version is trusted before re-reading it
+
+pwd_ctx = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=BCRYPT_ROUNDS)
 security = HTTPBearer(auto_error=False)
-SESSION = requests.Session()
-SESSION.headers["User-Agent"] = USER_AGENT
-
-# In-memory: user_id -> { torrent dict, type "movie"|"tv" } for confirmation step
-_pending: dict[int, dict] = {}
-
-
-def _init_db() -> None:
-    with sqlite3.connect(DB_PATH) as conn:
-        conn.execute(
-            """CREATE TABLE IF NOT EXISTS users (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            username TEXT UNIQUE NOT NULL,
-            password_hash TEXT NOT NULL,
-            created_at REAL NOT NULL
-        )"""
-        )
-        conn.execute(
-            """CREATE TABLE IF NOT EXISTS invite_codes (
-            code TEXT PRIMARY KEY,
-            used_at REAL,
-            used_by_user_id INTEGER,
-            created_at REAL NOT NULL,
-            FOREIGN KEY (used_by_user_id) REFERENCES users(id)
-        )"""
-        )
-        cur = conn.execute("SELECT 1 FROM invite_codes LIMIT 1")
-        if not cur.fetchone():
-            conn.execute(
-                "INSERT INTO invite_codes (code, created_at) VALUES (?, ?)",
-                (os.environ.get("MEDIA_REQUESTS_FIRST_INVITE", "welcome"), time.time()),
-            )
-        conn.commit()
+# Shared async Apibay client (keep-alive pool); opened lazily, closed in lifespan.
+_apibay_client: httpx.AsyncClient | None = None
+
+
+# --- Database ---
+class _Database:
+    """
+    Small pool of SQLite connections (WAL mode, so readers don't wait on writers).
+    `run()` executes one unit of work in a single transaction on a worker thread; SQL
+    strings are module constants so each connection's statement cache reuses the
+    prepared statements.
+    """
+
+    def __init__(self, path: Path, size: int):
+        self.path = path
+        self.size = size
+        self._idle: queue.LifoQueue[sqlite3.Connection] = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=10, isolation_level=None, check_same_thread=False, cached_statements=64)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA foreign_keys=ON")
+        return conn
+
+    def _acquire(self) -> sqlite3.Connection:
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if self._created < self.size:
+                self._created += 1
+                create = True
+            else:
+                create = False
+        if create:
+            try:
+                return self._connect()
+            except Exception:
+                with self._lock:
+                    self._created -= 1
+                raise
+        return self._idle.get()
+
+    def execute(self, fn, *args, write: bool = False):
+        """Run fn(conn, *args) inside one transaction (BEGIN IMMEDIATE for writes) and return its result."""
+        conn = self._acquire()
+        try:
+            conn.execute("BEGIN IMMEDIATE" if write else "BEGIN")
+            try:
+                result = fn(conn, *args)
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+            return result
+        finally:
+            self._idle.put(conn)
+
+    async def run(self, fn, *args, write: bool = False):
+        return await asyncio.to_thread(self.execute, fn, *args, write=write)
+
+    def close(self) -> None:
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+        with self._lock:
+            self._created = 0
+
+
+_db = _Database(DB_PATH, DB_POOL_SIZE)
+
+SQL_INVITE_VALID = "SELECT 1 FROM invite_codes WHERE code = ? AND used_at IS NULL"
+SQL_INVITE_INSERT = "INSERT INTO invite_codes (code, created_at) VALUES (?, ?)"
+SQL_INVITE_USE = "UPDATE invite_codes SET used_at = ?, used_by_user_id = ? WHERE code = ? AND used_at IS NULL"
+SQL_USER_BY_NAME = "SELECT id, password_hash, token_version FROM users WHERE username = ?"
+SQL_USER_TOKEN_VERSION = "SELECT token_version FROM users WHERE id = ?"
+SQL_USER_INSERT = "INSERT INTO users (username, password_hash, created_at) VALUES (?, ?, ?)"
+SQL_USER_SET_HASH = "UPDATE users SET password_hash = ? WHERE id = ?"
+SQL_USER_HASH_BY_ID = "SELECT password_hash FROM users WHERE id = ?"
+SQL_USER_CHANGE_PASSWORD = "UPDATE users SET password_hash = ?, token_version = token_version + 1 WHERE id = ?"
+SQL_USER_RELEASE_INVITES = "UPDATE invite_codes SET used_by_user_id = NULL WHERE used_by_user_id = ?"
+SQL_USER_DELETE = "DELETE FROM users WHERE id = ?"
+SQL_PENDING_GET = "SELECT data FROM pending WHERE user_id = ? AND expires_at > ?"
+SQL_PENDING_PUT = "INSERT OR REPLACE INTO pending (user_id, data, expires_at) VALUES (?, ?, ?)"
+SQL_PENDING_DELETE = "DELETE FROM pending WHERE user_id = ?"
+SQL_PENDING_PURGE = "DELETE FROM pending WHERE expires_at <= ?"
+SQL_REQUEST_INSERT = (
+    "INSERT INTO requests (user_id, kind, category, name, info_hash, magnet, size, status, next_attempt_at, created_at, updated_at) "
+    "VALUES (?, ?, ?, ?, ?, ?, ?, 'queued', ?, ?, ?)"
+)
+SQL_REQUESTS_DUE = (
+    "SELECT id, category, magnet FROM requests "
+    "WHERE status IN ('queued', 'sending') AND next_attempt_at <= ? ORDER BY id LIMIT ?"
+)
+SQL_REQUEST_CLAIM = "UPDATE requests SET status = 'sending', next_attempt_at = ?, updated_at = ? WHERE id = ?"
+SQL_REQUEST_ADDED = "UPDATE requests SET status = 'added', attempts = attempts + 1, last_error = NULL, updated_at = ? WHERE id = ?"
+SQL_REQUEST_RETRY = (
+    "UPDATE requests SET attempts = attempts + 1, last_error = ?, updated_at = ?, "
+    "status = CASE WHEN attempts + 1 >= ? THEN 'failed' ELSE 'queued' END, "
+    "next_attempt_at = ? + min(?, ? * (1 << attempts)) WHERE id = ?"
+)
+SQL_REQUESTS_FOR_USER = (
+    "SELECT id, kind, name, size, status, attempts, last_error, created_at, updated_at "
+    "FROM requests WHERE user_id = ? ORDER BY id DESC LIMIT ?"
+)
+
+
+def _init_db(conn: sqlite3.Connection) -> None:
+    conn.execute(
+        """CREATE TABLE IF NOT EXISTS users (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        username TEXT UNIQUE NOT NULL,
+        password_hash TEXT NOT NULL,
+        created_at REAL NOT NULL,
+        token_version INTEGER NOT NULL DEFAULT 0
+    )"""
+    )
+    if "token_version" not in {row[1] for row in conn.execute("PRAGMA table_info(users)")}:
+        conn.execute("ALTER TABLE users ADD COLUMN token_version INTEGER NOT NULL DEFAULT 0")
+    conn.execute(
+        """CREATE TABLE IF NOT EXISTS invite_codes (
+        code TEXT PRIMARY KEY,
+        used_at REAL,
+        used_by_user_id INTEGER,
+        created_at REAL NOT NULL,
+        FOREIGN KEY (used_by_user_id) REFERENCES users(id)
+    )"""
+    )
+    conn.execute(
+        """CREATE TABLE IF NOT EXISTS pending (
+        user_id INTEGER PRIMARY KEY,
+        data TEXT NOT NULL,
+        expires_at REAL NOT NULL
+    )"""
+    )
+    conn.execute(
+        """CREATE TABLE IF NOT EXISTS requests (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER NOT NULL,
+        kind TEXT NOT NULL,
+        category TEXT NOT NULL,
+        name TEXT NOT NULL,
+        info_hash TEXT NOT NULL,
+        magnet TEXT NOT NULL,
+        size INTEGER NOT NULL DEFAULT 0,
+        status TEXT NOT NULL,
+        attempts INTEGER NOT NULL DEFAULT 0,
+        last_error TEXT,
+        next_attempt_at REAL NOT NULL,
+        created_at REAL NOT NULL,
+        updated_at REAL NOT NULL
+    )"""
+    )
+    conn.execute("CREATE INDEX IF NOT EXISTS requests_due ON requests (status, next_attempt_at)")
+    conn.execute("CREATE INDEX IF NOT EXISTS requests_user ON requests (user_id, id)")
+    cur = conn.execute("SELECT 1 FROM invite_codes LIMIT 1")
+    if not cur.fetchone():
+        conn.execute(SQL_INVITE_INSERT, (os.environ.get("MEDIA_REQUESTS_FIRST_INVITE", "welcome"), time.time()))
+
+
+def _create_invite_code(conn: sqlite3.Connection, code: str) -> bool:
+    try:
+        conn.execute(SQL_INVITE_INSERT, (code.strip().lower(), time.time()))
+        return True
+    except sqlite3.IntegrityError:
+        return False
 
 
-def _create_invite_code(code: str) -> bool:
-    with sqlite3.connect(DB_PATH) as conn:
-        try:
-            conn.execute(
-                "INSERT INTO invite_codes (code, created_at) VALUES (?, ?)",
-                (code.strip().lower(), time.time()),
-            )
-            conn.commit()
-            return True
-        except sqlite3.IntegrityError:
-            return False
-
-
-def _use_invite_code(code: str, user_id: int) -> bool:
-    with sqlite3.connect(DB_PATH) as conn:
-        cur = conn.execute(
-            "UPDATE invite_codes SET used_at = ?, used_by_user_id = ? WHERE code = ? AND used_at IS NULL",
-            (time.time(), user_id, code.strip().lower()),
-        )
-        conn.commit()
-        return cur.rowcount > 0
+def _use_invite_code(conn: sqlite3.Connection, code: str, user_id: int) -> bool:
+    cur = conn.execute(SQL_INVITE_USE, (time.time(), user_id, code.strip().lower()))
+    return cur.rowcount > 0
 
 
-def _is_invite_valid(code: str) -> bool:
-    with sqlite3.connect(DB_PATH) as conn:
-        cur = conn.execute("SELECT 1 FROM invite_codes WHERE code = ? AND used_at IS NULL", (code.strip().lower(),))
-        return cur.fetchone() is not None
+def _is_invite_valid(conn: sqlite3.Connection, code: str) -> bool:
+    return conn.execute(SQL_INVITE_VALID, (code.strip().lower(),)).fetchone() is not None
 
 
-def _register_user(username: str, password: str, invite_code: str) -> int | None:
-    code = invite_code.strip().lower()
-    if not _is_invite_valid(code):
-        return None
-    with sqlite3.connect(DB_PATH) as conn:
-        conn.execute(
-            "INSERT INTO users (username, password_hash, created_at) VALUES (?, ?, ?)",
-            (username.strip(), pwd_ctx.hash(password), time.time()),
-        )
-        user_id = conn.execute("SELECT last_insert_rowid()").fetchone()[0]
-        conn.execute(
-            "UPDATE invite_codes SET used_at = ?, used_by_user_id = ? WHERE code = ? AND used_at IS NULL",
-            (time.time(), user_id, code),
-        )
-        conn.commit()
+def _get_user_by_username(conn: sqlite3.Connection, username: str) -> tuple[int, str, int] | None:
+    row = conn.execute(SQL_USER_BY_NAME, (username.strip(),)).fetchone()
+    return (row[0], row[1], row[2]) if row else None
+
+
+def _get_token_version(conn: sqlite3.Connection, user_id: int) -> int | None:
+    """The user's current token_version, or None if the user no longer exists."""
+    row = conn.execute(SQL_USER_TOKEN_VERSION, (user_id,)).fetchone()
+    return row[0] if row else None
+
+
+def _check_registration(conn: sqlite3.Connection, username: str, invite_code: str) -> str:
+    """Return an error message if the invite code or username can't be used, else ""."""
+    if not _is_invite_valid(conn, invite_code):
+        return "Invalid or already used invite code"
+    if _get_user_by_username(conn, username):
+        return "Username already taken"
+    return ""
+
+
+def _register_user(conn: sqlite3.Connection, username: str, password_hash: str, invite_code: str) -> int | str:
+    """Create the user and consume the invite in one transaction. Returns the new user id or an error message."""
+    err = _check_registration(conn, username, invite_code)
+    if err:
+        return err
+    cur = conn.execute(SQL_USER_INSERT, (username.strip(), password_hash, time.time()))
+    user_id = cur.lastrowid
+    _use_invite_code(conn, invite_code, user_id)
     return user_id
 
 
-def _get_user_by_username(username: str) -> tuple[int, str] | None:
-    with sqlite3.connect(DB_PATH) as conn:
-        row = conn.execute("SELECT id, password_hash FROM users WHERE username = ?", (username.strip(),)).fetchone()
-        return (row[0], row[1]) if row else None
+def _set_password_hash(conn: sqlite3.Connection, user_id: int, password_hash: str) -> None:
+    conn.execute(SQL_USER_SET_HASH, (password_hash, user_id))
+
+
+def _get_password_hash(conn: sqlite3.Connection, user_id: int) -> str | None:
+    row = conn.execute(SQL_USER_HASH_BY_ID, (user_id,)).fetchone()
+    return row[0] if row else None
+
+
+def _change_password(conn: sqlite3.Connection, user_id: int, password_hash: str) -> int | None:
+    """Set a new password and bump token_version, revoking every token issued before. Returns the new version."""
+    conn.execute(SQL_USER_CHANGE_PASSWORD, (password_hash, user_id))
+    return _get_token_version(conn, user_id)
+
+
+def _delete_user(conn: sqlite3.Connection, user_id: int) -> None:
+    """Remove the user and their pending proposal. Queued requests stay as history."""
+    conn.execute(SQL_USER_RELEASE_INVITES, (user_id,))
+    conn.execute(SQL_PENDING_DELETE, (user_id,))
+    conn.execute(SQL_USER_DELETE, (user_id,))
+
+
+# --- Pending confirmations ---
+# user_id -> {"torrent": dict, "type": "movie"|"tv"} between "I found this torrent" and the user's yes/no.
+class _MemoryPendingStore:
+    """Per-process store; fine for a single uvicorn worker."""
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._data: dict[int, tuple[float, dict]] = {}
+
+    async def get(self, user_id: int) -> dict | None:
+        entry = self._data.get(user_id)
+        if entry is None:
+            return None
+        if entry[0] <= time.time():
+            self._data.pop(user_id, None)
+            return None
+        return entry[1]
+
+    async def put(self, user_id: int, value: dict) -> None:
+        self._data[user_id] = (time.time() + self.ttl, value)
+
+    async def pop(self, user_id: int) -> None:
+        self._data.pop(user_id, None)
+
+    async def purge_expired(self) -> int:
+        now = time.time()
+        expired = [uid for uid, (expires_at, _) in self._data.items() if expires_at <= now]
+        for uid in expired:
+            del self._data[uid]
+        return len(expired)
 
 
-def _verify_password(plain: str, hashed: str) -> bool:
+class _SqlitePendingStore:
+    """Store in the app database so every worker sees the same pending state."""
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+
+    async def get(self, user_id: int) -> dict | None:
+        row = await _db.run(lambda conn: conn.execute(SQL_PENDING_GET, (user_id, time.time())).fetchone())
+        return json.loads(row[0]) if row else None
+
+    async def put(self, user_id: int, value: dict) -> None:
+        data = json.dumps(value)
+        await _db.run(lambda conn: conn.execute(SQL_PENDING_PUT, (user_id, data, time.time() + self.ttl)), write=True)
+
+    async def pop(self, user_id: int) -> None:
+        await _db.run(lambda conn: conn.execute(SQL_PENDING_DELETE, (user_id,)), write=True)
+
+    async def purge_expired(self) -> int:
+        return await _db.run(lambda conn: conn.execute(SQL_PENDING_PURGE, (time.time(),)).rowcount, write=True)
+
+
+_PENDING_BACKENDS = {"memory": _MemoryPendingStore, "sqlite": _SqlitePendingStore}
+if PENDING_BACKEND not in _PENDING_BACKENDS:
+    raise RuntimeError(f"MEDIA_REQUESTS_PENDING_BACKEND must be one of {sorted(_PENDING_BACKENDS)}, not {PENDING_BACKEND!r}")
+_pending = _PENDING_BACKENDS[PENDING_BACKEND](PENDING_TTL)
+
+
+async def _sweep_pending() -> None:
+    """Background task: drop expired proposals so abandoned conversations don't accumulate."""
+    while True:
+        await asyncio.sleep(PENDING_SWEEP_INTERVAL)
+        try:
+            await _pending.purge_expired()
+        except Exception:
+            pass
+
+
+# --- Password hashing ---
+class _HashPool:
+    """
+    Runs bcrypt on a dedicated thread pool (bcrypt releases the GIL) so hashing never blocks
+    the event loop. At most `queue_limit` hashes may be running or waiting; beyond that
+    callers get an immediate 503 instead of piling up behind a login burst.
+    """
+
+    def __init__(self, workers: int, queue_limit: int):
+        self.workers = workers
+        self.queue_limit = queue_limit
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bcrypt")
+        self.in_flight = 0  # only touched from the event loop thread
+        self.rejected = 0
+
+    async def run(self, fn, *args):
+        if self.in_flight >= self.queue_limit:
+            self.rejected += 1
+            raise HTTPException(status_code=503, detail="Server is busy; please try again in a moment.", headers={"Retry-After": "2"})
+        self.in_flight += 1
+        try:
+            with metrics.timed("bcrypt", fn.__name__.strip("_")):
+                return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+        finally:
+            self.in_flight -= 1
+
+    def stats(self) -> dict:
+        return {"workers": self.workers, "queue_limit": self.queue_limit, "in_flight": self.in_flight, "rejected": self.rejected}
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+_hash_pool = _HashPool(HASH_WORKERS, HASH_QUEUE_LIMIT)
+
+
+def _verify_and_update(plain: str, hashed: str) -> tuple[bool, str | None]:
+    """Return (valid, new_hash). new_hash is set when the stored hash should be replaced with one from pwd_ctx."""
     if hashed.startswith("$2b$") and bcrypt is not None:
-        return bcrypt.checkpw(plain.encode("utf-8"), hashed.encode("utf-8"))
-    return pwd_ctx.verify(plain, hashed)
+        # Legacy path: hashes written by raw bcrypt (or at another cost) are checked directly,
+        # then rehashed through pwd_ctx so they follow the current policy from now on.
+        if not bcrypt.checkpw(plain.encode("utf-8"), hashed.encode("utf-8")):
+            return False, None
+        return True, pwd_ctx.hash(plain) if pwd_ctx.needs_update(hashed) else None
+    return pwd_ctx.verify_and_update(plain, hashed)
 
 
-def _create_jwt(user_id: int, username: str) -> str:
-    payload = {"sub": str(user_id), "username": username, "exp": time.time() + JWT_EXPIRE_HOURS * 3600}
+def _create_jwt(user_id: int, username: str, token_version: int = 0) -> str:
+    payload = {"sub": str(user_id), "username": username, "ver": token_version, "exp": time.time() + JWT_EXPIRE_HOURS * 3600}
     return jwt.encode(payload, JWT_SECRET, algorithm=JWT_ALGORITHM)
 
 
@@ -155,19 +447,194 @@ def _decode_jwt(token: str) -> dict | None:
         return None
 
 
-# --- Apibay ---
-def _search_apibay(query: str, cat: int) -> list[dict]:
+# Verified claims keyed on sha256(token), valid until the token's exp; LRU-bounded. Only
+# touched from the event loop (get_current_user is async), so no locking is needed.
+_token_cache: OrderedDict[bytes, tuple[float, dict]] = OrderedDict()
+# user_id -> (checked_at, token_version or None if the user is gone), re-read after TOKEN_RECHECK.
+# Bumping users.token_version (or deleting the user) revokes every token issued before. The
+# process that does it calls _invalidate_user_tokens, so the change applies there at once; other
+# workers pick it up within TOKEN_RECHECK seconds.
+_token_versions: dict[int, tuple[float, int | None]] = {}
+_token_epochs: dict[int, int] = {}  # user_id -> invalidation count; stops a read begun earlier from re-caching
+
+
+def _verify_token_cached(token: str) -> dict | None:
+    """Return {"user_id", "username", "token_version"} for a validly signed token, verifying the
+    signature only on first sight. Revocation is checked separately by _token_version_current."""
+    key = hashlib.sha256(token.encode("utf-8")).digest()
+    entry = _token_cache.get(key)
+    if entry is not None:
+        if entry[0] > time.time():
+            _token_cache.move_to_end(key)
+            return entry[1]
+        del _token_cache[key]
+    payload = _decode_jwt(token)
+    if not payload or "sub" not in payload:
+        return None
     try:
-        r = SESSION.get(f"{APIBAY_BASE}/q.php", params={"q": query, "cat": cat}, timeout=15)
-        r.raise_for_status()
-        data = r.json()
-    except Exception:
-        return []
+        claims = {"user_id": int(payload["sub"]), "username": payload.get("username", ""), "token_version": int(payload.get("ver", 0))}
+        exp = float(payload.get("exp") or 0)
+    except (TypeError, ValueError):
+        return None
+    if exp > time.time():
+        _token_cache[key] = (exp, claims)
+        while len(_token_cache) > TOKEN_CACHE_SIZE:
+            _token_cache.popitem(last=False)
+    return claims
+
+
+async def _token_version_current(claims: dict) -> bool:
+    """True if the token was issued at the user's current token_version (read from the DB at most
+    once per TOKEN_RECHECK seconds per user)."""
+    user_id = claims["user_id"]
+    now = time.monotonic()
+    entry = _token_versions.get(user_id)
+    if entry is None or now - entry[0] > TOKEN_RECHECK:
+        epoch = _token_epochs.get(user_id, 0)
+        version = await _db.run(_get_token_version, user_id)
+        if _token_epochs.get(user_id, 0) != epoch:
+            return False  # revoked while reading; the caller's token predates that
+        if len(_token_versions) >= TOKEN_CACHE_SIZE:
+            _token_versions.clear()
+        entry = _token_versions[user_id] = (now, version)
+    return entry[1] is not None and entry[1] == claims["token_version"]
+
+
+def _invalidate_user_tokens(user_id: int, token_version: int | None = None) -> None:
+    """Call after bumping a user's token_version (token_version = the new value) or deleting the
+    user (None): drops their cached claims and records the new version so revoked tokens fail at once."""
+    _token_epochs[user_id] = _token_epochs.get(user_id, 0) + 1
+    _token_versions[user_id] = (time.monotonic(), token_version)
+    for key in [k for k, (_, claims) in _token_cache.items() if claims["user_id"] == user_id]:
+        del _token_cache[key]
+
+
+# --- Apibay ---
+def _get_apibay_client() -> httpx.AsyncClient:
+    global _apibay_client
+    if _apibay_client is None or _apibay_client.is_closed:
+        _apibay_client = httpx.AsyncClient(
+            base_url=APIBAY_BASE,
+            headers={"User-Agent": USER_AGENT},
+            timeout=httpx.Timeout(APIBAY_TIMEOUT, connect=5.0),
+            limits=httpx.Limits(
+                max_connections=APIBAY_MAX_CONNECTIONS,
+                max_keepalive_connections=APIBAY_MAX_CONNECTIONS,
+                keepalive_expiry=30.0,
+            ),
+        )
+    return _apibay_client
+
+
+async def _close_apibay_client() -> None:
+    global _apibay_client
+    if _apibay_client is not None:
+        await _apibay_client.aclose()
+        _apibay_client = None
+
+
+async def _search_apibay(query: str, cat: int, timeout: float = APIBAY_TIMEOUT) -> list[dict]:
+    """Search Apibay without blocking the event loop. `timeout` is a hard deadline for the whole call."""
+    with metrics.timed("apibay", "/q.php") as call:
+        try:
+            r = await asyncio.wait_for(_get_apibay_client().get("/q.php", params={"q": query, "cat": cat}), timeout)
+            r.raise_for_status()
+            data = r.json()
+        except Exception as e:
+            call.error(metrics.error_kind(e))
+            return []
     if isinstance(data, dict):
         data = [data]
     return [t for t in data if t.get("id") and t["id"] != "0" and t.get("info_hash")]
 
 
+class _SearchCache:
+    """Bounded LRU of Apibay results with a fresh TTL and a stale-while-revalidate window."""
+
+    def __init__(self, maxsize: int, ttl: float, stale: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.stale = stale
+        self._data: OrderedDict[tuple[str, int], tuple[float, list[dict]]] = OrderedDict()
+        self.inflight: dict[tuple[str, int], asyncio.Task] = {}
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+
+    def lookup(self, key: tuple[str, int]) -> tuple[list[dict] | None, bool]:
+        """Return (results, is_stale); results is None on a miss or when past the stale window."""
+        entry = self._data.get(key)
+        if entry is None:
+            return None, False
+        age = time.monotonic() - entry[0]
+        if age > self.ttl + self.stale:
+            del self._data[key]
+            return None, False
+        self._data.move_to_end(key)
+        return entry[1], age > self.ttl
+
+    def store(self, key: tuple[str, int], results: list[dict]) -> None:
+        self._data[key] = (time.monotonic(), results)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def stats(self) -> dict:
+        total = self.hits + self.stale_hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "hit_rate": round((self.hits + self.stale_hits) / total, 3) if total else 0.0,
+        }
+
+
+_search_cache = _SearchCache(APIBAY_CACHE_SIZE, APIBAY_CACHE_TTL, APIBAY_CACHE_STALE)
+
+
+def _search_key(query: str, cat: int) -> tuple[str, int]:
+    return " ".join(query.lower().split()), cat
+
+
+def _fetch_into_cache(key: tuple[str, int], query: str, cat: int) -> asyncio.Task:
+    """Start (or join) the single upstream fetch for key; the result is cached when non-empty."""
+    task = _search_cache.inflight.get(key)
+    if task is not None:
+        return task
+
+    async def fetch() -> list[dict]:
+        try:
+            results = await _search_apibay(query, cat)
+            # Empty means "no results" or "Apibay failed"; don't pin either in the cache.
+            if results:
+                _search_cache.store(key, results)
+            return results
+        finally:
+            _search_cache.inflight.pop(key, None)
+
+    task = asyncio.ensure_future(fetch())
+    _search_cache.inflight[key] = task
+    return task
+
+
+async def _search_apibay_cached(query: str, cat: int) -> list[dict]:
+    """Apibay search served from the shared cache when possible; stale entries are refreshed in the background."""
+    key = _search_key(query, cat)
+    results, stale = _search_cache.lookup(key)
+    if results is not None:
+        if stale:
+            _search_cache.stale_hits += 1
+            _fetch_into_cache(key, query, cat)
+        else:
+            _search_cache.hits += 1
+        return results
+    _search_cache.misses += 1
+    # Shield so a disconnecting client doesn't cancel a fetch other requests may be waiting on.
+    return await asyncio.shield(_fetch_into_cache(key, query, cat))
+
+
 def _is_video_name(name: str) -> bool:
     n = (name or "").lower()
     if any(ext in n for ext in (".mkv", ".mp4", ".avi", ".m4v")):
@@ -217,8 +684,35 @@ def _pick_movie(torrents: list[dict]) -> dict | None:
     return candidates[0][2]
 
 
-def _pick_tv(torrents: list[dict]) -> dict | None:
-    """Prefer smallest torrent with at least one seeder (prefer full season in name when present)."""
+# "Season 3", "season.03", "S03", "s3 " -> 3 (also matches the S03 in S03E05; episodes are filtered separately).
+_SEASON_NUM_RE = re.compile(r"\b(?:season[\s._-]*|s)(\d{1,2})(?=\b|e\d)", re.I)
+_EPISODE_RE = re.compile(r"\bs\d{1,2}e\d{1,3}\b", re.I)
+# "Season 1-5", "Seasons 1 to 3", "S01-S05", "S01-05" in release names: a multi-season pack.
+_SEASON_SPAN_RE = re.compile(
+    r"\b(?:seasons?[\s._-]*|s)(\d{1,2})[\s._]*(?:-|–|to|thru|through)[\s._]*(?:seasons?[\s._-]*|s)?(\d{1,2})\b", re.I
+)
+
+
+def _season_numbers(name: str) -> set[int]:
+    """Every season a release name covers, with ranges expanded ("Show Season 1-5 Complete" -> {1, ..., 5})."""
+    seasons = {int(n) for n in _SEASON_NUM_RE.findall(name)}
+    for m in _SEASON_SPAN_RE.finditer(name):
+        first, last = int(m.group(1)), int(m.group(2))
+        if first < last:
+            seasons.update(range(first, last + 1))
+    return seasons
+
+
+def _is_single_season(name: str, season_num: int) -> bool:
+    """True if name is a pack for exactly season_num (not an episode, another season or a multi-season pack)."""
+    if _EPISODE_RE.search(name):
+        return False
+    return _season_numbers(name) == {season_num}
+
+
+def _pick_tv(torrents: list[dict], season_num: int | None = None) -> dict | None:
+    """Prefer smallest torrent with at least one seeder (prefer full season in name when present).
+    If season_num is set, only consider packs for that season."""
     candidates = []
     for t in torrents:
         size = int(t.get("size") or 0)
@@ -230,6 +724,8 @@ def _pick_tv(torrents: list[dict]) -> dict | None:
         name = (t.get("name") or "").strip().lower()
         if not _is_video_name(name) or not _has_english_audio(name):
             continue
+        if season_num is not None and not _is_single_season(name, season_num):
+            continue
         is_full_season = "season" in name or "s01" in name or "s1 " in name or " complete " in name
         candidates.append((size, -seeders, 0 if is_full_season else 1, t))  # full season first, then size, then seeders
     if not candidates:
@@ -246,28 +742,288 @@ def _build_magnet(info_hash: str, name: str) -> str:
     return f"magnet:?xt=urn:btih:{info_hash}&dn={dn}"
 
 
-def _add_to_qbit(magnet: str, category: str) -> None:
-    if not qbittorrentapi:
-        raise RuntimeError("qbittorrent-api not installed")
-    host, _, port = QBIT_HOST.partition(":")
-    port = int(port) if port else 5080
-    client = qbittorrentapi.Client(host=host or "localhost", port=port, username=QBIT_USER, password=QBIT_PASS)
-    client.auth_log_in()
-    save_path = "/downloads"
-    client.torrents_add(urls=magnet, category=category, save_path=save_path, add_to_top_of_queue=True)
+class _QbitClient:
+    """
+    Long-lived qBittorrent client. Logs in once and again only when the session expires;
+    adds run in a worker thread, and adds for the same category arriving within
+    QBIT_BATCH_WINDOW seconds are sent as one torrents_add call.
+    """
+
+    def __init__(self, batch_window: float = QBIT_BATCH_WINDOW):
+        self.batch_window = batch_window
+        self._client = None
+        self._login_lock = threading.Lock()
+        self._batches: dict[str, list[tuple[list[str], asyncio.Future]]] = {}
+        self._flushes: set[asyncio.Task] = set()  # running flushes; referenced so they aren't garbage-collected
+
+    def _connect(self, relogin: bool = False):
+        with self._login_lock:
+            if self._client is None:
+                host, _, port = QBIT_HOST.partition(":")
+                client = qbittorrentapi.Client(
+                    host=host or "localhost",
+                    port=int(port) if port else 5080,
+                    username=QBIT_USER,
+                    password=QBIT_PASS,
+                    REQUESTS_ARGS={"timeout": (5, 30)},
+                )
+                client.auth_log_in()
+                self._client = client
+            elif relogin:
+                self._client.auth_log_in()
+            return self._client
+
+    def _torrents_add(self, urls: list[str], category: str) -> None:
+        kwargs = {"urls": urls, "category": category, "save_path": QBIT_SAVE_PATH, "add_to_top_of_queue": True}
+        try:
+            result = self._connect().torrents_add(**kwargs)
+        except (qbittorrentapi.Forbidden403Error, qbittorrentapi.Unauthorized401Error):
+            # Session cookie expired (qBittorrent restart or WebUI session timeout): log in again and retry once.
+            result = self._connect(relogin=True).torrents_add(**kwargs)
+        if isinstance(result, str) and result.strip().lower().startswith("fail"):
+            raise RuntimeError("qBittorrent rejected the torrent")
+
+    async def add(self, urls: list[str], category: str) -> None:
+        """Queue magnets for category; returns once the batch containing them has been sent."""
+        if not qbittorrentapi:
+            raise RuntimeError("qbittorrent-api not installed")
+        loop = asyncio.get_running_loop()
+        fut = loop.create_future()
+        batch = self._batches.setdefault(category, [])
+        batch.append((urls, fut))
+        if len(batch) == 1:
+            loop.call_later(self.batch_window, self._start_flush, category)
+        await fut
+
+    def _start_flush(self, category: str) -> None:
+        task = asyncio.get_running_loop().create_task(self._flush(category), name=f"qbit-flush-{category}")
+        self._flushes.add(task)
+        task.add_done_callback(self._flushes.discard)
+
+    async def _flush(self, category: str) -> None:
+        batch = self._batches.pop(category, [])
+        if not batch:
+            return
+        urls = [u for entry_urls, _ in batch for u in entry_urls]
+        try:
+            with metrics.timed("qbit", "torrents_add"):
+                await asyncio.to_thread(self._torrents_add, urls, category)
+        except BaseException as e:
+            # Every waiting add() must hear about it, including when the flush itself is cancelled.
+            error = e if isinstance(e, Exception) else RuntimeError("qBittorrent add was interrupted")
+            for _, fut in batch:
+                if not fut.done():
+                    fut.set_exception(error)
+            if not isinstance(e, Exception):
+                raise
+        else:
+            for _, fut in batch:
+                if not fut.done():
+                    fut.set_result(None)
+
+    async def close(self) -> None:
+        await asyncio.gather(*self._flushes, return_exceptions=True)
+        for category in list(self._batches):
+            await self._flush(category)
+        if self._client is not None:
+            try:
+                await asyncio.to_thread(self._client.auth_log_out)
+            except Exception:
+                pass
+            self._client = None
+
+
+_qbit = _QbitClient()
+
+
+# --- Download request queue ---
+# status: queued -> sending (claimed by a dispatcher) -> added | failed; failed sends go back to
+# queued with exponential backoff until DISPATCH_MAX_ATTEMPTS.
+_dispatch_wake = asyncio.Event()
+
+
+def _enqueue_requests(conn: sqlite3.Connection, user_id: int, kind: str, category: str, torrents: list[dict]) -> list[int]:
+    now = time.time()
+    ids = []
+    for t in torrents:
+        cur = conn.execute(
+            SQL_REQUEST_INSERT,
+            (
+                user_id,
+                kind,
+                category,
+                t.get("name", ""),
+                (t.get("info_hash") or "").upper(),
+                t["magnet"],
+                int(t.get("size") or 0),
+                now,
+                now,
+                now,
+            ),
+        )
+        ids.append(cur.lastrowid)
+    return ids
+
+
+def _claim_requests(conn: sqlite3.Connection, limit: int, lease: float) -> list[tuple[int, str, str]]:
+    """Reserve due requests for this dispatcher; a lease that runs out (worker died mid-send) makes them due again."""
+    now = time.time()
+    rows = conn.execute(SQL_REQUESTS_DUE, (now, limit)).fetchall()
+    conn.executemany(SQL_REQUEST_CLAIM, [(now + lease, now, row[0]) for row in rows])
+    return rows
+
+
+def _mark_requests_added(conn: sqlite3.Connection, ids: list[int]) -> None:
+    now = time.time()
+    conn.executemany(SQL_REQUEST_ADDED, [(now, i) for i in ids])
+
 
+def _mark_requests_failed(conn: sqlite3.Connection, ids: list[int], error: str) -> None:
+    now = time.time()
+    conn.executemany(
+        SQL_REQUEST_RETRY,
+        [(error[:500], now, DISPATCH_MAX_ATTEMPTS, now, DISPATCH_BACKOFF_MAX, DISPATCH_BACKOFF, i) for i in ids],
+    )
 
-def _search_and_pick(query: str, is_tv: bool) -> tuple[dict | None, str]:
+
+def _list_requests(conn: sqlite3.Connection, user_id: int, limit: int) -> list[dict]:
+    keys = ("id", "type", "name", "size", "status", "attempts", "last_error", "created_at", "updated_at")
+    return [dict(zip(keys, row)) for row in conn.execute(SQL_REQUESTS_FOR_USER, (user_id, limit)).fetchall()]
+
+
+async def _dispatch_once() -> int:
+    """Send one batch of due requests to qBittorrent (one add call per category). Returns how many were claimed."""
+    rows = await _db.run(_claim_requests, DISPATCH_BATCH, DISPATCH_LEASE, write=True)
+    by_category: dict[str, list[tuple[int, str]]] = {}
+    for req_id, category, magnet in rows:
+        by_category.setdefault(category, []).append((req_id, magnet))
+
+    async def send(category: str, batch: list[tuple[int, str]]) -> None:
+        ids = [req_id for req_id, _ in batch]
+        try:
+            await _qbit.add([magnet for _, magnet in batch], category)
+        except Exception as e:
+            await _db.run(_mark_requests_failed, ids, str(e) or type(e).__name__, write=True)
+        else:
+            await _db.run(_mark_requests_added, ids, write=True)
+
+    await asyncio.gather(*(send(c, b) for c, b in by_category.items()))
+    return len(rows)
+
+
+async def _dispatch_requests() -> None:
+    """Background task: drain the request queue, waking early whenever a chat enqueues something."""
+    while True:
+        try:
+            await asyncio.wait_for(_dispatch_wake.wait(), DISPATCH_INTERVAL)
+        except asyncio.TimeoutError:
+            pass
+        _dispatch_wake.clear()
+        try:
+            if await _dispatch_once() >= DISPATCH_BATCH:
+                _dispatch_wake.set()  # more may be due; go again without waiting
+        except Exception:
+            pass
+
+
+_YEAR_SUFFIX_RE = re.compile(r"\s*\(?\b(?:19|20)\d{2}\)?$")
+_SXX_RE = re.compile(r"\bs0?(\d{1,2})\b", re.I)
+_SEASON_WORD_RE = re.compile(r"\bseason\s*0?(\d{1,2})\b", re.I)
+
+
+def _query_variants(query: str, is_tv: bool) -> list[tuple[str, int]]:
+    """
+    (query, category) pairs to search concurrently: the query (plus "S01" <-> "Season 1" for TV)
+    in the specific category and in cat 0 (all), since Apibay's TV/movie categories often
+    return nothing where cat 0 succeeds. The pickers filter cat 0 results to video releases.
+    """
+    query = query.strip()
+    queries = [query]
+    if is_tv:
+        if m := _SXX_RE.search(query):
+            queries.append(_SXX_RE.sub(f"Season {int(m.group(1))}", query, count=1))
+        elif m := _SEASON_WORD_RE.search(query):
+            queries.append(_SEASON_WORD_RE.sub(f"S{int(m.group(1)):02d}", query, count=1))
     cat = APIBAY_CAT_TV if is_tv else APIBAY_CAT_MOVIES
-    torrents = _search_apibay(query.strip(), cat)
+    return [(q, c) for q in queries for c in (cat, 0)]
+
+
+async def _search_variants(variants: list[tuple[str, int]], timeout: float = APIBAY_TIMEOUT) -> list[list[dict]]:
+    """
+    Run (query, category) searches concurrently under one shared deadline. Returns one result
+    list per variant; searches that fail or are still running at the deadline give [], so the
+    total wait is the slowest single query rather than the sum of retries.
+    """
+    tasks = [asyncio.ensure_future(_search_apibay_cached(q, cat)) for q, cat in variants]
+    try:
+        await asyncio.wait(tasks, timeout=timeout)
+    finally:
+        for t in tasks:
+            if not t.done():
+                t.cancel()
+    return [t.result() if t.done() and not t.cancelled() and t.exception() is None else [] for t in tasks]
+
+
+def _merge_by_hash(result_lists: list[list[dict]]) -> list[dict]:
+    seen: set[str] = set()
+    merged = []
+    for torrents in result_lists:
+        for t in torrents:
+            h = (t.get("info_hash") or "").upper()
+            if h and h not in seen:
+                seen.add(h)
+                merged.append(t)
+    return merged
+
+
+async def _search_and_pick(query: str, is_tv: bool) -> tuple[dict | None, str]:
+    pick = _pick_tv if is_tv else _pick_movie
+    exact = _query_variants(query, is_tv)
+    # Searched alongside the exact query, but only used if it yields nothing suitable
+    # ("Blade Runner 2049" must not fall through to the 1982 film when the 2049 release exists).
+    no_year = _YEAR_SUFFIX_RE.sub("", query.strip()).strip()
+    fallback = _query_variants(no_year, is_tv) if no_year and no_year != query.strip() else []
+    results = await _search_variants(exact + fallback)
+    torrents = _merge_by_hash(results[: len(exact)])
+    chosen = pick(torrents)
+    if not chosen and fallback:
+        torrents = _merge_by_hash(results)
+        chosen = pick(torrents)
     if not torrents:
         return None, "No results found for that search."
-    chosen = _pick_tv(torrents) if is_tv else _pick_movie(torrents)
     if not chosen:
         return None, "No suitable torrent found (need at least one seeder and a video release)."
     return chosen, ""
 
 
+async def _search_and_pick_season(show: str, season_num: int) -> dict | None:
+    results = await _search_variants(_query_variants(f"{show} Season {season_num}", True))
+    return _pick_tv(_merge_by_hash(results), season_num=season_num)
+
+
+async def _search_and_pick_seasons(show: str, seasons: list[int]) -> list[tuple[int, dict | None]]:
+    """Pick each season's pack from one show-level search, then search concurrently only for the
+    seasons it didn't cover; returns (season, chosen torrent or None) in season order."""
+    show_results = _merge_by_hash(await _search_variants(_query_variants(show, True)))
+    picks = {n: _pick_tv(show_results, season_num=n) for n in seasons}
+    missing = [n for n in seasons if picks[n] is None]
+    for n, chosen in zip(missing, await asyncio.gather(*(_search_and_pick_season(show, n) for n in missing))):
+        picks[n] = chosen
+    return [(n, picks[n]) for n in seasons]
+
+
+async def _cancel_on_disconnect(request: Request, coro, poll_interval: float = 0.5):
+    """Await coro, cancelling it if the HTTP client disconnects first (e.g. user closed the tab)."""
+    task = asyncio.ensure_future(coro)
+    while True:
+        done, _ = await asyncio.wait({task}, timeout=poll_interval)
+        if done:
+            return task.result()
+        if await request.is_disconnected():
+            task.cancel()
+            raise HTTPException(status_code=499, detail="Client disconnected")
+
+
 # --- Pydantic ---
 class RegisterRequest(BaseModel):
     invite_code: str
@@ -280,6 +1036,15 @@ class LoginRequest(BaseModel):
     password: str
 
 
+class PasswordChangeRequest(BaseModel):
+    current_password: str
+    new_password: str
+
+
+class DeleteAccountRequest(BaseModel):
+    password: str
+
+
 class ChatRequest(BaseModel):
     message: str
 
@@ -287,24 +1052,33 @@ class ChatRequest(BaseModel):
 # --- App ---
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    _init_db()
+    await _db.run(_init_db, write=True)
+    sweeper = asyncio.create_task(_sweep_pending())
+    dispatcher = asyncio.create_task(_dispatch_requests())
     yield
+    sweeper.cancel()
+    dispatcher.cancel()
+    await _qbit.close()
+    await _close_apibay_client()
+    _hash_pool.shutdown()
+    _db.close()
 
 
 app = FastAPI(title="Media Requests", lifespan=lifespan)
+metrics.instrument(app)
 static_dir = BASE_DIR / "static"
 if static_dir.is_dir():
     from fastapi.staticfiles import StaticFiles
     app.mount("/static", StaticFiles(directory=str(static_dir)), name="static")
 
 
-def get_current_user(creds: HTTPAuthorizationCredentials | None = Depends(security)):
+async def get_current_user(creds: HTTPAuthorizationCredentials | None = Depends(security)):
     if not creds or not creds.credentials:
         raise HTTPException(status_code=401, detail="Not authenticated")
-    payload = _decode_jwt(creds.credentials)
-    if not payload or "sub" not in payload:
+    claims = _verify_token_cached(creds.credentials)
+    if not claims or not await _token_version_current(claims):
         raise HTTPException(status_code=401, detail="Invalid token")
-    return {"user_id": int(payload["sub"]), "username": payload.get("username", "")}
+    return {"user_id": claims["user_id"], "username": claims["username"]}
 
 
 @app.get("/", response_class=HTMLResponse)
@@ -316,12 +1090,17 @@ async def index():
 async def register(req: RegisterRequest):
     if not req.invite_code.strip() or not req.username.strip() or not req.password:
         raise HTTPException(status_code=400, detail="Invite code, username and password required")
-    if not _is_invite_valid(req.invite_code):
-        raise HTTPException(status_code=400, detail="Invalid or already used invite code")
-    with sqlite3.connect(DB_PATH) as conn:
-        if conn.execute("SELECT id FROM users WHERE username = ?", (req.username.strip(),)).fetchone():
-            raise HTTPException(status_code=400, detail="Username already taken")
-    user_id = _register_user(req.username, req.password, req.invite_code)
+    # Cheap read-only check first so bad invite codes and taken names never cost a bcrypt hash.
+    err = await _db.run(_check_registration, req.username, req.invite_code)
+    if err:
+        raise HTTPException(status_code=400, detail=err)
+    password_hash = await _hash_pool.run(pwd_ctx.hash, req.password)
+    try:
+        user_id = await _db.run(_register_user, req.username, password_hash, req.invite_code, write=True)
+    except sqlite3.IntegrityError:
+        raise HTTPException(status_code=400, detail="Username already taken")
+    if isinstance(user_id, str):
+        raise HTTPException(status_code=400, detail=user_id)
     if not user_id:
         raise HTTPException(status_code=400, detail="Registration failed")
     token = _create_jwt(user_id, req.username.strip())
@@ -330,65 +1109,161 @@ async def register(req: RegisterRequest):
 
 @app.post("/api/login")
 async def login(req: LoginRequest):
-    row = _get_user_by_username(req.username)
-    if not row or not _verify_password(req.password, row[1]):
+    row = await _db.run(_get_user_by_username, req.username)
+    if not row:
+        raise HTTPException(status_code=401, detail="Invalid username or password")
+    valid, new_hash = await _hash_pool.run(_verify_and_update, req.password, row[1])
+    if not valid:
         raise HTTPException(status_code=401, detail="Invalid username or password")
     user_id = row[0]
-    token = _create_jwt(user_id, req.username.strip())
+    if new_hash:
+        await _db.run(_set_password_hash, user_id, new_hash, write=True)
+    token = _create_jwt(user_id, req.username.strip(), row[2])
     return {"ok": True, "token": token, "username": req.username.strip()}
 
 
+async def _check_own_password(user_id: int, password: str) -> None:
+    hashed = await _db.run(_get_password_hash, user_id)
+    valid, _ = await _hash_pool.run(_verify_and_update, password, hashed) if hashed else (False, None)
+    if not valid:
+        raise HTTPException(status_code=401, detail="Password is incorrect")
+
+
+@app.post("/api/password")
+async def change_password(req: PasswordChangeRequest, user: dict = Depends(get_current_user)):
+    """Change the caller's password. Every token issued before stops working; the reply carries a new one."""
+    if not req.new_password:
+        raise HTTPException(status_code=400, detail="New password required")
+    user_id = user["user_id"]
+    await _check_own_password(user_id, req.current_password)
+    password_hash = await _hash_pool.run(pwd_ctx.hash, req.new_password)
+    version = await _db.run(_change_password, user_id, password_hash, write=True)
+    _invalidate_user_tokens(user_id, version)
+    if version is None:
+        raise HTTPException(status_code=401, detail="Invalid token")
+    return {"ok": True, "token": _create_jwt(user_id, user["username"], version), "username": user["username"]}
+
+
+@app.post("/api/account/delete")
+async def delete_account(req: DeleteAccountRequest, user: dict = Depends(get_current_user)):
+    """Delete the caller's account; its tokens are rejected from the next request on."""
+    user_id = user["user_id"]
+    await _check_own_password(user_id, req.password)
+    await _db.run(_delete_user, user_id, write=True)
+    _invalidate_user_tokens(user_id)
+    return {"ok": True}
+
+
 CONFIRM_PATTERNS = re.compile(r"\b(yes|yeah|yep|correct|right|looks good|add it|do it|confirm|please add)\b", re.I)
 REJECT_PATTERNS = re.compile(r"\b(no|nope|wrong|different|other|cancel)\b", re.I)
 
 
+_QUOTE_PAIRS = (("'", "'"), ('"', '"'), ("\u201c", "\u201d"), ("\u2018", "\u2019"))
+
+
+def _strip_quotes(text: str) -> str:
+    if len(text) >= 2 and (text[0], text[-1]) in _QUOTE_PAIRS:
+        return text[1:-1].strip()
+    return text
+
+
 def _normalize_query(msg: str) -> str:
-    msg = msg.strip()
-    # Strip surrounding quotes so "Add 'free willy'" -> free willy
-    if len(msg) >= 2 and (msg[0], msg[-1]) in (("'", "'"), ('"', '"')):
-        msg = msg[1:-1].strip()
+    msg = _strip_quotes(msg.strip())
     for prefix in ("add ", "i want ", "want ", "get ", "find ", "search ", "movie ", "show ", "tv "):
         if msg.lower().startswith(prefix):
             msg = msg[len(prefix):].strip()
-    return msg or msg
+    # Strip surrounding quotes before and after the prefix so "Add 'free willy'" -> free willy
+    return _strip_quotes(msg)
+
+
+_SEASON_RANGE_RE = re.compile(
+    r"\b(?:seasons?\s*|s)0?(\d{1,2})\s*(?:-|–|to|through|thru)\s*(?:seasons?\s*|s)?0?(\d{1,2})\b", re.I
+)
+_SEASON_LIST_RE = re.compile(r"\bseasons\s+(\d{1,2}(?:\s*(?:,|&|and)\s*\d{1,2})+)\b", re.I)
+
+
+def _parse_season_request(msg: str) -> tuple[str, list[int]] | None:
+    """Parse "Breaking Bad seasons 1-5", "S01-S03" or "seasons 1, 2 and 4" into (show, seasons); None if not
+    multi-season. The caller enforces MAX_BATCH_SEASONS so an oversized range gets a reply instead of a search."""
+    m = _SEASON_RANGE_RE.search(msg)
+    if m:
+        first, last = int(m.group(1)), int(m.group(2))
+        if first < 1 or last <= first:
+            return None
+        seasons = list(range(first, last + 1))
+    else:
+        m = _SEASON_LIST_RE.search(msg)
+        if not m:
+            return None
+        seasons = sorted({int(n) for n in re.findall(r"\d{1,2}", m.group(1))})
+        if len(seasons) < 2 or seasons[0] < 1:
+            return None
+    show = _normalize_query(msg[: m.start()].strip(" -–,:")).strip(" -–,:")
+    if len(show) < 2:
+        return None
+    return show, seasons
 
 
 @app.post("/api/chat")
-async def chat(req: ChatRequest, user: dict = Depends(get_current_user)):
+async def chat(req: ChatRequest, request: Request, user: dict = Depends(get_current_user)):
     msg = (req.message or "").strip()
     if not msg:
         return {"reply": "Send a message to request a movie or TV show (e.g. \"Add The Matrix\" or \"I want Breaking Bad season 1\")."}
 
     user_id = user["user_id"]
-    pending = _pending.get(user_id)
+    pending = await _pending.get(user_id)
 
     if pending and CONFIRM_PATTERNS.search(msg):
-        torrent = pending.get("torrent")
+        # Single proposal stores "torrent"; a multi-season batch stores "torrents".
+        torrents = pending.get("torrents") or ([pending["torrent"]] if pending.get("torrent") else [])
         kind = pending.get("type", "movie")
-        if not torrent:
-            _pending.pop(user_id, None)
+        if not torrents:
+            await _pending.pop(user_id)
             return {"reply": "No pending request. Tell me what movie or show you want."}
-        magnet = _build_magnet(torrent.get("info_hash", ""), torrent.get("name", ""))
-        if not magnet:
-            _pending.pop(user_id, None)
+        queued = [{**t, "magnet": _build_magnet(t.get("info_hash", ""), t.get("name", ""))} for t in torrents]
+        if not all(t["magnet"] for t in queued):
+            await _pending.pop(user_id)
             return {"reply": "Something went wrong building the magnet link. Try again."}
-        try:
-            _add_to_qbit(magnet, "tv-sonarr" if kind == "tv" else "radarr")
-        except Exception as e:
-            return {"reply": f"Failed to add to download manager: {e}"}
-        _pending.pop(user_id, None)
-        return {"reply": "I've added it to the download manager. It may be a day or two before it appears on the server."}
+        # Queue and reply right away; the dispatcher sends it to qBittorrent and retries if it's down.
+        await _db.run(_enqueue_requests, user_id, kind, "tv-sonarr" if kind == "tv" else "radarr", queued, write=True)
+        _dispatch_wake.set()
+        await _pending.pop(user_id)
+        if len(queued) > 1:
+            return {"reply": f"I've queued all {len(queued)} seasons for the download manager. It may be a day or two before they appear on the server."}
+        return {"reply": "I've queued it for the download manager. It may be a day or two before it appears on the server."}
 
     if pending and REJECT_PATTERNS.search(msg):
-        _pending.pop(user_id, None)
+        await _pending.pop(user_id)
         return {"reply": "No problem. What would you like to add instead?"}
 
     query = _normalize_query(msg)
     if len(query) < 2:
         return {"reply": "Please tell me the name of the movie or TV show (e.g. \"The Matrix\" or \"Breaking Bad S01\")."}
 
+    season_request = _parse_season_request(msg)
+    if season_request:
+        show, seasons = season_request
+        if len(seasons) > MAX_BATCH_SEASONS:
+            return {"reply": f"I can look up at most {MAX_BATCH_SEASONS} seasons at a time. Try **{show} seasons {seasons[0]}-{seasons[0] + MAX_BATCH_SEASONS - 1}** first."}
+        picks = await _cancel_on_disconnect(request, _search_and_pick_seasons(show, seasons))
+        found = [(n, t) for n, t in picks if t]
+        missing = [str(n) for n, t in picks if not t]
+        if not found:
+            return {"reply": f"No suitable season packs found for **{show}** (need English audio, at least one seeder and a video release)."}
+        await _pending.put(user_id, {"torrents": [t for _, t in found], "type": "tv"})
+        lines = [
+            f"Season {n}: **{t.get('name', 'Unknown')}** — {int(t.get('size') or 0) / 1024**3:.2f} GB, {int(t.get('seeders') or 0)} seeder(s)"
+            for n, t in found
+        ]
+        total_gb = sum(int(t.get("size") or 0) for _, t in found) / 1024**3
+        reply = f"I found {len(found)} season(s) of **{show}** ({total_gb:.2f} GB total):\n" + "\n".join(lines)
+        if missing:
+            reply += f"\nNo suitable torrent for season(s) {', '.join(missing)}."
+        reply += "\nDo these look right? (Say yes to add them all, or no to try something else.)"
+        return {"reply": reply}
+
     is_tv = any(x in msg.lower() for x in ["season", "s01", "s1 ", " tv ", "show", "series"])
-    chosen, err = _search_and_pick(query, is_tv)
+    chosen, err = await _cancel_on_disconnect(request, _search_and_pick(query, is_tv))
     if err:
         return {"reply": err}
 
@@ -396,12 +1271,19 @@ async def chat(req: ChatRequest, user: dict = Depends(get_current_user)):
     size_b = int(chosen.get("size") or 0)
     seeders = int(chosen.get("seeders") or 0)
     size_gb = size_b / (1024**3)
-    _pending[user_id] = {"torrent": chosen, "type": "tv" if is_tv else "movie"}
+    await _pending.put(user_id, {"torrent": chosen, "type": "tv" if is_tv else "movie"})
     return {
         "reply": f"I found this torrent: **{name}** — {size_gb:.2f} GB, {seeders} seeder(s). Does that look like the right one? (Say yes to add it, or no to try something else.)"
     }
 
 
+@app.get("/api/requests")
+async def list_requests(limit: int = 50, user: dict = Depends(get_current_user)):
+    """The current user's download requests, newest first, with their queue status."""
+    rows = await _db.run(_list_requests, user["user_id"], max(1, min(limit, 200)))
+    return {"requests": rows}
+
+
 # --- Admin: create invite code (any logged-in user can create invites) ---
 class InviteRequest(BaseModel):
     code: str
@@ -411,11 +1293,17 @@ class InviteRequest(BaseModel):
 async def create_invite(req: InviteRequest, _: dict = Depends(get_current_user)):
     if not (req.code and req.code.strip()):
         raise HTTPException(status_code=400, detail="Invite code required")
-    if _create_invite_code(req.code):
+    if await _db.run(_create_invite_code, req.code, write=True):
         return {"ok": True, "message": f"Invite code '{req.code.strip()}' created."}
     raise HTTPException(status_code=400, detail="Code already exists or invalid.")
 
 
+@app.get("/api/admin/stats")
+async def admin_stats(_: dict = Depends(get_current_user)):
+    """Cache and worker-pool counters for tuning (requires auth)."""
+    return {"apibay_cache": _search_cache.stats(), "password_hashing": _hash_pool.stats()}
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=int(os.environ.get("PORT", "8002")))
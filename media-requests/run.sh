@@ -3,6 +3,9 @@
 # For production, run under systemd or a process manager so it stays up.
 set -e
 cd "$(dirname "$0")"
+# Shared modules (metrics.py) live in the repo root.
+export PYTHONPATH="$(cd .. && pwd)${PYTHONPATH:+:$PYTHONPATH}"
 export MEDIA_REQUESTS_JWT_SECRET="${MEDIA_REQUESTS_JWT_SECRET:?Set MEDIA_REQUESTS_JWT_SECRET}"
 export PORT="${PORT:-8002}"
-exec .venv/bin/uvicorn main:app --host 127.0.0.1 --port "$PORT"
+# More than one worker needs MEDIA_REQUESTS_PENDING_BACKEND=sqlite so confirmations reach any worker.
+exec .venv/bin/uvicorn main:app --host 127.0.0.1 --port "$PORT" --workers "${WORKERS:-1}"
@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""
+Claim registry shared by compress-media-nightly and replace-movie-with-smaller: a path claimed
+by one job is "in use" and must not be picked by the other.
+
+Claims live in SQLite (one row per path; claim and release are single-row transactions, so
+concurrent jobs cannot lose each other's claims). Each claim is a lease: it names an owner,
+optionally the PID that holds it, and an expiry. A claim whose lease has expired, or whose PID
+has exited, is dead and is reaped the next time the path is claimed or the list is read, so a
+crashed run no longer blocks its file forever. Claims without a PID (e.g. replace-movie
+--batch, whose downloads finish after it exits) last until their expiry.
+
+    from media_claims import ClaimRegistry
+    with ClaimRegistry() as claims:
+        if claims.claim(path, "replace-movie-with-smaller", ttl=6 * 3600):
+            try:
+                ...
+            finally:
+                claims.release(path)
+
+CLI (for the shell scripts):
+  ./media_claims.py claim --owner NAME [--pid PID] [--ttl SECONDS] PATH   # exit 1 if held by another
+  ./media_claims.py release [--pid PID] PATH
+  ./media_claims.py list [-v]                                             # live claimed paths
+  ./media_claims.py reap
+
+Env: MEDIA_STACK_CLAIMS_DB (default /var/lib/media-stack/claims.db; keep it on local disk).
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import sqlite3
+import sys
+import time
+from pathlib import Path
+
+DB_PATH = Path(os.environ.get("MEDIA_STACK_CLAIMS_DB", "/var/lib/media-stack/claims.db"))
+DEFAULT_TTL = 24 * 3600
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS claims (
+    path TEXT PRIMARY KEY,
+    owner TEXT NOT NULL,
+    pid INTEGER,
+    pid_start INTEGER,
+    claimed_at REAL NOT NULL,
+    expires_at REAL NOT NULL
+);
+"""
+
+
+def _process_start(pid: int) -> int | None:
+    """Start time of pid in clock ticks since boot (from /proc), or None if unavailable.
+    Recorded with a claim so a recycled PID is not mistaken for the original owner."""
+    try:
+        stat = Path(f"/proc/{pid}/stat").read_text()
+    except OSError:
+        return None
+    # Field 22; the command name (field 2) may contain spaces, so split after its closing paren.
+    return int(stat.rpartition(")")[2].split()[19])
+
+
+def _pid_alive(pid: int, start: int | None) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass  # exists, owned by another user
+    return start is None or _process_start(pid) in (start, None)
+
+
+def _live(row: tuple, now: float) -> bool:
+    """row: (pid, pid_start, expires_at)."""
+    pid, pid_start, expires_at = row
+    return expires_at > now and (pid is None or _pid_alive(pid, pid_start))
+
+
+def _key(path: str | os.PathLike) -> str:
+    return os.path.realpath(path)
+
+
+class ClaimRegistry:
+    """Lease-based path claims in SQLite; one connection per instance, usable as a context manager."""
+
+    def __init__(self, db_path: str | os.PathLike = DB_PATH):
+        Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        # Autocommit; writes that must see a consistent row take BEGIN IMMEDIATE themselves.
+        self.db = sqlite3.connect(db_path, timeout=30, isolation_level=None)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.executescript(_SCHEMA)
+
+    def close(self) -> None:
+        self.db.close()
+
+    def __enter__(self) -> ClaimRegistry:
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def claim(self, path: str | os.PathLike, owner: str, ttl: float = DEFAULT_TTL, pid: int | None = None) -> bool:
+        """Claim path for ttl seconds, tied to pid if given (claimed while that process lives).
+        Returns False if another live claim holds it; re-claiming one's own path renews the lease."""
+        key, now = _key(path), time.time()
+        self.db.execute("BEGIN IMMEDIATE")
+        try:
+            row = self.db.execute("SELECT owner, pid, pid_start, expires_at FROM claims WHERE path = ?", (key,)).fetchone()
+            if row is not None and _live(row[1:], now) and (row[0], row[1]) != (owner, pid):
+                self.db.execute("ROLLBACK")
+                return False
+            self.db.execute(
+                "INSERT OR REPLACE INTO claims VALUES (?, ?, ?, ?, ?, ?)",
+                (key, owner, pid, _process_start(pid) if pid is not None else None, now, now + ttl),
+            )
+            self.db.execute("COMMIT")
+            return True
+        except BaseException:
+            self.db.execute("ROLLBACK")
+            raise
+
+    def release(self, path: str | os.PathLike, pid: int | None = None) -> bool:
+        """Drop the claim on path (only if held by pid, when given). Returns True if a claim was removed."""
+        if pid is None:
+            cur = self.db.execute("DELETE FROM claims WHERE path = ?", (_key(path),))
+        else:
+            cur = self.db.execute("DELETE FROM claims WHERE path = ? AND pid = ?", (_key(path), pid))
+        return cur.rowcount > 0
+
+    def is_claimed(self, path: str | os.PathLike) -> bool:
+        row = self.db.execute("SELECT pid, pid_start, expires_at FROM claims WHERE path = ?", (_key(path),)).fetchone()
+        return row is not None and _live(row, time.time())
+
+    def reap(self) -> int:
+        """Delete expired claims and claims whose process has exited; return how many were removed."""
+        now = time.time()
+        dead = [
+            (path,)
+            for path, *lease in self.db.execute("SELECT path, pid, pid_start, expires_at FROM claims")
+            if not _live(lease, now)
+        ]
+        self.db.executemany("DELETE FROM claims WHERE path = ?", dead)
+        return len(dead)
+
+    def claims(self) -> list[tuple[str, str, int | None, float]]:
+        """Live claims as (path, owner, pid, expires_at), reaping dead ones first."""
+        self.reap()
+        return self.db.execute("SELECT path, owner, pid, expires_at FROM claims ORDER BY claimed_at").fetchall()
+
+    def claimed(self) -> set[str]:
+        """Paths of all live claims."""
+        return {path for path, *_ in self.claims()}
+
+
+# --- CLI ---
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Lease-based path claims shared by the media maintenance jobs.")
+    parser.add_argument("--db", default=str(DB_PATH), help=f"Claims database (default {DB_PATH})")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("claim", help="Claim PATH; exit status 1 if another live claim holds it")
+    p.add_argument("--owner", required=True, help="Job name, e.g. compress-media-nightly")
+    p.add_argument("--pid", type=int, default=None, help="Claim lasts only while this process runs (e.g. the calling shell's $$)")
+    p.add_argument("--ttl", type=float, default=DEFAULT_TTL, metavar="SECONDS", help=f"Lease length (default {DEFAULT_TTL})")
+    p.add_argument("path")
+    p = sub.add_parser("release", help="Release the claim on PATH")
+    p.add_argument("--pid", type=int, default=None, help="Only release if held by this PID")
+    p.add_argument("path")
+    p = sub.add_parser("list", help="Print live claimed paths, one per line")
+    p.add_argument("-v", "--verbose", action="store_true", help="Also print owner, PID and expiry")
+    sub.add_parser("reap", help="Delete expired and dead-process claims")
+    args = parser.parse_args()
+
+    with ClaimRegistry(args.db) as claims:
+        if args.command == "claim":
+            if not claims.claim(args.path, args.owner, ttl=args.ttl, pid=args.pid):
+                print(f"Already claimed: {args.path}", file=sys.stderr)
+                return 1
+        elif args.command == "release":
+            claims.release(args.path, pid=args.pid)
+        elif args.command == "list":
+            for path, owner, pid, expires_at in claims.claims():
+                if args.verbose:
+                    expires = time.strftime("%Y-%m-%d %H:%M", time.localtime(expires_at))
+                    print(f"{path}\t{owner}\tpid={pid if pid is not None else '-'}\texpires={expires}")
+                else:
+                    print(path)
+        elif args.command == "reap":
+            print(f"Reaped {claims.reap()} claim(s)", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,364 @@
+#!/usr/bin/env python3
+"""
+Persistent media inventory shared by the maintenance jobs (compress-media-nightly,
+replace-movie-with-smaller, list/remove-download-duplicates).
+
+A SQLite database keeps one row per file under the library and download roots (path, size,
+mtime, inode, kind) and the mtime of every directory. A refresh stats each directory once and
+only re-lists directories whose mtime changed since the last refresh, so an unchanged library
+on NFS costs one stat per directory instead of a full crawl. Creating, deleting or renaming a
+file bumps its directory's mtime; rewriting a file in place does not, so use a full refresh
+when that matters. Symbolic links are neither followed nor indexed, and the compress work
+directories are pruned (see media_scan.PRUNE_DIRS).
+
+    from media_inventory import Inventory
+    with Inventory() as inv:
+        inv.refresh(["/mnt/media-storage/movies"])
+        for size, path in inv.largest(5, ["/mnt/media-storage/movies"], min_size=3 * 1024**3, exclude=claimed):
+            ...
+
+CLI (query commands print "SIZE PATH" lines, like find -printf "%s %p\\n"):
+  ./media_inventory.py refresh [--full] [ROOT ...]      # default roots: movies, tvshows, downloads
+  ./media_inventory.py largest -n 5 --min-size BYTES --exclude-file CLAIMED --refresh ROOT ...
+  ./media_inventory.py duplicates --of MOVIES --of TV --refresh DOWNLOADS
+  ./media_inventory.py keys --refresh ROOT ...          # "SIZE BASENAME" per distinct video
+  ./media_inventory.py find --size BYTES --name BASENAME [ROOT ...]
+
+Env: MEDIA_INVENTORY_DB (default /var/lib/media-stack/inventory.db), MEDIA_BASE, MOVIES_DIR,
+TV_DIR, DOWNLOADS_DIR.
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import sqlite3
+import sys
+import time
+from collections.abc import Collection, Iterable
+from pathlib import Path
+from typing import NamedTuple
+
+from media_scan import PRUNE_DIRS, VIDEO_EXTENSIONS
+
+# --- Config (override with env) ---
+MEDIA_BASE = os.environ.get("MEDIA_BASE", "/mnt/media-storage")
+DEFAULT_ROOTS = [
+    os.environ.get("MOVIES_DIR", os.path.join(MEDIA_BASE, "movies")),
+    os.environ.get("TV_DIR", os.path.join(MEDIA_BASE, "tvshows")),
+    os.environ.get("DOWNLOADS_DIR", os.path.join(MEDIA_BASE, "downloads")),
+]
+# Keep the database on local disk: SQLite's WAL mode does not work over NFS.
+DB_PATH = Path(os.environ.get("MEDIA_INVENTORY_DB", "/var/lib/media-stack/inventory.db"))
+AUDIO_EXTENSIONS = frozenset({".flac", ".mp3", ".m4a", ".ogg", ".opus", ".wav", ".aac", ".wma"})
+SUBTITLE_EXTENSIONS = frozenset({".srt", ".ass", ".ssa", ".sub", ".idx", ".vtt"})
+# A directory modified this close to the refresh may change again within the same mtime tick
+# (NFS servers often keep 1 s resolution); its mtime is not stored, so the next refresh re-lists it.
+RACY_NS = 2_000_000_000
+_COMMIT_EVERY = 500  # re-listed directories per transaction, so other jobs are not locked out for long
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS dirs (
+    path TEXT PRIMARY KEY,
+    mtime_ns INTEGER
+);
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    dir TEXT NOT NULL,
+    name TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    inode INTEGER NOT NULL,
+    kind TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS files_dir ON files(dir);
+CREATE INDEX IF NOT EXISTS files_kind_size ON files(kind, size);
+CREATE INDEX IF NOT EXISTS files_size_name ON files(size, name);
+"""
+
+
+class RefreshStats(NamedTuple):
+    dirs: int  # directories visited (one stat each)
+    listed: int  # directories re-listed because their mtime changed
+    updated: int  # file rows added or changed
+    removed: int  # file rows dropped
+
+    def __add__(self, other: RefreshStats) -> RefreshStats:  # type: ignore[override]
+        return RefreshStats(*(a + b for a, b in zip(self, other)))
+
+
+def kind_of(name: str) -> str:
+    """Classify a file name as video, audio, subtitle or other by extension."""
+    ext = os.path.splitext(name)[1].lower()
+    if ext in VIDEO_EXTENSIONS:
+        return "video"
+    if ext in AUDIO_EXTENSIONS:
+        return "audio"
+    if ext in SUBTITLE_EXTENSIONS:
+        return "subtitle"
+    return "other"
+
+
+def _under(column: str, roots: Iterable[str | os.PathLike]) -> tuple[str, list[str]]:
+    """SQL condition and parameters matching paths strictly below any of roots (all paths if none)."""
+    clauses, params = [], []
+    for root in roots:
+        prefix = os.path.join(os.path.abspath(root), "")
+        # Range scan on the primary key: '0' is the character right after '/'.
+        clauses.append(f"({column} >= ? AND {column} < ?)")
+        params += [prefix, prefix[:-1] + "0"]
+    return ("(" + " OR ".join(clauses) + ")" if clauses else "1"), params
+
+
+class Inventory:
+    """File inventory in SQLite; one connection per instance, usable as a context manager."""
+
+    def __init__(self, db_path: str | os.PathLike = DB_PATH):
+        Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        self.db = sqlite3.connect(db_path, timeout=60)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.executescript(_SCHEMA)
+
+    def close(self) -> None:
+        self.db.close()
+
+    def __enter__(self) -> Inventory:
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    # --- Refresh ---
+
+    def refresh(
+        self,
+        roots: Iterable[str | os.PathLike] = DEFAULT_ROOTS,
+        full: bool = False,
+        prune: Collection[str] = PRUNE_DIRS,
+    ) -> RefreshStats:
+        """Bring the rows under each root up to date. Unchanged directories are not listed unless
+        full is set. A root that is missing or not a directory has its rows dropped."""
+        stats = RefreshStats(0, 0, 0, 0)
+        for root in roots:
+            stats += self._refresh_root(os.path.abspath(root), full, prune)
+        return stats
+
+    def _refresh_root(self, root: str, full: bool, prune: Collection[str]) -> RefreshStats:
+        cond, params = _under("path", [root])
+        known: dict[str, int | None] = dict(self.db.execute(f"SELECT path, mtime_ns FROM dirs WHERE path = ? OR {cond}", [root, *params]))
+        children: dict[str, list[str]] = {}
+        for path in known:
+            if path != root:
+                children.setdefault(os.path.dirname(path), []).append(path)
+        if not os.path.isdir(root):
+            with self.db:
+                return RefreshStats(0, 0, 0, self._drop_tree(root))
+
+        racy_after = time.time_ns() - RACY_NS
+        dirs = listed = updated = removed = 0
+        stack = [root]
+        try:
+            while stack:
+                directory = stack.pop()
+                try:
+                    # The root may be a symlink (e.g. to a mount); below it nothing is followed.
+                    mtime = os.stat(directory, follow_symlinks=directory == root).st_mtime_ns
+                except OSError:
+                    continue  # vanished after its parent was listed; the parent's new mtime drops it next time
+                dirs += 1
+                if not full and known.get(directory) == mtime:
+                    stack.extend(children.get(directory, ()))
+                    continue
+                result = self._relist(directory, None if mtime >= racy_after else mtime, children, prune)
+                if result is None:
+                    continue
+                subdirs, n_updated, n_removed = result
+                stack.extend(subdirs)
+                listed += 1
+                updated += n_updated
+                removed += n_removed
+                if listed % _COMMIT_EVERY == 0:
+                    self.db.commit()
+        finally:
+            # Each directory's files and its mtime are written between commits, never split.
+            self.db.commit()
+        return RefreshStats(dirs, listed, updated, removed)
+
+    def _relist(
+        self, directory: str, mtime: int | None, children: dict[str, list[str]], prune: Collection[str]
+    ) -> tuple[list[str], int, int] | None:
+        """List one directory and sync its file rows; return (subdirs, updated, removed) or None if unreadable.
+
+        An unreadable directory keeps its file rows and is marked for a retry on the next refresh."""
+        subdirs: list[str] = []
+        rows: list[tuple] = []
+        try:
+            with os.scandir(directory) as it:
+                for entry in it:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            if entry.name not in prune:
+                                subdirs.append(entry.path)
+                            continue
+                        if not entry.is_file(follow_symlinks=False):
+                            continue
+                        st = entry.stat(follow_symlinks=False)
+                    except OSError:
+                        continue
+                    rows.append((entry.path, directory, entry.name, st.st_size, st.st_mtime_ns, st.st_ino, kind_of(entry.name)))
+        except OSError:
+            # Keep a row with no mtime so the directory is visited, and retried, on every refresh
+            # until it can be listed; without one an unchanged parent would never lead back to it.
+            self.db.execute("INSERT OR REPLACE INTO dirs VALUES (?, NULL)", (directory,))
+            return None
+        old = {path: rest for path, *rest in self.db.execute("SELECT path, size, mtime_ns, inode FROM files WHERE dir = ?", (directory,))}
+        changed = [row for row in rows if old.get(row[0]) != [row[3], row[4], row[5]]]
+        gone = old.keys() - {row[0] for row in rows}
+        self.db.executemany("INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?, ?, ?)", changed)
+        self.db.executemany("DELETE FROM files WHERE path = ?", [(path,) for path in gone])
+        removed = len(gone)
+        for sub in set(children.get(directory, ())) - set(subdirs):
+            removed += self._drop_tree(sub)
+        self.db.execute("INSERT OR REPLACE INTO dirs VALUES (?, ?)", (directory, mtime))
+        return subdirs, len(changed), removed
+
+    def _drop_tree(self, directory: str) -> int:
+        """Delete a directory's rows and everything below it; return the number of file rows dropped."""
+        cond, params = _under("path", [directory])
+        self.db.execute(f"DELETE FROM dirs WHERE path = ? OR {cond}", [directory, *params])
+        return self.db.execute(f"DELETE FROM files WHERE {cond}", params).rowcount
+
+    # --- Queries ---
+
+    def largest(
+        self,
+        n: int,
+        roots: Iterable[str | os.PathLike] = (),
+        min_size: int = 0,
+        kind: str = "video",
+        exclude: Collection[str] = (),
+    ) -> list[tuple[int, Path]]:
+        """Return up to n (size_bytes, path) pairs, largest first, for files of kind under roots
+        (anywhere if none) of at least min_size bytes. Paths in exclude (path strings) are skipped."""
+        if n <= 0:
+            return []
+        cond, params = _under("path", roots)
+        rows = self.db.execute(
+            f"SELECT size, path FROM files WHERE kind = ? AND size >= ? AND {cond} ORDER BY size DESC",
+            [kind, min_size, *params],
+        )
+        top: list[tuple[int, Path]] = []
+        for size, path in rows:
+            if path in exclude:
+                continue
+            top.append((size, Path(path)))
+            if len(top) >= n:
+                break
+        return top
+
+    def find(self, size: int, name: str, roots: Iterable[str | os.PathLike] = ()) -> list[Path]:
+        """Return paths under roots (anywhere if none) of files with this size and basename."""
+        cond, params = _under("path", roots)
+        rows = self.db.execute(f"SELECT path FROM files WHERE size = ? AND name = ? AND {cond} ORDER BY path", [size, name, *params])
+        return [Path(path) for (path,) in rows]
+
+    def keys(self, roots: Iterable[str | os.PathLike] = (), kind: str = "video") -> list[tuple[int, str]]:
+        """Return the distinct (size_bytes, basename) pairs of files of kind under roots, sorted."""
+        cond, params = _under("path", roots)
+        return self.db.execute(f"SELECT DISTINCT size, name FROM files WHERE kind = ? AND {cond} ORDER BY size, name", [kind, *params]).fetchall()
+
+    def duplicates(
+        self,
+        roots: Iterable[str | os.PathLike],
+        of: Iterable[str | os.PathLike],
+        kind: str = "video",
+    ) -> list[tuple[int, Path]]:
+        """Return (size_bytes, path) for files of kind under roots whose size and basename match a
+        file of the same kind under of (e.g. downloads that are already in the library)."""
+        cond, params = _under("f.path", roots)
+        of_cond, of_params = _under("g.path", of)
+        rows = self.db.execute(
+            f"SELECT f.size, f.path FROM files f WHERE f.kind = ? AND {cond} AND EXISTS ("
+            f"SELECT 1 FROM files g WHERE g.size = f.size AND g.name = f.name AND g.kind = f.kind AND g.path != f.path AND {of_cond}"
+            f") ORDER BY f.path",
+            [kind, *params, *of_params],
+        )
+        return [(size, Path(path)) for size, path in rows]
+
+
+# --- CLI ---
+
+
+def _read_lines(path: str) -> set[str]:
+    try:
+        return {line.strip() for line in Path(path).read_text().splitlines() if line.strip()}
+    except OSError:
+        return set()
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Incremental SQLite inventory of the media library and downloads.")
+    parser.add_argument("--db", default=str(DB_PATH), help=f"Inventory database (default {DB_PATH})")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("refresh", help="Re-list directories whose mtime changed")
+    p.add_argument("--full", action="store_true", help="Re-list every directory (catches files rewritten in place)")
+    p.add_argument("roots", nargs="*", metavar="ROOT", help="Directories to refresh (default: movies, tvshows, downloads)")
+
+    p = sub.add_parser("largest", help="Print the N largest files as SIZE PATH")
+    p.add_argument("-n", type=int, default=1)
+    p.add_argument("--min-size", type=int, default=0, metavar="BYTES")
+    p.add_argument("--kind", default="video", choices=("video", "audio", "subtitle", "other"))
+    p.add_argument("--exclude", action="append", default=[], metavar="PATH", help="Skip this path (repeatable)")
+    p.add_argument("--exclude-file", action="append", default=[], metavar="FILE", help="Skip paths listed in FILE, one per line (e.g. the claim file)")
+    p.add_argument("--refresh", action="store_true", help="Refresh the roots first")
+    p.add_argument("roots", nargs="+", metavar="ROOT")
+
+    p = sub.add_parser("duplicates", help="Print SIZE PATH for files under ROOT whose size and basename match a file under --of")
+    p.add_argument("--of", action="append", required=True, metavar="DIR", help="Directory to match against (repeatable)")
+    p.add_argument("--kind", default="video", choices=("video", "audio", "subtitle", "other"))
+    p.add_argument("--refresh", action="store_true", help="Refresh ROOT and --of directories first")
+    p.add_argument("roots", nargs="+", metavar="ROOT")
+
+    p = sub.add_parser("keys", help="Print SIZE BASENAME for each distinct file under ROOT")
+    p.add_argument("--kind", default="video", choices=("video", "audio", "subtitle", "other"))
+    p.add_argument("--refresh", action="store_true", help="Refresh the roots first")
+    p.add_argument("roots", nargs="+", metavar="ROOT")
+
+    p = sub.add_parser("find", help="Print SIZE PATH for files with this size and basename")
+    p.add_argument("--size", type=int, required=True, metavar="BYTES")
+    p.add_argument("--name", required=True, metavar="BASENAME")
+    p.add_argument("--refresh", action="store_true", help="Refresh the roots first")
+    p.add_argument("roots", nargs="*", metavar="ROOT")
+    args = parser.parse_args()
+
+    with Inventory(args.db) as inv:
+        if args.command == "refresh" or args.refresh:
+            roots = args.roots or DEFAULT_ROOTS
+            if args.command == "duplicates":
+                roots = [*args.roots, *args.of]
+            start = time.monotonic()
+            s = inv.refresh(roots, full=getattr(args, "full", False))
+            print(
+                f"Inventory refreshed in {time.monotonic() - start:.1f}s: {s.dirs} dirs, {s.listed} re-listed, "
+                f"{s.updated} files updated, {s.removed} removed",
+                file=sys.stderr,
+            )
+        if args.command == "largest":
+            exclude = set(args.exclude).union(*(_read_lines(f) for f in args.exclude_file))
+            lines = [f"{size} {path}" for size, path in inv.largest(args.n, args.roots, args.min_size, args.kind, exclude)]
+        elif args.command == "duplicates":
+            lines = [f"{size} {path}" for size, path in inv.duplicates(args.roots, args.of, args.kind)]
+        elif args.command == "keys":
+            lines = [f"{size} {name}" for size, name in inv.keys(args.roots, args.kind)]
+        elif args.command == "find":
+            lines = [f"{args.size} {path}" for path in inv.find(args.size, args.name, args.roots)]
+        else:
+            lines = []
+    if lines:
+        sys.stdout.write("\n".join(lines) + "\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,86 @@
+"""
+Single-pass video file scanner. replace-movie-with-smaller uses it to find the main video inside
+a finished download (find_main_video); library-wide scans go through media_inventory, which
+shares VIDEO_EXTENSIONS and PRUNE_DIRS from here.
+
+Walks a tree once with os.scandir, prunes compress work directories while descending, stats
+only files with a video extension, and keeps the N largest in a bounded heap. Directory
+symlinks are not followed; file symlinks are, and are returned as their resolved target.
+Pass a resolved root to get resolved paths throughout.
+
+    from media_scan import largest_files
+    for size, path in largest_files("/mnt/media-storage/movies", 5, min_size=3 * 1024**3):
+        ...
+"""
+from __future__ import annotations
+
+import heapq
+import os
+from collections.abc import Collection, Iterator
+from pathlib import Path
+
+VIDEO_EXTENSIONS = frozenset({".mkv", ".mp4", ".avi", ".m4v", ".mov"})
+# Work directories of compress-media-nightly; never descend into them.
+PRUNE_DIRS = frozenset({".compress-backup", ".compress-temp"})
+
+
+def iter_files(
+    root: str | os.PathLike,
+    extensions: Collection[str] | None = VIDEO_EXTENSIONS,
+    prune: Collection[str] = PRUNE_DIRS,
+) -> Iterator[tuple[int, str]]:
+    """Yield (size_bytes, path) for regular files under root whose lowercased extension is in
+    extensions (None = all files). Unreadable directories and vanished files are skipped."""
+    stack = [os.fspath(root)]
+    while stack:
+        directory = stack.pop()
+        try:
+            it = os.scandir(directory)
+        except OSError:
+            continue
+        with it:
+            for entry in it:
+                try:
+                    # d_type from readdir: no stat call needed to tell directories from files.
+                    if entry.is_dir(follow_symlinks=False):
+                        if entry.name not in prune:
+                            stack.append(entry.path)
+                        continue
+                    if extensions is not None and os.path.splitext(entry.name)[1].lower() not in extensions:
+                        continue
+                    if not entry.is_file():
+                        continue
+                    size = entry.stat().st_size  # cached on the entry; the only stat per candidate
+                except OSError:
+                    continue
+                path = entry.path
+                if entry.is_symlink():
+                    path = os.path.realpath(path)
+                yield size, path
+
+
+def largest_files(
+    root: str | os.PathLike,
+    n: int,
+    min_size: int = 0,
+    exclude: Collection[str] = (),
+    extensions: Collection[str] | None = VIDEO_EXTENSIONS,
+    prune: Collection[str] = PRUNE_DIRS,
+) -> list[tuple[int, Path]]:
+    """Return up to n (size_bytes, path) pairs, largest first, for files of at least min_size bytes.
+    Paths in exclude (resolved path strings) are skipped. Pass a resolved root to get resolved paths."""
+    if n <= 0:
+        return []
+    heap: list[tuple[int, str]] = []
+    kept: set[str] = set()  # a file symlink resolves to a path that may also be listed directly
+    for size, path in iter_files(root, extensions, prune):
+        if size < min_size or path in exclude or path in kept:
+            continue
+        if len(heap) < n:
+            heapq.heappush(heap, (size, path))
+        elif size > heap[0][0]:
+            kept.discard(heapq.heapreplace(heap, (size, path))[1])
+        else:
+            continue
+        kept.add(path)
+    return [(size, Path(path)) for size, path in sorted(heap, reverse=True)]
@@ -0,0 +1,227 @@
+"""
+Prometheus-style instrumentation for the media-stack FastAPI apps (no client library needed).
+
+    import metrics
+    metrics.instrument(app)          # GET /metrics, per-route latency, in-flight, event-loop lag
+
+    with metrics.timed("apibay", "/q.php") as call:   # outbound call latency per upstream/endpoint
+        ...
+        call.error("http_503")                        # exceptions are counted automatically
+
+Values are per process: with several uvicorn workers each one reports its own series.
+Shared by media-requests and music-requests-chat: their run.sh / systemd units put the repo
+root on PYTHONPATH, and the media-requests image copies it in (built from the repo root).
+"""
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+
+from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+LOOP_LAG_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+LOOP_LAG_INTERVAL = 0.5  # seconds between event-loop lag probes
+
+_LE_INF = 'le="+Inf"'
+_lock = threading.Lock()  # histograms may be fed from worker threads
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names: tuple[str, ...], values: tuple, extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help_text: str, labels: tuple[str, ...] = ()):
+        self.name = name
+        self.help = help_text
+        self.label_names = labels
+        self._values: dict[tuple, object] = {}
+        _REGISTRY.append(self)
+
+    def _header(self) -> list[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, *labels, amount: float = 1.0) -> None:
+        with _lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def render(self) -> list[str]:
+        with _lock:
+            items = sorted(self._values.items())
+        lines = self._header()
+        for labels, value in items:
+            lines.append(f"{self.name}{_labels(self.label_names, labels)} {value:g}")
+        return lines
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, *labels, amount: float = 1.0) -> None:
+        self.inc(*labels, amount=-amount)
+
+    def set(self, *labels, value: float) -> None:
+        with _lock:
+            self._values[labels] = value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labels: tuple[str, ...] = (), buckets: tuple[float, ...] = LATENCY_BUCKETS):
+        super().__init__(name, help_text, labels)
+        self.buckets = buckets
+
+    def observe(self, *labels, value: float) -> None:
+        with _lock:
+            entry = self._values.get(labels)
+            if entry is None:
+                entry = self._values[labels] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    entry[0][i] += 1
+                    break
+            entry[1] += value
+            entry[2] += 1
+
+    def render(self) -> list[str]:
+        # Bucket lists are updated in place, so copy them while holding the lock.
+        with _lock:
+            items = sorted((labels, (list(counts), total, n)) for labels, (counts, total, n) in self._values.items())
+        lines = self._header()
+        bounds = [f'le="{b:g}"' for b in self.buckets]
+        for labels, (counts, total, n) in items:
+            cumulative = 0
+            for le, c in zip(bounds, counts):
+                cumulative += c
+                lines.append(f"{self.name}_bucket{_labels(self.label_names, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_bucket{_labels(self.label_names, labels, _LE_INF)} {n}")
+            lines.append(f"{self.name}_sum{_labels(self.label_names, labels)} {total:.6f}")
+            lines.append(f"{self.name}_count{_labels(self.label_names, labels)} {n}")
+        return lines
+
+
+_REGISTRY: list[_Metric] = []
+
+http_requests = Counter("http_requests_total", "HTTP requests handled.", ("method", "route", "status"))
+http_latency = Histogram("http_request_duration_seconds", "HTTP request latency until the response is fully sent.", ("method", "route"))
+http_in_flight = Gauge("http_requests_in_flight", "HTTP requests currently being handled.")
+upstream_latency = Histogram("upstream_request_duration_seconds", "Outbound call latency.", ("upstream", "endpoint"))
+upstream_errors = Counter("upstream_errors_total", "Outbound calls that failed.", ("upstream", "endpoint", "kind"))
+upstream_in_flight = Gauge("upstream_requests_in_flight", "Outbound calls currently in progress.", ("upstream",))
+loop_lag = Histogram("event_loop_lag_seconds", f"How late the event loop ran a timer scheduled every {LOOP_LAG_INTERVAL:g} s.", buckets=LOOP_LAG_BUCKETS)
+
+
+def error_kind(exc: BaseException | type) -> str:
+    """Label for a failed call: "timeout" for any timeout (asyncio, httpx, requests), "http_<status>" for
+    raise_for_status() errors, else the exception name."""
+    status = getattr(getattr(exc, "response", None), "status_code", None)
+    if status is not None:
+        return f"http_{status}"
+    cls = exc if isinstance(exc, type) else type(exc)
+    return "timeout" if issubclass(cls, TimeoutError) or "Timeout" in cls.__name__ else cls.__name__
+
+
+class timed:
+    """Context manager timing one outbound call; any exception leaving the block counts as an error."""
+
+    def __init__(self, upstream: str, endpoint: str):
+        self.upstream = upstream
+        self.endpoint = endpoint
+        self._failed = False
+
+    def error(self, kind: str) -> None:
+        if not self._failed:
+            self._failed = True
+            upstream_errors.inc(self.upstream, self.endpoint, kind)
+
+    def __enter__(self) -> timed:
+        self._start = time.perf_counter()
+        upstream_in_flight.inc(self.upstream)
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        upstream_in_flight.dec(self.upstream)
+        if exc_type is not None and not issubclass(exc_type, asyncio.CancelledError):
+            self.error(error_kind(exc if exc is not None else exc_type))
+        upstream_latency.observe(self.upstream, self.endpoint, value=time.perf_counter() - self._start)
+
+
+def count_error(upstream: str, endpoint: str, kind: str) -> None:
+    """Record a failure that never reached the upstream (e.g. rejected by a circuit breaker)."""
+    upstream_errors.inc(upstream, endpoint, kind)
+
+
+def render() -> str:
+    lines: list[str] = []
+    for metric in _REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+async def _watch_loop_lag() -> None:
+    loop = asyncio.get_running_loop()
+    while True:
+        start = loop.time()
+        await asyncio.sleep(LOOP_LAG_INTERVAL)
+        loop_lag.observe(value=max(0.0, loop.time() - start - LOOP_LAG_INTERVAL))
+
+
+class _MetricsMiddleware:
+    """Pure ASGI middleware (streaming responses are timed until their last chunk)."""
+
+    def __init__(self, app):
+        self.app = app
+        self._lag_task: asyncio.Task | None = None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        # The apps own their lifespan, so the lag probe starts with the first request instead.
+        if self._lag_task is None or self._lag_task.done():
+            self._lag_task = asyncio.create_task(_watch_loop_lag())
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        start = time.perf_counter()
+        http_in_flight.inc()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            http_in_flight.dec()
+            # Route templates (/api/jobs/{job_id}) keep label cardinality bounded.
+            route = getattr(scope.get("route"), "path", None) or "other"
+            method = scope.get("method", "")
+            http_requests.inc(method, route, str(status))
+            http_latency.observe(method, route, value=time.perf_counter() - start)
+
+
+async def _metrics_endpoint(request) -> PlainTextResponse:
+    return PlainTextResponse(render(), media_type="text/plain; version=0.0.4")
+
+
+def instrument(app: FastAPI, path: str = "/metrics") -> None:
+    """Add request metrics middleware and the scrape endpoint to app."""
+    app.add_middleware(_MetricsMiddleware)
+    app.add_route(path, _metrics_endpoint, include_in_schema=False)
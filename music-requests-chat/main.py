@@ -7,25 +7,93 @@ from __future__ import annotations
 
 import asyncio
 import base64
+import json
 import os
 import re
+import sqlite3
+import threading
+import time
+import urllib.parse
 import uuid
+from collections import OrderedDict
+from contextlib import asynccontextmanager
 from pathlib import Path
 
 import requests
 from fastapi import FastAPI, HTTPException, Request, Response
-from fastapi.responses import FileResponse, HTMLResponse
+from fastapi.responses import FileResponse, HTMLResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from pydantic import BaseModel
 
+import metrics
+from matching import best_album, best_artist
+
 try:
     import httpx
 except ImportError:  # pragma: no cover - exercised only in minimal environments
     httpx = None  # type: ignore
 
+try:
+    from cryptography.fernet import Fernet, InvalidToken
+except ImportError:  # pragma: no cover - only the memory session backend works without it
+    Fernet = None  # type: ignore
+
 BACKEND_URL = os.environ.get("MUSIC_REQUESTS_BACKEND_URL", "http://127.0.0.1:8001").rstrip("/")
 SESSION_COOKIE = "music_chat_session"
-SESSION_STORE: dict[str, dict] = {}  # session_id -> { username, password, pending_*, ... }
+SESSION_MAX_AGE = 7 * 24 * 3600  # absolute lifetime; matches the cookie max_age
+SESSION_IDLE_TTL = float(os.environ.get("MUSIC_CHAT_SESSION_IDLE_TTL", str(3 * 24 * 3600)))  # evict after this long unused
+SESSION_TOUCH_INTERVAL = 60.0  # don't rewrite last_seen more often than this
+SESSION_SWEEP_INTERVAL = 600.0
+# "sqlite" (default; shared by all uvicorn workers) or "memory" (single worker).
+SESSION_BACKEND = os.environ.get("MUSIC_CHAT_SESSION_BACKEND", "sqlite").strip().lower()
+SESSION_DB = Path(os.environ.get("MUSIC_CHAT_SESSION_DB", str(Path(__file__).resolve().parent / "sessions.db")))
+# Fernet key that encrypts session records at rest (they carry Airsonic passwords). Set
+# MUSIC_CHAT_SESSION_KEY, or a key is generated once into MUSIC_CHAT_SESSION_KEY_FILE.
+SESSION_KEY = os.environ.get("MUSIC_CHAT_SESSION_KEY", "").strip()
+SESSION_KEY_FILE = Path(os.environ.get("MUSIC_CHAT_SESSION_KEY_FILE", str(SESSION_DB.with_suffix(".key"))))
+BULK_CONCURRENCY = int(os.environ.get("MUSIC_CHAT_BULK_CONCURRENCY", "5"))  # artists processed at once
+BULK_ARTIST_TIMEOUT = float(os.environ.get("MUSIC_CHAT_BULK_ARTIST_TIMEOUT", "90"))  # seconds per artist
+BULK_MAX_ARTISTS = 30  # per chat turn; longer lists can continue as a background job
+BULK_JOB_RETENTION = 24 * 3600  # seconds finished background jobs stay queryable
+# Every artist finishes within BULK_ARTIST_TIMEOUT, so a running job with no progress for this
+# long died with its worker (restart or crash).
+BULK_JOB_STALL = 2 * BULK_ARTIST_TIMEOUT + 60
+HTTP_MAX_CONNECTIONS = int(os.environ.get("MUSIC_CHAT_HTTP_MAX_CONNECTIONS", "50"))  # whole pool
+HTTP_MAX_PER_HOST = int(os.environ.get("MUSIC_CHAT_HTTP_MAX_PER_HOST", "20"))  # concurrent requests to one host
+HTTP_CONNECT_TIMEOUT = 5.0
+# Read timeouts per backend route (seconds); anything else uses the caller's default.
+ROUTE_TIMEOUTS: dict[str, float] = {
+    "/api/login": 15.0,
+    "/api/artists": 20.0,
+    "/api/albums": 20.0,
+    "/api/search-tpb": 45.0,
+    "/api/search-youtube": 60.0,
+    "/api/playlist-preview": 60.0,
+    "/api/archive-preview": 60.0,
+    "/api/add-torrent": 30.0,
+    "/api/rip-youtube": 60.0,
+}
+# Response cache TTLs (seconds) for backend GETs, shared by all sessions; routes not listed
+# use BACKEND_CACHE_DEFAULT_TTL. Add-torrent and rip POSTs are never cached.
+BACKEND_CACHE_TTLS: dict[str, float] = {
+    "/api/artists": 3600.0,
+    "/api/albums": 3600.0,
+    "/api/search-tpb": 600.0,
+    "/api/search-youtube": 600.0,
+    "/api/playlist-preview": 600.0,
+    "/api/archive-preview": 600.0,
+}
+BACKEND_CACHE_DEFAULT_TTL = 300.0
+BACKEND_CACHE_SIZE = int(os.environ.get("MUSIC_CHAT_CACHE_SIZE", "1024"))
+# Per-route circuit breaker: open after this many consecutive failures (errors, timeouts, 5xx),
+# fail fast while open, then let a single half-open probe through after the reset interval.
+BREAKER_FAILURES = int(os.environ.get("MUSIC_CHAT_BREAKER_FAILURES", "5"))
+BREAKER_RESET = float(os.environ.get("MUSIC_CHAT_BREAKER_RESET", "30"))  # seconds
+
+# App-scoped HTTP clients (keep-alive pools); opened lazily, closed in lifespan.
+_http_client = None  # httpx.AsyncClient
+_requests_session: requests.Session | None = None
+_host_slots: dict[str, asyncio.Semaphore] = {}
 
 
 def _auth_headers(username: str, password: str) -> dict[str, str]:
@@ -34,6 +102,234 @@ def _auth_headers(username: str, password: str) -> dict[str, str]:
     return {"Authorization": f"Basic {b64}"}
 
 
+def _route_of(path: str, table: dict[str, float]) -> str:
+    """The table key for a backend path (/api/albums/{id} matches /api/albums), or the path itself."""
+    for route in table:
+        if path == route or path.startswith(route + "/"):
+            return route
+    return path
+
+
+def _route_timeout(path: str, default: float) -> float:
+    return ROUTE_TIMEOUTS.get(_route_of(path, ROUTE_TIMEOUTS), default)
+
+
+class _ResponseCache:
+    """LRU cache of backend GET responses with a TTL per route and per-route hit/miss counters."""
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._data: OrderedDict[tuple, tuple[float, dict | list]] = OrderedDict()
+        self.counters: dict[str, dict[str, int]] = {}
+
+    @staticmethod
+    def key(path: str, params: dict | None) -> tuple:
+        return (path, tuple(sorted((k, str(v)) for k, v in (params or {}).items())))
+
+    def _count(self, route: str, field: str) -> None:
+        counts = self.counters.setdefault(route, {"hits": 0, "misses": 0})
+        counts[field] += 1
+
+    def get(self, key: tuple, route: str):
+        entry = self._data.get(key)
+        if entry is not None and entry[0] > time.monotonic():
+            self._data.move_to_end(key)
+            self._count(route, "hits")
+            return entry[1]
+        if entry is not None:
+            del self._data[key]
+        self._count(route, "misses")
+        return None
+
+    def set(self, key: tuple, value: dict | list, ttl: float) -> None:
+        self._data[key] = (time.monotonic() + ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def stats(self) -> dict:
+        routes = {}
+        for route, c in self.counters.items():
+            total = c["hits"] + c["misses"]
+            routes[route] = {**c, "hit_rate": round(c["hits"] / total, 3) if total else 0.0}
+        return {"size": len(self._data), "maxsize": self.maxsize, "routes": routes}
+
+
+_backend_cache = _ResponseCache(BACKEND_CACHE_SIZE)
+
+
+class _SingleFlight:
+    """Merge identical concurrent calls into one task. The task is cancelled once nobody waits on it."""
+
+    def __init__(self):
+        self._calls: dict[tuple, list] = {}  # key -> [task, waiters]
+        self.coalesced = 0
+
+    def pending(self, key: tuple) -> bool:
+        return key in self._calls
+
+    def _forget(self, key: tuple, task: asyncio.Task) -> None:
+        entry = self._calls.get(key)
+        if entry is not None and entry[0] is task:
+            del self._calls[key]
+        if not task.cancelled():
+            task.exception()  # retrieved here so an unawaited failure isn't logged as lost
+
+    async def do(self, key: tuple, factory):
+        entry = self._calls.get(key)
+        if entry is None:
+            task = asyncio.create_task(factory())
+            entry = self._calls[key] = [task, 0]
+            task.add_done_callback(lambda t: self._forget(key, t))
+        else:
+            self.coalesced += 1
+        entry[1] += 1
+        try:
+            return await asyncio.shield(entry[0])
+        finally:
+            entry[1] -= 1
+            if entry[1] == 0 and not entry[0].done():
+                entry[0].cancel()
+
+    def stats(self) -> dict:
+        return {"in_flight": len(self._calls), "coalesced": self.coalesced}
+
+
+class _BackendUnavailable(Exception):
+    """Raised without calling the backend while a route's circuit is open."""
+
+    def __init__(self, route: str, retry_in: float):
+        super().__init__(f"The music server isn't responding right now ({route}); try again in {max(1, round(retry_in))} s.")
+        self.route = route
+
+
+class _CircuitBreaker:
+    """Per-route closed → open → half-open breaker (state is per process)."""
+
+    def __init__(self, failures: int, reset: float):
+        self.failures = failures
+        self.reset = reset
+        self._routes: dict[str, dict] = {}
+
+    def _get(self, route: str) -> dict:
+        st = self._routes.get(route)
+        if st is None:
+            st = self._routes[route] = {"state": "closed", "failures": 0, "opened_at": 0.0, "probing": False, "rejected": 0}
+        return st
+
+    def before(self, route: str) -> None:
+        """Admit a call or raise _BackendUnavailable. In half-open only one probe is in flight."""
+        st = self._get(route)
+        if st["state"] == "open":
+            retry_in = st["opened_at"] + self.reset - time.monotonic()
+            if retry_in > 0:
+                st["rejected"] += 1
+                raise _BackendUnavailable(route, retry_in)
+            st["state"] = "half_open"
+        if st["state"] == "half_open":
+            if st["probing"]:
+                st["rejected"] += 1
+                raise _BackendUnavailable(route, 1)
+            st["probing"] = True
+
+    def success(self, route: str) -> None:
+        self._get(route).update(state="closed", failures=0, probing=False)
+
+    def failure(self, route: str) -> None:
+        st = self._get(route)
+        st["failures"] += 1
+        st["probing"] = False
+        if st["state"] == "half_open" or st["failures"] >= self.failures:
+            st["state"] = "open"
+            st["opened_at"] = time.monotonic()
+
+    def release(self, route: str) -> None:
+        """The call was abandoned (cancelled) without an outcome."""
+        self._get(route)["probing"] = False
+
+    def stats(self) -> dict:
+        now = time.monotonic()
+        out = {}
+        for route, st in self._routes.items():
+            out[route] = {"state": st["state"], "failures": st["failures"], "rejected": st["rejected"]}
+            if st["state"] == "open":
+                out[route]["retry_in"] = round(max(0.0, st["opened_at"] + self.reset - now), 1)
+        return out
+
+
+_backend_flights = _SingleFlight()
+_breaker = _CircuitBreaker(BREAKER_FAILURES, BREAKER_RESET)
+
+
+async def _guarded(path: str, call):
+    """Run call() (one HTTP request to the backend) through the route's circuit breaker."""
+    route = _route_of(path, ROUTE_TIMEOUTS)
+    try:
+        _breaker.before(route)
+    except _BackendUnavailable:
+        metrics.count_error("backend", route, "circuit_open")
+        raise
+    try:
+        with metrics.timed("backend", route) as timing:
+            r = await call()
+            if r.status_code >= 500:
+                timing.error(f"http_{r.status_code}")
+    except asyncio.CancelledError:
+        _breaker.release(route)
+        raise
+    except Exception:
+        _breaker.failure(route)
+        raise
+    if r.status_code >= 500:
+        _breaker.failure(route)
+    else:
+        _breaker.success(route)
+    return r
+
+
+def _get_http_client():
+    global _http_client
+    if _http_client is None or _http_client.is_closed:
+        _http_client = httpx.AsyncClient(
+            timeout=httpx.Timeout(60.0, connect=HTTP_CONNECT_TIMEOUT),
+            limits=httpx.Limits(
+                max_connections=HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=HTTP_MAX_PER_HOST,
+                keepalive_expiry=30.0,
+            ),
+        )
+    return _http_client
+
+
+def _get_requests_session() -> requests.Session:
+    global _requests_session
+    if _requests_session is None:
+        _requests_session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=HTTP_MAX_PER_HOST)
+        _requests_session.mount("http://", adapter)
+        _requests_session.mount("https://", adapter)
+    return _requests_session
+
+
+def _host_slot(url: str) -> asyncio.Semaphore:
+    """Per-host concurrency cap (the pool limit alone is shared by all hosts)."""
+    host = urllib.parse.urlsplit(url).netloc
+    slot = _host_slots.get(host)
+    if slot is None:
+        slot = _host_slots[host] = asyncio.Semaphore(HTTP_MAX_PER_HOST)
+    return slot
+
+
+async def _close_http_clients() -> None:
+    global _http_client, _requests_session
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
+    if _requests_session is not None:
+        _requests_session.close()
+        _requests_session = None
+
+
 async def _http_get(
     url: str,
     *,
@@ -41,16 +337,21 @@ async def _http_get(
     headers: dict[str, str] | None = None,
     timeout: float = 30.0,
 ):
-    if httpx is not None:
-        async with httpx.AsyncClient(timeout=timeout) as client:
-            return await client.get(url, params=params or {}, headers=headers or {})
-    return await asyncio.to_thread(
-        requests.get,
-        url,
-        params=params or {},
-        headers=headers or {},
-        timeout=timeout,
-    )
+    async with _host_slot(url):
+        if httpx is not None:
+            return await _get_http_client().get(
+                url,
+                params=params or {},
+                headers=headers or {},
+                timeout=httpx.Timeout(timeout, connect=HTTP_CONNECT_TIMEOUT),
+            )
+        return await asyncio.to_thread(
+            _get_requests_session().get,
+            url,
+            params=params or {},
+            headers=headers or {},
+            timeout=(HTTP_CONNECT_TIMEOUT, timeout),
+        )
 
 
 async def _http_post(
@@ -60,25 +361,54 @@ async def _http_post(
     headers: dict[str, str] | None = None,
     timeout: float = 60.0,
 ):
-    if httpx is not None:
-        async with httpx.AsyncClient(timeout=timeout) as client:
-            return await client.post(url, json=json_body or {}, headers=headers or {})
-    return await asyncio.to_thread(
-        requests.post,
-        url,
-        json=json_body or {},
-        headers=headers or {},
-        timeout=timeout,
-    )
+    async with _host_slot(url):
+        if httpx is not None:
+            return await _get_http_client().post(
+                url,
+                json=json_body or {},
+                headers=headers or {},
+                timeout=httpx.Timeout(timeout, connect=HTTP_CONNECT_TIMEOUT),
+            )
+        return await asyncio.to_thread(
+            _get_requests_session().post,
+            url,
+            json=json_body or {},
+            headers=headers or {},
+            timeout=(HTTP_CONNECT_TIMEOUT, timeout),
+        )
 
 
 async def _backend_get(path: str, params: dict | None, username: str, password: str) -> dict | list:
-    r = await _http_get(
+    """GET from the backend through the shared response cache (results are shared read-only across sessions).
+    Identical misses already in flight are awaited instead of sent again."""
+    route = _route_of(path, BACKEND_CACHE_TTLS)
+    key = _ResponseCache.key(path, params)
+    cached = _backend_cache.get(key, route)
+    if cached is not None:
+        return cached
+
+    async def fetch():
+        data = await _backend_get_uncached(path, params, username, password)
+        _backend_cache.set(key, data, BACKEND_CACHE_TTLS.get(route, BACKEND_CACHE_DEFAULT_TTL))
+        return data
+
+    joined = _backend_flights.pending(key)
+    try:
+        return await _backend_flights.do(key, fetch)
+    except HTTPException as e:
+        if not joined or e.status_code != 401:
+            raise
+    # Another session's credentials were rejected; ours may still be valid.
+    return await fetch()
+
+
+async def _backend_get_uncached(path: str, params: dict | None, username: str, password: str) -> dict | list:
+    r = await _guarded(path, lambda: _http_get(
         f"{BACKEND_URL}{path}",
         params=params or {},
         headers=_auth_headers(username, password),
-        timeout=30.0,
-    )
+        timeout=_route_timeout(path, 30.0),
+    ))
     if r.status_code == 401:
         raise HTTPException(status_code=401, detail="Session expired; please log in again.")
     r.raise_for_status()
@@ -86,12 +416,12 @@ async def _backend_get(path: str, params: dict | None, username: str, password:
 
 
 async def _backend_post(path: str, json: dict, username: str, password: str) -> dict:
-    r = await _http_post(
+    r = await _guarded(path, lambda: _http_post(
         f"{BACKEND_URL}{path}",
         json_body=json,
         headers=_auth_headers(username, password),
-        timeout=60.0,
-    )
+        timeout=_route_timeout(path, 60.0),
+    ))
     if r.status_code == 401:
         raise HTTPException(status_code=401, detail="Session expired; please log in again.")
     r.raise_for_status()
@@ -140,6 +470,379 @@ def _parse_artist_list(msg: str) -> list[str] | None:
     return names
 
 
+async def _add_artist_discography(name: str, username: str, password: str) -> tuple[str, str]:
+    """Find the artist and add their best seeded torrent. Returns (outcome, artist name); outcome is added|no_torrent|not_found."""
+    data = await _backend_get("/api/artists", {"q": name, "source": "torrent"}, username, password)
+    artists = data.get("artists") or []
+    match = best_artist(name, artists)
+    if match is None:
+        return "not_found", name
+    artist_name = match[1].get("name", name)
+    tpb = await _backend_get("/api/search-tpb", {"q": artist_name}, username, password)
+    results = tpb.get("results") or []
+    torrents = [r for r in results if int(r.get("seeders") or 0) >= 1]
+    if not torrents:
+        return "no_torrent", artist_name
+    magnet = torrents[0].get("magnet")
+    if not magnet:
+        return "no_torrent", artist_name
+    await _backend_post("/api/add-torrent", {"magnet": magnet}, username, password)
+    return "added", artist_name
+
+
+async def _add_artist_list(
+    names: list[str],
+    username: str,
+    password: str,
+    concurrency: int = BULK_CONCURRENCY,
+    on_result=None,
+) -> list[tuple[str, str]]:
+    """Process names with at most `concurrency` in flight; results come back in input order."""
+    slots = asyncio.Semaphore(max(1, concurrency))
+
+    async def one(name: str) -> tuple[str, str]:
+        async with slots:
+            try:
+                result = await asyncio.wait_for(_add_artist_discography(name, username, password), BULK_ARTIST_TIMEOUT)
+            except asyncio.TimeoutError:
+                result = ("error", f"{name}: timed out")
+            except Exception as e:
+                result = ("error", f"{name}: {e}")
+        if on_result is not None:
+            on_result(result)
+        return result
+
+    return await asyncio.gather(*(one(n) for n in names))
+
+
+_OUTCOME_LABELS = {
+    "added": "Added **{}**",
+    "no_torrent": "No seeded torrent for {}",
+    "not_found": "Artist not found: {}",
+    "error": "Error: {}",
+}
+
+
+def _summarize_artist_list(results: list[tuple[str, str]]) -> list[str]:
+    added = [d for o, d in results if o == "added"]
+    no_torrent = [d for o, d in results if o == "no_torrent"]
+    not_found = [d for o, d in results if o == "not_found"]
+    errors = [d for o, d in results if o == "error"]
+    reply_parts = []
+    if added:
+        reply_parts.append(f"Added discography (or first available torrent) for **{len(added)}** artist(s): {', '.join(added)}.")
+    if no_torrent:
+        reply_parts.append(f"No seeded torrent found for: {', '.join(no_torrent)}.")
+    if not_found:
+        reply_parts.append(f"Artist not found: {', '.join(not_found)}.")
+    if errors:
+        reply_parts.append(f"Errors: {'; '.join(errors[:5])}{'…' if len(errors) > 5 else ''}.")
+    return reply_parts
+
+
+_bulk_tasks: set[asyncio.Task] = set()  # keep references so running jobs aren't garbage-collected
+
+
+async def _start_bulk_job(names: list[str], username: str, password: str) -> str:
+    """Run a long artist list as a background task. Job state lives in the session store, so
+    /api/jobs/{job_id} answers from any worker and after a restart."""
+    job_id = uuid.uuid4().hex[:12]
+    await _sessions.create_job({"id": job_id, "username": username, "status": "running", "total": len(names), "done": 0, "reply": ""})
+    increments: list[asyncio.Task] = []
+
+    def progress(_result: tuple[str, str]) -> None:
+        increments.append(asyncio.create_task(_sessions.job_progress(job_id)))
+
+    async def run() -> None:
+        try:
+            results = await _add_artist_list(names, username, password, on_result=progress)
+            reply = " ".join(_summarize_artist_list(results))
+        except Exception as e:
+            reply = f"Background job failed: {e}"
+        await asyncio.gather(*increments, return_exceptions=True)
+        await _sessions.finish_job(job_id, reply)
+
+    task = asyncio.create_task(run())
+    _bulk_tasks.add(task)
+    task.add_done_callback(_bulk_tasks.discard)
+    return job_id
+
+
+# --- Sessions ---
+# A session is { username, password, pending_torrents, pending_yt, pending_bulk, artist_name, album_title }.
+# It is stored packed: empty fields are dropped and pending torrents keep only what the confirm step reads.
+_SESSION_DEFAULTS = {"pending_torrents": [], "pending_yt": None, "pending_bulk": [], "artist_name": "", "album_title": ""}
+_TORRENT_FIELDS = ("name", "seeders", "size", "magnet")
+
+
+def _pack_session(session: dict) -> str:
+    packed = {"username": session["username"], "password": session["password"]}
+    for key, default in _SESSION_DEFAULTS.items():
+        value = session.get(key)
+        if value and value != default:
+            packed[key] = value
+    if packed.get("pending_torrents"):
+        packed["pending_torrents"] = [{k: t[k] for k in _TORRENT_FIELDS if k in t} for t in packed["pending_torrents"]]
+    return json.dumps(packed, separators=(",", ":"))
+
+
+def _unpack_session(data: str) -> dict:
+    session = json.loads(data)
+    for key, default in _SESSION_DEFAULTS.items():
+        session.setdefault(key, list(default) if isinstance(default, list) else default)
+    return session
+
+
+class _MemorySessionStore:
+    """Per-process store; fine for a single uvicorn worker."""
+
+    def __init__(self):
+        self._data: dict[str, list] = {}  # sid -> [created_at, last_seen, packed]
+        self._jobs: dict[str, dict] = {}  # job_id -> bulk job (see _start_bulk_job)
+
+    async def load(self, sid: str) -> dict | None:
+        entry = self._data.get(sid)
+        if entry is None:
+            return None
+        now = time.time()
+        if now - entry[0] > SESSION_MAX_AGE or now - entry[1] > SESSION_IDLE_TTL:
+            del self._data[sid]
+            return None
+        entry[1] = now
+        return _unpack_session(entry[2])
+
+    async def save(self, sid: str, session: dict) -> None:
+        now = time.time()
+        created = self._data[sid][0] if sid in self._data else now
+        self._data[sid] = [created, now, _pack_session(session)]
+
+    async def update(self, sid: str, session: dict) -> None:
+        entry = self._data.get(sid)
+        if entry is not None:
+            entry[1:] = [time.time(), _pack_session(session)]
+
+    async def delete(self, sid: str) -> None:
+        self._data.pop(sid, None)
+
+    async def purge(self) -> int:
+        now = time.time()
+        expired = [sid for sid, (created, seen, _) in self._data.items() if now - created > SESSION_MAX_AGE or now - seen > SESSION_IDLE_TTL]
+        for sid in expired:
+            del self._data[sid]
+        for job_id in [j for j, job in self._jobs.items() if now - job["updated_at"] > BULK_JOB_RETENTION]:
+            del self._jobs[job_id]
+        return len(expired)
+
+    async def create_job(self, job: dict) -> None:
+        self._jobs[job["id"]] = {**job, "updated_at": time.time()}
+
+    async def job_progress(self, job_id: str) -> None:
+        job = self._jobs.get(job_id)
+        if job is not None:
+            job["done"] += 1
+            job["updated_at"] = time.time()
+
+    async def finish_job(self, job_id: str, reply: str) -> None:
+        job = self._jobs.get(job_id)
+        if job is not None:
+            job.update(status="done", reply=reply, updated_at=time.time())
+
+    async def get_job(self, job_id: str) -> dict | None:
+        job = self._jobs.get(job_id)
+        return dict(job) if job is not None else None
+
+
+class _SqliteSessionStore:
+    """
+    Sessions and background-job state in a local SQLite file (WAL) so several uvicorn workers
+    share them. Session records carry Airsonic credentials, so they are Fernet-encrypted with a
+    server-side key and the file is created readable by the service user only.
+    """
+
+    def __init__(self, path: Path, key: bytes):
+        if Fernet is None:
+            raise RuntimeError("MUSIC_CHAT_SESSION_BACKEND=sqlite needs the 'cryptography' package (pip install -r requirements.txt)")
+        self.path = path
+        self._fernet = Fernet(key)
+        self._local = threading.local()
+        if not path.exists():
+            path.touch(mode=0o600)
+        with self._connect() as conn:
+            conn.execute(
+                """CREATE TABLE IF NOT EXISTS sessions (
+                sid TEXT PRIMARY KEY,
+                data TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                last_seen REAL NOT NULL
+            )"""
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS sessions_last_seen ON sessions (last_seen)")
+            conn.execute(
+                """CREATE TABLE IF NOT EXISTS bulk_jobs (
+                id TEXT PRIMARY KEY,
+                username TEXT NOT NULL,
+                status TEXT NOT NULL,
+                total INTEGER NOT NULL,
+                done INTEGER NOT NULL,
+                reply TEXT NOT NULL,
+                updated_at REAL NOT NULL
+            )"""
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _load(self, sid: str) -> dict | None:
+        now = time.time()
+        with self._connect() as conn:
+            row = conn.execute("SELECT data, created_at, last_seen FROM sessions WHERE sid = ?", (sid,)).fetchone()
+            if row is None:
+                return None
+            data, created, seen = row
+            if now - created > SESSION_MAX_AGE or now - seen > SESSION_IDLE_TTL:
+                conn.execute("DELETE FROM sessions WHERE sid = ?", (sid,))
+                return None
+            try:
+                packed = self._fernet.decrypt(data.encode()).decode()
+            except InvalidToken:
+                # Plaintext row from before encryption, or the key changed: log in again.
+                conn.execute("DELETE FROM sessions WHERE sid = ?", (sid,))
+                return None
+            if now - seen > SESSION_TOUCH_INTERVAL:
+                conn.execute("UPDATE sessions SET last_seen = ? WHERE sid = ?", (now, sid))
+        return _unpack_session(packed)
+
+    def _save(self, sid: str, packed: str) -> None:
+        now = time.time()
+        data = self._fernet.encrypt(packed.encode()).decode()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO sessions (sid, data, created_at, last_seen) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(sid) DO UPDATE SET data = excluded.data, last_seen = excluded.last_seen",
+                (sid, data, now, now),
+            )
+
+    def _update(self, sid: str, packed: str) -> None:
+        data = self._fernet.encrypt(packed.encode()).decode()
+        with self._connect() as conn:
+            conn.execute("UPDATE sessions SET data = ?, last_seen = ? WHERE sid = ?", (data, time.time(), sid))
+
+    def _delete(self, sid: str) -> None:
+        with self._connect() as conn:
+            conn.execute("DELETE FROM sessions WHERE sid = ?", (sid,))
+
+    def _purge(self) -> int:
+        now = time.time()
+        with self._connect() as conn:
+            cur = conn.execute(
+                "DELETE FROM sessions WHERE created_at < ? OR last_seen < ?",
+                (now - SESSION_MAX_AGE, now - SESSION_IDLE_TTL),
+            )
+            conn.execute("DELETE FROM bulk_jobs WHERE updated_at < ?", (now - BULK_JOB_RETENTION,))
+            return cur.rowcount
+
+    def _create_job(self, job: dict) -> None:
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO bulk_jobs (id, username, status, total, done, reply, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (job["id"], job["username"], job["status"], job["total"], job["done"], job["reply"], time.time()),
+            )
+
+    def _job_progress(self, job_id: str) -> None:
+        # An increment, so concurrent updates from to_thread land in any order.
+        with self._connect() as conn:
+            conn.execute("UPDATE bulk_jobs SET done = done + 1, updated_at = ? WHERE id = ?", (time.time(), job_id))
+
+    def _finish_job(self, job_id: str, reply: str) -> None:
+        with self._connect() as conn:
+            conn.execute("UPDATE bulk_jobs SET status = 'done', reply = ?, updated_at = ? WHERE id = ?", (reply, time.time(), job_id))
+
+    def _get_job(self, job_id: str) -> dict | None:
+        with self._connect() as conn:
+            row = conn.execute("SELECT id, username, status, total, done, reply, updated_at FROM bulk_jobs WHERE id = ?", (job_id,)).fetchone()
+        return dict(zip(("id", "username", "status", "total", "done", "reply", "updated_at"), row)) if row else None
+
+    async def load(self, sid: str) -> dict | None:
+        return await asyncio.to_thread(self._load, sid)
+
+    async def save(self, sid: str, session: dict) -> None:
+        await asyncio.to_thread(self._save, sid, _pack_session(session))
+
+    async def update(self, sid: str, session: dict) -> None:
+        """Rewrite an existing session only; one logged out (deleted) mid-turn stays deleted."""
+        await asyncio.to_thread(self._update, sid, _pack_session(session))
+
+    async def delete(self, sid: str) -> None:
+        await asyncio.to_thread(self._delete, sid)
+
+    async def purge(self) -> int:
+        return await asyncio.to_thread(self._purge)
+
+    async def create_job(self, job: dict) -> None:
+        await asyncio.to_thread(self._create_job, job)
+
+    async def job_progress(self, job_id: str) -> None:
+        await asyncio.to_thread(self._job_progress, job_id)
+
+    async def finish_job(self, job_id: str, reply: str) -> None:
+        await asyncio.to_thread(self._finish_job, job_id, reply)
+
+    async def get_job(self, job_id: str) -> dict | None:
+        return await asyncio.to_thread(self._get_job, job_id)
+
+
+def _session_key() -> bytes:
+    """MUSIC_CHAT_SESSION_KEY, else the key file, generated on first start. The new key is
+    linked into place so workers starting together all end up reading the same one."""
+    if SESSION_KEY:
+        return SESSION_KEY.encode()
+    try:
+        return SESSION_KEY_FILE.read_bytes().strip()
+    except FileNotFoundError:
+        pass
+    if Fernet is None:
+        return b""  # _SqliteSessionStore raises the real error
+    tmp = SESSION_KEY_FILE.with_name(f".{SESSION_KEY_FILE.name}.{os.getpid()}")
+    fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, "wb") as f:
+        f.write(Fernet.generate_key())
+    try:
+        os.link(tmp, SESSION_KEY_FILE)
+    except FileExistsError:
+        pass  # another worker won the race; use its key
+    finally:
+        tmp.unlink()
+    return SESSION_KEY_FILE.read_bytes().strip()
+
+
+if SESSION_BACKEND not in ("sqlite", "memory"):
+    raise RuntimeError(f"MUSIC_CHAT_SESSION_BACKEND must be 'sqlite' or 'memory', not {SESSION_BACKEND!r}")
+_sessions = None  # _MemorySessionStore | _SqliteSessionStore; opened in lifespan
+
+
+def _open_session_store() -> _MemorySessionStore | _SqliteSessionStore:
+    """The configured session store. The sqlite one creates sessions.db (and the key file) on first start."""
+    if SESSION_BACKEND == "memory":
+        return _MemorySessionStore()
+    return _SqliteSessionStore(SESSION_DB, _session_key())
+
+
+async def _sweep_sessions() -> None:
+    """Background task: evict idle and expired sessions."""
+    while True:
+        await asyncio.sleep(SESSION_SWEEP_INTERVAL)
+        try:
+            await _sessions.purge()
+        except Exception:
+            pass
+
+
 # --- Pydantic ---
 class LoginRequest(BaseModel):
     username: str
@@ -151,17 +854,29 @@ class ChatRequest(BaseModel):
 
 
 # --- App ---
-app = FastAPI(title="Music Requests Chat")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global _sessions
+    _sessions = _open_session_store()
+    sweeper = asyncio.create_task(_sweep_sessions())
+    yield
+    sweeper.cancel()
+    await _close_http_clients()
+
+
+app = FastAPI(title="Music Requests Chat", lifespan=lifespan)
+metrics.instrument(app)
 static_dir = Path(__file__).resolve().parent / "static"
 if static_dir.is_dir():
     app.mount("/static", StaticFiles(directory=str(static_dir)), name="static")
 
 
-def get_session(request: Request) -> tuple[str, dict]:
+async def get_session(request: Request) -> tuple[str, dict]:
     sid = request.cookies.get(SESSION_COOKIE)
-    if not sid or sid not in SESSION_STORE:
+    session = await _sessions.load(sid) if sid else None
+    if session is None:
         raise HTTPException(status_code=401, detail="Not logged in")
-    return sid, SESSION_STORE[sid]
+    return sid, session
 
 
 @app.get("/", response_class=HTMLResponse)
@@ -173,47 +888,127 @@ async def index():
 async def login(req: LoginRequest, response: Response):
     # Verify with backend (which pings Airsonic)
     try:
-        r = await _http_post(
+        r = await _guarded("/api/login", lambda: _http_post(
             f"{BACKEND_URL}/api/login",
             json_body={"username": req.username.strip(), "password": req.password},
-            timeout=15.0,
-        )
+            timeout=_route_timeout("/api/login", 15.0),
+        ))
     except Exception as e:
         raise HTTPException(status_code=502, detail=f"Could not reach music server: {e}")
     if r.status_code != 200:
         raise HTTPException(status_code=401, detail="Invalid Airsonic credentials")
     sid = uuid.uuid4().hex
-    SESSION_STORE[sid] = {
-        "username": req.username.strip(),
-        "password": req.password,
-        "pending_torrents": [],
-        "pending_yt": None,
-        "artist_name": "",
-        "album_title": "",
-    }
-    response.set_cookie(SESSION_COOKIE, sid, httponly=True, samesite="lax", max_age=7 * 24 * 3600)
+    await _sessions.save(sid, {"username": req.username.strip(), "password": req.password})
+    response.set_cookie(SESSION_COOKIE, sid, httponly=True, samesite="lax", max_age=SESSION_MAX_AGE)
     return {"ok": True, "username": req.username.strip()}
 
 
 @app.get("/api/me")
 async def me(request: Request):
     """Return current user if session valid."""
-    _, session = get_session(request)
+    _, session = await get_session(request)
     return {"username": session["username"]}
 
 
 @app.post("/api/logout")
 async def logout(response: Response, request: Request):
     sid = request.cookies.get(SESSION_COOKIE)
-    if sid and sid in SESSION_STORE:
-        del SESSION_STORE[sid]
+    if sid:
+        await _sessions.delete(sid)
     response.delete_cookie(SESSION_COOKIE)
     return {"ok": True}
 
 
+@app.get("/api/stats")
+async def stats(request: Request):
+    """Backend response-cache counters (requires login)."""
+    await get_session(request)
+    return {"backend_cache": _backend_cache.stats(), "backend_requests": _backend_flights.stats()}
+
+
+@app.get("/api/health")
+async def health():
+    """Liveness plus per-route circuit breaker state; "degraded" while any backend route is open."""
+    breakers = _breaker.stats()
+    degraded = any(b["state"] != "closed" for b in breakers.values())
+    return {"status": "degraded" if degraded else "ok", "breakers": breakers}
+
+
+@app.get("/api/jobs/{job_id}")
+async def job_status(job_id: str, request: Request):
+    """Progress of a background artist-list job started from chat."""
+    _, session = await get_session(request)
+    job = await _sessions.get_job(job_id)
+    if not job or job["username"] != session["username"]:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if job["status"] == "running" and time.time() - job["updated_at"] > BULK_JOB_STALL:
+        job["status"] = "failed"
+        job["reply"] = f"The job stopped after {job['done']} of {job['total']} artist(s) (the service restarted). Paste the remaining artists again."
+    return {k: job[k] for k in ("id", "status", "total", "done", "reply")}
+
+
 @app.post("/api/chat")
 async def chat(req: ChatRequest, request: Request):
-    _, session = get_session(request)
+    sid, session = await get_session(request)
+    before = _pack_session(session)
+    try:
+        return await _chat(req, session)
+    finally:
+        # Persist pending_* / artist context for the next turn (possibly on another worker).
+        if _pack_session(session) != before:
+            await _sessions.update(sid, session)
+
+
+@app.post("/api/chat/stream")
+async def chat_stream(req: ChatRequest, request: Request):
+    """
+    Same as /api/chat, but streams NDJSON events as the turn progresses:
+    {"type": "progress", "text": ...} per step or per artist, then one {"type": "reply", ...}
+    (the /api/chat payload) or {"type": "error", "status": ..., "detail": ...}.
+    """
+    sid, session = await get_session(request)
+    before = _pack_session(session)
+    events: asyncio.Queue = asyncio.Queue()
+
+    async def run() -> None:
+        try:
+            reply = await _chat(req, session, emit=lambda text: events.put_nowait({"type": "progress", "text": text}))
+            events.put_nowait({"type": "reply", **reply})
+        except HTTPException as e:
+            events.put_nowait({"type": "error", "status": e.status_code, "detail": e.detail})
+        except Exception as e:
+            events.put_nowait({"type": "error", "status": 500, "detail": str(e)})
+        finally:
+            if _pack_session(session) != before:
+                await _sessions.update(sid, session)
+            events.put_nowait(None)
+
+    async def body():
+        task = asyncio.create_task(run())
+        try:
+            while (event := await events.get()) is not None:
+                yield json.dumps(event) + "\n"
+        finally:
+            if not task.done():
+                task.cancel()
+
+    # X-Accel-Buffering: nginx would otherwise hold events until the response ends.
+    return StreamingResponse(body(), media_type="application/x-ndjson", headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+def _no_progress(_text: str) -> None:
+    pass
+
+
+def _set_pending(session: dict, key: str, value) -> None:
+    """Record what the reply just asked the user to confirm. Only the latest prompt can be
+    answered, so any earlier pending torrents / rip / background list are dropped."""
+    session.update(pending_torrents=[], pending_yt=None, pending_bulk=[])
+    session[key] = value
+
+
+async def _chat(req: ChatRequest, session: dict, emit=_no_progress) -> dict:
+    """One chat turn. emit(text) reports progress for the streaming endpoint."""
     username = session["username"]
     password = session["password"]
     msg = (req.message or "").strip()
@@ -231,39 +1026,65 @@ async def chat(req: ChatRequest, request: Request):
             t = pending_torrents[idx - 1]
             magnet = t.get("magnet")
             if magnet:
-                await _backend_post("/api/add-torrent", {"magnet": magnet}, username, password)
+                try:
+                    await _backend_post("/api/add-torrent", {"magnet": magnet}, username, password)
+                except HTTPException:
+                    raise  # backend session expired: the client must log in again
+                except Exception as e:
+                    return {"reply": f"Couldn't add that torrent: {e}. Reply **add {idx}** to try again.", "attachments": []}
                 session["pending_torrents"] = []
                 return {"reply": "I've added that torrent to the download queue. It may be a day or two before it appears in your music library.", "attachments": []}
     if pending_torrents and re.match(r"\b(yes|add it|add 1|first one)\b", msg_lower):
         t = pending_torrents[0]
         magnet = t.get("magnet")
         if magnet:
-            await _backend_post("/api/add-torrent", {"magnet": magnet}, username, password)
+            try:
+                await _backend_post("/api/add-torrent", {"magnet": magnet}, username, password)
+            except HTTPException:
+                raise  # backend session expired: the client must log in again
+            except Exception as e:
+                return {"reply": f"Couldn't add that torrent: {e}. Reply **add 1** to try again.", "attachments": []}
             session["pending_torrents"] = []
             return {"reply": "Added to the download queue. It may be a day or two before it appears in your library.", "attachments": []}
 
     # Reject / cancel
-    if re.match(r"\b(no|cancel|different)\b", msg_lower) and (pending_torrents or pending_yt):
+    if re.match(r"\b(no|cancel|different)\b", msg_lower) and (pending_torrents or pending_yt or session.get("pending_bulk")):
         session["pending_torrents"] = []
         session["pending_yt"] = None
+        session["pending_bulk"] = []
         return {"reply": "No problem. What would you like to add instead?", "attachments": []}
 
+    # Continue the rest of a long artist list as a background job
+    if session.get("pending_bulk") and re.match(r"\b(yes|background|continue|run in background|continue in background)\b", msg_lower):
+        names = session["pending_bulk"]
+        session["pending_bulk"] = []
+        job_id = await _start_bulk_job(names, username, password)
+        return {"reply": f"Started a background job for **{len(names)}** more artist(s) (job {job_id}). Check progress at /api/jobs/{job_id}. Note: it may be a day or two before your music appears on the server.", "attachments": [], "job_id": job_id}
+
     # Confirm YouTube rip
     if pending_yt and re.match(r"\b(rip|yes|rip it|from youtube)\b", msg_lower):
         url = pending_yt.get("url")
         artist = pending_yt.get("artist") or session.get("artist_name", "")
         album = pending_yt.get("album") or session.get("album_title", "")
         if url and artist and album:
-            result = await _backend_post(
-                "/api/rip-youtube",
-                {"url": url, "artist": artist, "album": album, "year": pending_yt.get("year")},
-                username,
-                password,
-            )
+            try:
+                result = await _backend_post(
+                    "/api/rip-youtube",
+                    {"url": url, "artist": artist, "album": album, "year": pending_yt.get("year")},
+                    username,
+                    password,
+                )
+            except HTTPException:
+                raise  # backend session expired: the client must log in again
+            except Exception as e:
+                return {"reply": f"Couldn't start the YouTube rip: {e}. Reply **rip** to try again.", "attachments": []}
             session["pending_yt"] = None
             job_id = result.get("job_id", "")
             return {"reply": f"I've started ripping from YouTube (job {job_id}). It may be a day or two before it appears in your library. You can check progress on the main Music Request page if needed.", "attachments": [], "job_id": job_id}
 
+    # Anything else is a new request: the offer to continue a long artist list lapses.
+    session["pending_bulk"] = []
+
     # Paste URL: playlist or archive
     if re.match(r"https?://", msg):
         url = msg.strip()
@@ -272,7 +1093,7 @@ async def chat(req: ChatRequest, request: Request):
                 preview = await _backend_get("/api/playlist-preview", {"url": url}, username, password)
                 artist = (preview.get("suggested_artist") or preview.get("artist") or "").strip()
                 album = (preview.get("suggested_album") or preview.get("album") or preview.get("title") or "").strip()
-                session["pending_yt"] = {"url": url, "artist": artist, "album": album}
+                _set_pending(session, "pending_yt", {"url": url, "artist": artist, "album": album})
                 return {"reply": f"I found a playlist/video. Suggested: **{artist}** – **{album}**. Reply **rip** to rip it as an album and add to your library.", "attachments": []}
             except Exception as e:
                 return {"reply": f"Could not load that URL: {e}", "attachments": []}
@@ -281,7 +1102,7 @@ async def chat(req: ChatRequest, request: Request):
                 preview = await _backend_get("/api/archive-preview", {"url": url}, username, password)
                 artist = (preview.get("suggested_artist") or preview.get("artist") or "").strip()
                 album = (preview.get("suggested_album") or preview.get("album") or preview.get("title") or "").strip()
-                session["pending_yt"] = {"url": url, "artist": artist, "album": album}
+                _set_pending(session, "pending_yt", {"url": url, "artist": artist, "album": album})
                 return {"reply": f"I found an archive.org item: **{artist}** – **{album}**. Reply **rip** to download and add to your library.", "attachments": []}
             except Exception as e:
                 return {"reply": f"Could not load that URL: {e}", "attachments": []}
@@ -289,46 +1110,22 @@ async def chat(req: ChatRequest, request: Request):
     # Pasted list of artist names: add discography (or best torrent) for each
     artist_list = _parse_artist_list(msg)
     if artist_list:
-        max_artists = 30
-        names = artist_list[:max_artists]
-        added: list[str] = []
-        not_found: list[str] = []
-        no_torrent: list[str] = []
-        errors: list[str] = []
-        for name in names:
-            name = name.strip()
-            if not name:
-                continue
-            try:
-                data = await _backend_get("/api/artists", {"q": name, "source": "torrent"}, username, password)
-                artists = data.get("artists") or []
-                if not artists:
-                    not_found.append(name)
-                    continue
-                artist_name = artists[0].get("name", name)
-                tpb = await _backend_get("/api/search-tpb", {"q": artist_name}, username, password)
-                results = tpb.get("results") or []
-                torrents = [r for r in results if int(r.get("seeders") or 0) >= 1]
-                if not torrents:
-                    no_torrent.append(artist_name)
-                    continue
-                magnet = torrents[0].get("magnet")
-                if magnet:
-                    await _backend_post("/api/add-torrent", {"magnet": magnet}, username, password)
-                    added.append(artist_name)
-            except Exception as e:
-                errors.append(f"{name}: {e}")
-        reply_parts = []
-        if added:
-            reply_parts.append(f"Added discography (or first available torrent) for **{len(added)}** artist(s): {', '.join(added)}.")
-        if no_torrent:
-            reply_parts.append(f"No seeded torrent found for: {', '.join(no_torrent)}.")
-        if not_found:
-            reply_parts.append(f"Artist not found: {', '.join(not_found)}.")
-        if errors:
-            reply_parts.append(f"Errors: {'; '.join(errors[:5])}{'…' if len(errors) > 5 else ''}.")
-        if len(artist_list) > max_artists:
-            reply_parts.append(f"(Processed first {max_artists} of {len(artist_list)} names.)")
+        names = [n.strip() for n in artist_list if n.strip()]
+        batch = names[:BULK_MAX_ARTISTS]
+        done = 0
+
+        def report(result: tuple[str, str]) -> None:
+            nonlocal done
+            done += 1
+            outcome, detail = result
+            emit(f"{done}/{len(batch)} " + _OUTCOME_LABELS[outcome].format(detail))
+
+        emit(f"Adding discographies for {len(batch)} artist(s)…")
+        results = await _add_artist_list(batch, username, password, on_result=report)
+        reply_parts = _summarize_artist_list(results)
+        if len(names) > BULK_MAX_ARTISTS:
+            _set_pending(session, "pending_bulk", names[BULK_MAX_ARTISTS:])
+            reply_parts.append(f"(Processed first {BULK_MAX_ARTISTS} of {len(names)} names. Reply **background** to add the remaining {len(names) - BULK_MAX_ARTISTS} as a background job.)")
         reply_parts.append("Note: it may be a day or two before your music appears on the server.")
         return {"reply": " ".join(reply_parts), "attachments": []}
 
@@ -344,7 +1141,6 @@ async def chat(req: ChatRequest, request: Request):
             return {"reply": str(e), "attachments": []}
         if not artists:
             return {"reply": f"No artists found for \"{q}\". Try a different search.", "attachments": []}
-        session["pending_artists"] = artists
         return {"reply": f"I found {len(artists)} artist(s). Say **add [album] by [artist]** with the exact artist name to request an album, or paste a list of artist names to add discography for each.", "attachments": [{"type": "artists", "artists": artists[:15]}]}
 
     # "Add [album] by [artist]" or "album X by Y"
@@ -360,39 +1156,63 @@ async def chat(req: ChatRequest, request: Request):
         return {"reply": str(e), "attachments": []}
     if not artists:
         return {"reply": f"I couldn't find an artist matching \"{artist}\". Try **Search artist {artist}** to see options.", "attachments": []}
-    # Pick first artist (or best match)
-    chosen = artists[0]
+    match = best_artist(artist, artists)
+    if match is None:
+        # Guessing here would start a torrent search for somebody else's album.
+        names = ", ".join(f"**{a.get('name', '')}**" for a in artists[:5])
+        return {
+            "reply": f"I couldn't find an artist closely matching \"{artist}\". Closest: {names}. Try the exact name, or **Search artist {artist}**.",
+            "attachments": [{"type": "artists", "artists": artists[:5]}],
+        }
+    chosen = match[1]
     artist_id = chosen.get("id", "")
     artist_name = chosen.get("name", artist)
     session["artist_name"] = artist_name
     session["album_title"] = album
+    emit(f"Found artist **{artist_name}**. Looking up **{album}** and searching torrents…")
 
-    # Get albums
-    try:
-        albums_data = await _backend_get(f"/api/albums/{artist_id}", None, username, password)
-        albums = albums_data.get("albums") or []
-    except Exception as e:
-        return {"reply": str(e), "attachments": []}
-    album_match = None
-    for a in albums:
-        if album.lower() in (a.get("title") or "").lower():
-            album_match = a
-            break
-    if not album_match and albums:
-        album_match = albums[0]
-
-    # Search TPB
+    # Albums and TPB are independent once the artist is known, so fetch them together.
+    # YouTube is started speculatively alongside and cancelled if TPB has seeded torrents.
     tpb_q = f"{artist_name} {album}"
+    albums_task = asyncio.create_task(_backend_get(f"/api/albums/{artist_id}", None, username, password))
+    tpb_task = asyncio.create_task(_backend_get("/api/search-tpb", {"q": tpb_q}, username, password))
+    yt_task = asyncio.create_task(
+        _backend_get("/api/search-youtube", {"q": tpb_q, "mode": "album", "artist": artist_name, "album": album}, username, password)
+    )
+    try:
+        return await _finish_album_request(session, chosen, artist_name, album, albums_task, tpb_task, yt_task, emit)
+    finally:
+        for task in (albums_task, tpb_task, yt_task):
+            if not task.done():
+                task.cancel()
+            elif not task.cancelled():
+                task.exception()  # mark as retrieved; unused failures are expected here
+
+
+async def _finish_album_request(
+    session: dict,
+    chosen: dict,
+    artist_name: str,
+    album: str,
+    albums_task: asyncio.Task,
+    tpb_task: asyncio.Task,
+    yt_task: asyncio.Task,
+    emit,
+) -> dict:
+    """Build the album reply from the concurrent albums / TPB / YouTube lookups started by _chat."""
     try:
-        tpb = await _backend_get("/api/search-tpb", {"q": tpb_q}, username, password)
+        albums_data, tpb = await asyncio.gather(albums_task, tpb_task)
+        albums = albums_data.get("albums") or []
         results = tpb.get("results") or []
     except Exception as e:
         return {"reply": str(e), "attachments": []}
+    found = best_album(chosen.get("id", ""), album, albums)
+    album_match = found[1] if found else None
 
     # Filter to reasonable torrents (at least 1 seeder)
     torrents = [r for r in results if int(r.get("seeders") or 0) >= 1][:10]
     if torrents:
-        session["pending_torrents"] = torrents
+        _set_pending(session, "pending_torrents", torrents)
         album_cover = (album_match or {}).get("image") if album_match else None
         lines = [f"{i+1}. {t['name'][:70]} — {t['seeders']} seeders, {int(t.get('size',0))/1024**3:.2f} GB" for i, t in enumerate(torrents[:5])]
         reply = f"I found **{artist_name}** – **{album}**"
@@ -400,20 +1220,24 @@ async def chat(req: ChatRequest, request: Request):
             reply += f". Reply **add 1** to add the first torrent, or **add 2**, **add 3**, etc."
         else:
             reply += f". Reply **add 1** (or **add 2**, **add 3**) to add one of these torrents:"
+        yt_task.cancel()
         return {"reply": reply, "attachments": [{"type": "torrents", "torrents": torrents[:5], "album_image": album_cover}, {"type": "artists", "artists": [chosen] }]}
 
-    # No torrents: offer YouTube
+    # No torrents: offer YouTube (the search has been running since TPB started)
+    if not yt_task.done():
+        emit("No seeded torrents found; searching YouTube…")
     try:
-        yt = await _backend_get("/api/search-youtube", {"q": tpb_q, "mode": "album", "artist": artist_name, "album": album}, username, password)
+        yt = await yt_task
         yt_results = yt.get("results") or []
     except Exception as e:
         return {"reply": f"No torrents found for **{album}** by **{artist_name}**. YouTube search failed: {e}", "attachments": []}
     if not yt_results:
         return {"reply": f"No torrents or YouTube results for **{album}** by **{artist_name}**. Try a different spelling or search.", "attachments": []}
     best = yt_results[0]
-    session["pending_yt"] = {"url": best.get("url") or best.get("id", ""), "artist": artist_name, "album": album}
-    if not session["pending_yt"]["url"].startswith("http"):
-        session["pending_yt"]["url"] = f"https://www.youtube.com/watch?v={best.get('id', '')}"
+    url = best.get("url") or best.get("id", "")
+    if not url.startswith("http"):
+        url = f"https://www.youtube.com/watch?v={best.get('id', '')}"
+    _set_pending(session, "pending_yt", {"url": url, "artist": artist_name, "album": album})
     reply = f"No torrents found for **{album}** by **{artist_name}**, but I can rip it from YouTube. Reply **rip** to start."
     return {"reply": reply, "attachments": [{"type": "artists", "artists": [chosen] }, {"type": "album_cover", "image": (album_match or {}).get("image") if album_match else None}]}
 
@@ -0,0 +1,190 @@
+"""
+Ranked fuzzy matching of artist and album names for music-requests-chat.
+
+Titles are normalized once (case, diacritics, punctuation, "&", edition/remaster tags) into
+token sets and scored with a token-set similarity, so "dark side of the moon" finds
+"The Dark Side of the Moon (2011 Remastered Version)" and "Beyonce" finds "Beyoncé".
+Words longer than four characters also match across one typo (insertion, deletion,
+substitution or swapped neighbours), so "radiohed" and "portshead" still resolve.
+A discography is indexed once per artist (inverted word, prefix and single-deletion indexes)
+and reused while the backend response is cached, so a query only touches releases that share a
+word, or a near miss of one, with it.
+"""
+from __future__ import annotations
+
+import heapq
+import re
+import unicodedata
+from collections import Counter, OrderedDict
+
+ARTIST_MIN_SCORE = 0.6  # below this the backend's artist results are treated as "no match"
+ALBUM_MIN_SCORE = 0.5
+
+# Bracketed or dash-suffixed qualifiers that name an edition of a release rather than the release.
+_EDITION_WORDS = (
+    r"remaster(?:ed)?|deluxe|expanded|anniversary|edition|bonus|reissue|version|mono|stereo|"
+    r"special|collector'?s|legacy|super|explicit|clean"
+)
+_BRACKETED_EDITION_RE = re.compile(r"[\(\[\{][^\)\]\}]*\b(?:" + _EDITION_WORDS + r")\b[^\)\]\}]*[\)\]\}]", re.I)
+_DASH_EDITION_RE = re.compile(r"\s[-–—:]\s[^-–—:]*\b(?:" + _EDITION_WORDS + r")\b.*$", re.I)
+_NON_WORD_RE = re.compile(r"[^\w\s]+")
+_STOPWORDS = frozenset({"the", "a", "an"})
+_PREFIX_LEN = 4  # unmatched tokens sharing this many leading characters count as half a match
+_TYPO_MIN_LEN = 5  # query words at least this long match a word one edit away...
+_TYPO_CREDIT = 0.9  # ...for this much of a match
+
+
+def normalize(title: str) -> str:
+    """Lowercase, strip diacritics and edition tags, turn punctuation into spaces."""
+    s = unicodedata.normalize("NFKD", title or "")
+    s = "".join(ch for ch in s if not unicodedata.combining(ch))
+    s = _BRACKETED_EDITION_RE.sub(" ", s)
+    s = _DASH_EDITION_RE.sub(" ", s)
+    s = s.casefold().replace("&", " and ").replace("'", "")
+    s = _NON_WORD_RE.sub(" ", s).replace("_", " ")
+    return " ".join(s.split())
+
+
+def tokens(title: str) -> frozenset[str]:
+    """Token set of a normalized title; articles are dropped unless that leaves nothing."""
+    words = normalize(title).split()
+    kept = frozenset(w for w in words if w not in _STOPWORDS)
+    return kept or frozenset(words)
+
+
+def _prefixes(toks: frozenset[str]) -> frozenset[str]:
+    return frozenset(t[:_PREFIX_LEN] for t in toks if len(t) >= _PREFIX_LEN)
+
+
+def _deletions(word: str) -> set[str]:
+    """word and every string one deleted character away (symmetric-delete candidates)."""
+    return {word} | {word[:i] + word[i + 1:] for i in range(len(word))}
+
+
+def _one_edit(a: str, b: str) -> bool:
+    """True if a and b differ by at most one insertion, deletion, substitution or adjacent swap."""
+    if abs(len(a) - len(b)) > 1:
+        return False
+    if len(a) == len(b):
+        diff = [i for i in range(len(a)) if a[i] != b[i]]
+        if len(diff) <= 1:
+            return True
+        i, j = diff[0], diff[-1]
+        return len(diff) == 2 and j == i + 1 and a[i] == b[j] and a[j] == b[i]
+    if len(a) > len(b):
+        a, b = b, a
+    i = 0
+    while i < len(a) and a[i] == b[i]:
+        i += 1
+    return a[i:] == b[i + 1:]
+
+
+def _score(n_query: int, n_candidate: int, matched: float) -> float:
+    """Token-set similarity in [0, 1): mostly how much of the query is covered, plus overlap (Dice)
+    so extra words in the candidate cost a little. Identical token sets are scored 1 by the caller."""
+    coverage = matched / n_query
+    dice = 2 * matched / (n_query + n_candidate)
+    return min(0.99, 0.6 * coverage + 0.4 * dice)
+
+
+class TitleIndex:
+    """Precomputed token sets plus inverted word and word-prefix indexes over a list of backend items."""
+
+    def __init__(self, items: list[dict], key: str):
+        self.items = items
+        self._tokens = [tokens(it.get(key) or "") for it in items]
+        self._sizes = [len(toks) for toks in self._tokens]
+        prefixes = [_prefixes(toks) for toks in self._tokens]
+        self._postings: dict[str, list[int]] = {}
+        self._prefix_postings: dict[str, list[int]] = {}
+        self._deletion_postings: dict[str, list[tuple[int, str]]] = {}  # deletion variant -> (item, word)
+        for i, toks in enumerate(self._tokens):
+            for t in toks:
+                self._postings.setdefault(t, []).append(i)
+                if len(t) >= _TYPO_MIN_LEN - 1:
+                    for variant in _deletions(t):
+                        self._deletion_postings.setdefault(variant, []).append((i, t))
+            for pre in prefixes[i]:
+                self._prefix_postings.setdefault(pre, []).append(i)
+
+    def _typo_hits(self, word: str) -> set[int]:
+        """Items with a word exactly one edit away from word."""
+        hits = set()
+        for variant in _deletions(word):
+            for i, t in self._deletion_postings.get(variant, ()):
+                if t != word and _one_edit(word, t):
+                    hits.add(i)
+        return hits
+
+    def rank(self, query: str, limit: int = 5) -> list[tuple[float, dict]]:
+        """Best matches first as (score, item); ties keep the backend's order."""
+        q_tokens = tokens(query)
+        if not q_tokens:
+            return []
+        n_query = len(q_tokens)
+        # Per item and query word, the best of: the whole word (1), a word one typo away
+        # (_TYPO_CREDIT, long words only) or a shared prefix ("animal" / "animals", 0.5).
+        common: Counter[int] = Counter()
+        fuzzy: Counter[int] = Counter()
+        for w in q_tokens:
+            exact = self._postings.get(w, ())
+            common.update(exact)
+            if len(w) < _PREFIX_LEN:
+                continue
+            seen = set(exact)
+            if len(w) >= _TYPO_MIN_LEN:
+                typo = self._typo_hits(w) - seen
+                for i in typo:
+                    fuzzy[i] += _TYPO_CREDIT
+                seen |= typo
+            for i in set(self._prefix_postings.get(w[:_PREFIX_LEN], ())) - seen:
+                fuzzy[i] += 0.5
+        sizes = self._sizes
+        get_common, get_fuzzy = common.get, fuzzy.get
+        scored = []
+        for i in common.keys() | fuzzy.keys():
+            n_common = get_common(i, 0)
+            if n_common == n_query and sizes[i] == n_query:
+                scored.append((-1.0, i))
+                continue
+            matched = n_common + get_fuzzy(i, 0)
+            if matched:
+                scored.append((-_score(n_query, sizes[i], matched), i))
+        return [(-neg, self.items[i]) for neg, i in heapq.nsmallest(limit, scored)]
+
+    def best(self, query: str, min_score: float) -> tuple[float, dict] | None:
+        ranked = self.rank(query, limit=1)
+        if ranked and ranked[0][0] >= min_score:
+            return ranked[0]
+        return None
+
+
+class _IndexCache:
+    """LRU of TitleIndex per key, rebuilt when the backing list object changes
+    (the backend response cache hands out the same list until its entry expires)."""
+
+    def __init__(self, maxsize: int = 256):
+        self.maxsize = maxsize
+        self._data: OrderedDict[str, TitleIndex] = OrderedDict()
+
+    def get(self, key: str, items: list[dict], field: str) -> TitleIndex:
+        index = self._data.get(key)
+        if index is None or index.items is not items:
+            index = self._data[key] = TitleIndex(items, field)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+        return index
+
+
+_album_indexes = _IndexCache()
+
+
+def best_artist(query: str, artists: list[dict]) -> tuple[float, dict] | None:
+    """Closest artist to the user's text, or None if nothing scores ARTIST_MIN_SCORE."""
+    return TitleIndex(artists, "name").best(query, ARTIST_MIN_SCORE)
+
+
+def best_album(artist_id: str, query: str, albums: list[dict]) -> tuple[float, dict] | None:
+    """Closest release in an artist's discography, using that artist's cached index."""
+    return _album_indexes.get(str(artist_id), albums, "title").best(query, ALBUM_MIN_SCORE)
@@ -1,5 +1,11 @@
 #!/usr/bin/env bash
 cd "$(dirname "$0")"
+# Shared modules (metrics.py) live in the repo root.
+export PYTHONPATH="$(cd .. && pwd)${PYTHONPATH:+:$PYTHONPATH}"
 export MUSIC_REQUESTS_BACKEND_URL="${MUSIC_REQUESTS_BACKEND_URL:-http://127.0.0.1:8001}"
 export PORT="${PORT:-8003}"
-exec .venv/bin/uvicorn main:app --host 127.0.0.1 --port "$PORT"
+if [ "${MUSIC_CHAT_SESSION_BACKEND:-sqlite}" = "memory" ] && [ "${WORKERS:-1}" -gt 1 ]; then
+  echo "WORKERS>1 needs MUSIC_CHAT_SESSION_BACKEND=sqlite (memory sessions and jobs are per worker)" >&2
+  exit 1
+fi
+exec .venv/bin/uvicorn main:app --host 127.0.0.1 --port "$PORT" --workers "${WORKERS:-1}"
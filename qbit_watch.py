@@ -0,0 +1,165 @@
+"""
+Follow qBittorrent torrents until they finish, using the incremental sync/maindata endpoint.
+
+torrents_info() returns every torrent in the client on each call; sync/maindata with the rid
+from the previous response returns only the fields that changed since then, so one request
+covers any number of watched hashes and is tiny when nothing moved. The poll interval adapts:
+it shrinks toward the smallest ETA as downloads near completion and backs off while nothing
+changes or the WebUI is unreachable.
+
+    from qbit_watch import TorrentWatcher
+    watcher = TorrentWatcher(client, [info_hash], on_progress=lambda h, t: print(h, t["progress"], t["eta"]))
+    outcome = watcher.run(timeout=24 * 3600)  # {hash: "complete" | "error" | "removed" | "timeout"}
+
+Callbacks receive (hash, torrent) where torrent is the merged dict of sync fields (name,
+progress, eta, state, dlspeed, amount_left, ...). Hashes are lowercase hex.
+"""
+from __future__ import annotations
+
+import time
+from collections.abc import Callable, Iterable
+
+import qbittorrentapi
+
+# States in which the download part is finished (qBittorrent 4.x and 5.x names).
+COMPLETE_STATES = frozenset({"uploading", "stalledUP", "pausedUP", "stoppedUP", "queuedUP", "forcedUP", "checkingUP"})
+ERROR_STATES = frozenset({"error", "missingFiles"})
+# qBittorrent reports this ETA (100 days) when it has no estimate.
+ETA_UNKNOWN = 8640000
+
+Callback = Callable[[str, dict], None]
+
+
+class TorrentWatcher:
+    """Watch a set of torrent hashes via sync/maindata and fire callbacks as they change.
+
+    on_progress fires when a torrent's whole-percent progress, state or ETA (by at least a
+    minute and 10%) changes; on_complete when it finishes downloading; on_error when it enters
+    an error state or is removed from the client. Finished, errored and removed torrents stop
+    being watched."""
+
+    def __init__(
+        self,
+        client: qbittorrentapi.Client,
+        hashes: Iterable[str] = (),
+        on_progress: Callback | None = None,
+        on_complete: Callback | None = None,
+        on_error: Callback | None = None,
+        min_interval: float = 2.0,
+        max_interval: float = 60.0,
+    ):
+        self.client = client
+        self.on_progress = on_progress
+        self.on_complete = on_complete
+        self.on_error = on_error
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.interval = min_interval
+        self.outcomes: dict[str, str] = {}
+        self.torrents: dict[str, dict] = {}  # watched hash -> merged sync fields
+        self._watched: set[str] = set()
+        self._reported: dict[str, tuple] = {}  # hash -> (percent, state, eta) last passed to on_progress
+        self._rid = 0
+        for h in hashes:
+            self.add(h)
+
+    @property
+    def pending(self) -> set[str]:
+        """Hashes still being watched."""
+        return set(self._watched)
+
+    def add(self, info_hash: str) -> None:
+        h = info_hash.lower()
+        self._watched.add(h)
+        self.outcomes.pop(h, None)
+        if h not in self.torrents:
+            # Incremental updates only carry changed fields; start over to get this torrent in full.
+            self._rid = 0
+
+    def discard(self, info_hash: str) -> None:
+        h = info_hash.lower()
+        self._watched.discard(h)
+        self.torrents.pop(h, None)
+        self._reported.pop(h, None)
+
+    def poll(self) -> bool:
+        """Fetch one sync/maindata update and dispatch callbacks. Returns True if any watched torrent changed."""
+        data = self.client.sync_maindata(rid=self._rid)
+        self._rid = data.get("rid", 0)
+        full = bool(data.get("full_update"))
+        previous = set(self.torrents)
+        if full:
+            self.torrents = {}
+        changed: set[str] = set()
+        for h, fields in (data.get("torrents") or {}).items():
+            h = h.lower()
+            if h in self._watched:
+                self.torrents.setdefault(h, {}).update(fields)
+                changed.add(h)
+        removed = {h.lower() for h in data.get("torrents_removed") or ()}
+        if full:
+            # A full update lists every torrent: a watched one seen before but missing now is gone.
+            removed |= previous - set(self.torrents)
+        for h in removed & self._watched:
+            self._finish(h, "removed", self.on_error, {**self.torrents.get(h, {}), "state": "removed"})
+        for h in changed & self._watched:
+            self._dispatch(h, self.torrents[h])
+        return bool(changed or removed)
+
+    def _dispatch(self, h: str, t: dict) -> None:
+        state = t.get("state", "")
+        if state in ERROR_STATES:
+            self._finish(h, "error", self.on_error, t)
+            return
+        if t.get("progress", 0) >= 1.0 or state in COMPLETE_STATES:
+            self._finish(h, "complete", self.on_complete, t)
+            return
+        percent, eta = int(t.get("progress", 0) * 100), t.get("eta", ETA_UNKNOWN)
+        last = self._reported.get(h)
+        if last is not None and last[0] == percent and last[1] == state and abs(eta - last[2]) < max(60, 0.1 * last[2]):
+            return
+        self._reported[h] = (percent, state, eta)
+        if self.on_progress:
+            self.on_progress(h, t)
+
+    def _finish(self, h: str, outcome: str, callback: Callback | None, t: dict) -> None:
+        self.outcomes[h] = outcome
+        self._watched.discard(h)
+        self._reported.pop(h, None)
+        if callback:
+            callback(h, t)
+
+    def next_interval(self, changed: bool) -> float:
+        """Poll again around a quarter of the smallest ETA; back off while nothing changes."""
+        etas = [t.get("eta", ETA_UNKNOWN) for h, t in self.torrents.items() if h in self._watched]
+        etas = [eta for eta in etas if 0 <= eta < ETA_UNKNOWN]
+        if changed and etas:
+            interval = min(etas) / 4
+        else:
+            interval = self.interval * 2
+        self.interval = max(self.min_interval, min(self.max_interval, interval))
+        return self.interval
+
+    def run(self, timeout: float | None = None, sleep: Callable[[float], None] = time.sleep) -> dict[str, str]:
+        """Poll until every watched hash completes, errors or is removed, or timeout seconds pass.
+        Returns {hash: outcome} for every hash added; unfinished ones are "timeout"."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self._watched:
+            try:
+                changed = self.poll()
+            except qbittorrentapi.APIError:
+                # Connection refused, 5xx, session expiry the client could not recover from: retry later.
+                self._rid = 0
+                changed = False
+            if not self._watched:
+                break
+            delay = self.next_interval(changed)
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                delay = min(delay, remaining)
+            sleep(delay)
+        for h in self._watched:
+            self.outcomes[h] = "timeout"
+        return dict(self.outcomes)
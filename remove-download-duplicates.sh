@@ -10,13 +10,16 @@ DRY_RUN=""
 [[ "$1" == "--dry-run" ]] && { DRY_RUN=1; LIST="${2:-/tmp/download_duplicate_paths.txt}"; }
 [[ ! -f "$LIST" ]] && { echo "List file not found: $LIST"; exit 1; }
 
+SCRIPT_DIR="$(cd "$(dirname "$0")" && pwd)"
 MOVIES_DIR="${MOVIES_DIR:-/mnt/media-storage/movies}"
 TV_DIR="${TV_DIR:-/mnt/media-storage/tvshows}"
+INVENTORY_PYTHON="${INVENTORY_PYTHON:-python3}"
 
-# Build set of (size basename) that exist in movies or tvshows (one-time scan)
+# Build set of (size basename) that exist in movies or tvshows from the shared media inventory
+# (refreshed incrementally: only directories changed since the last run are re-listed)
 LIBRARY_KEYS=$(mktemp)
 trap 'rm -f "$LIBRARY_KEYS"' EXIT
-find "$MOVIES_DIR" "$TV_DIR" -type f \( -iname "*.mkv" -o -iname "*.mp4" -o -iname "*.avi" -o -iname "*.m4v" \) -printf "%s %f\n" 2>/dev/null | sort -u > "$LIBRARY_KEYS"
+"$INVENTORY_PYTHON" "$SCRIPT_DIR/media_inventory.py" keys --refresh "$MOVIES_DIR" "$TV_DIR" > "$LIBRARY_KEYS"
 echo "Library keys loaded ($(wc -l < "$LIBRARY_KEYS") entries)." >&2
 
 # Path looks like part of a music torrent (album, FLAC, Discography, etc.) -> skip (leave music alone)
@@ -76,6 +79,12 @@ while read -r size path; do
         continue
     fi
 
+    # The list may be older than the file (e.g. a download still being written): re-check the size
+    if [[ "$(stat -c%s "$path" 2>/dev/null)" != "$size" ]]; then
+        ((skipped_not_library++)) || true
+        continue
+    fi
+
     ((count++)) || true
     total_bytes=$((total_bytes + size))
     if [[ -n "$DRY_RUN" ]]; then
@@ -14,9 +14,13 @@ Usage:
   ./replace-movie-with-smaller.py              # run full flow (pick, search, download, replace)
   ./replace-movie-with-smaller.py --dry-run    # only print what would be done
   ./replace-movie-with-smaller.py --add-only   # add torrent and exit (no wait/replace)
+  ./replace-movie-with-smaller.py --batch 10   # queue replacements for the 10 largest movies, print projected savings
 
 Env: MEDIA_BASE, MOVIES_DIR, DOWNLOADS_DIR, MIN_SIZE_GB, MIN_SIZE_SAVINGS_GB, MIN_SEEDERS,
-QBIT_HOST, QBIT_USER, QBIT_PASS, REPLACE_MOVIE_QBIT_CATEGORY (default radarr).
+QBIT_HOST, QBIT_USER, QBIT_PASS, REPLACE_MOVIE_QBIT_CATEGORY (default radarr),
+MEDIA_INVENTORY_DB (shared media inventory, see media_inventory.py), MEDIA_STACK_CLAIMS_DB
+(claims shared with compress-media-nightly, see media_claims.py), BATCH_CLAIM_HOURS,
+APIBAY_CONCURRENCY and APIBAY_MAX_RPS (batch searches in flight / per second).
 For Radarr with Docker qBittorrent: save path defaults to /downloads so Radarr finds the completed
 download. Override with QBIT_SAVE_PATH_REPLACEMENT if needed (e.g. /downloads).
 """
@@ -26,13 +30,21 @@ import argparse
 import os
 import re
 import shutil
+import sqlite3
 import sys
+import threading
 import time
 import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 import requests
 
+from media_claims import ClaimRegistry
+from media_inventory import Inventory
+from media_scan import VIDEO_EXTENSIONS, largest_files
+from qbit_watch import ETA_UNKNOWN, TorrentWatcher
+
 try:
     import qbittorrentapi
 except ImportError:
@@ -54,6 +66,9 @@ PREFER_SEEDERS = int(os.environ.get("PREFER_SEEDERS", "5"))
 PREFER_MAX_SIZE_GB = float(os.environ.get("PREFER_MAX_SIZE_GB", "5"))
 APIBAY_BASE = "https://apibay.org"
 APIBAY_CAT_MOVIES = 207  # Video > HD - Movies
+# --batch searches Apibay for all candidates concurrently; every search (and fallback) is rate limited.
+APIBAY_CONCURRENCY = int(os.environ.get("APIBAY_CONCURRENCY", "4"))
+APIBAY_MAX_RPS = float(os.environ.get("APIBAY_MAX_RPS", "2"))
 QBIT_HOST = os.environ.get("QBIT_HOST", "localhost:5080")
 QBIT_USER = os.environ.get("QBIT_USER", "admin")
 QBIT_PASS = os.environ.get("QBIT_PASS", "admin123")
@@ -61,15 +76,15 @@ QBIT_PASS = os.environ.get("QBIT_PASS", "admin123")
 QBIT_SAVE_PATH_REPLACEMENT = os.environ.get("QBIT_SAVE_PATH_REPLACEMENT", "")
 # Category for new torrents. Use "radarr" so Radarr imports and moves to /mnt/media-storage/movies.
 CATEGORY = os.environ.get("REPLACE_MOVIE_QBIT_CATEGORY", "radarr")
-VIDEO_EXTENSIONS = {".mkv", ".mp4", ".avi", ".m4v", ".mov"}
 POLL_INTERVAL = 60
 POLL_TIMEOUT_HOURS = 24
-# Shared with compress-media-nightly: paths in this file are "in use" and must not be picked by the other script.
-CLAIMED_FILE = Path(os.environ.get("MEDIA_STACK_CLAIMED_FILE", "/var/run/media-stack-claimed.txt"))
+# Shared with compress-media-nightly (media_claims.py): claimed paths are "in use" and must not be picked by the other script.
+CLAIM_OWNER = "replace-movie-with-smaller"
+# --batch claims outlive this process (Radarr imports later), so they are leases without a PID.
+BATCH_CLAIM_HOURS = float(os.environ.get("BATCH_CLAIM_HOURS", "48"))
 # Replace skips if compress is running (same lock as compress-media-nightly).
 COMPRESS_LOCK_FILE = os.environ.get("COMPRESS_LOCK_FILE", "/var/run/compress-media-nightly.lock")
-SESSION = requests.Session()
-SESSION.headers["User-Agent"] = "ReplaceMovieWithSmaller/1.0"
+USER_AGENT = "ReplaceMovieWithSmaller/1.0"
 
 
 def log(msg: str) -> None:
@@ -77,35 +92,36 @@ def log(msg: str) -> None:
 
 
 def read_claimed_paths() -> set[str]:
-    """Return set of paths currently claimed by compress or replace (one path per line)."""
-    if not CLAIMED_FILE.exists():
-        return set()
+    """Return set of paths currently claimed by compress or replace (dead claims are reaped)."""
     try:
-        lines = CLAIMED_FILE.read_text().strip().splitlines()
-        return {p.strip() for p in lines if p.strip()}
-    except OSError:
+        with ClaimRegistry() as claims:
+            return claims.claimed()
+    except (OSError, sqlite3.Error) as e:
+        log(f"Warning: could not read claims: {e}")
         return set()
 
 
-def add_claimed_path(path: Path) -> None:
-    """Append path to the shared claim file so compress-nightly won't pick it."""
+def add_claimed_path(path: Path, detached: bool = False) -> bool:
+    """Claim path so compress-nightly won't pick it. The claim lasts while this process runs
+    (up to the completion timeout), or BATCH_CLAIM_HOURS if detached. False if another job holds
+    it or the claim registry can't be written: without a claim compress-nightly could pick the file."""
     try:
-        with open(CLAIMED_FILE, "a") as f:
-            f.write(str(path.resolve()) + "\n")
-    except OSError as e:
-        log(f"Warning: could not add to claim file: {e}")
+        with ClaimRegistry() as claims:
+            if detached:
+                return claims.claim(path, CLAIM_OWNER, ttl=BATCH_CLAIM_HOURS * 3600)
+            return claims.claim(path, CLAIM_OWNER, ttl=(POLL_TIMEOUT_HOURS + 1) * 3600, pid=os.getpid())
+    except (OSError, sqlite3.Error) as e:
+        log(f"Error: could not claim {path}: {e}; skipping it.")
+        return False
 
 
 def remove_claimed_path(path: Path) -> None:
-    """Remove path from the shared claim file."""
-    if not CLAIMED_FILE.exists():
-        return
+    """Release the claim on path."""
     try:
-        target = str(path.resolve())
-        lines = [p for p in CLAIMED_FILE.read_text().splitlines() if p.strip() != target]
-        CLAIMED_FILE.write_text("\n".join(lines) + ("\n" if lines else ""))
-    except OSError as e:
-        log(f"Warning: could not remove from claim file: {e}")
+        with ClaimRegistry() as claims:
+            claims.release(path)
+    except (OSError, sqlite3.Error) as e:
+        log(f"Warning: could not release claim on {path}: {e}")
 
 
 def compress_lock_held() -> bool:
@@ -120,33 +136,24 @@ def compress_lock_held() -> bool:
         return True
 
 
-def find_largest_movie(min_gb: float, exclude_paths: set[str] | None = None) -> tuple[int, Path] | None:
-    """Return (size_bytes, path) for the largest movie file >= min_gb, or None. Excludes paths in exclude_paths."""
-    min_bytes = int(min_gb * 1024**3)
-    excluded = exclude_paths or set()
+def find_largest_movies(min_gb: float, n: int, exclude_paths: set[str] | None = None) -> list[tuple[int, Path]]:
+    """Return up to n (size_bytes, path) pairs for the largest movie files >= min_gb, largest first.
+    Excludes paths in exclude_paths."""
     if not MOVIES_DIR.is_dir():
         log(f"Movies dir not found: {MOVIES_DIR}")
-        return None
-    best_size = 0
-    best_path: Path | None = None
-    for ext in VIDEO_EXTENSIONS:
-        for f in MOVIES_DIR.rglob(f"*{ext}"):
-            if not f.is_file():
-                continue
-            if ".compress-backup" in f.parts or ".compress-temp" in f.parts:
-                continue
-            if str(f.resolve()) in excluded:
-                continue
-            try:
-                size = f.stat().st_size
-            except OSError:
-                continue
-            if size >= min_bytes and size > best_size:
-                best_size = size
-                best_path = f
-    if best_path is None:
-        return None
-    return (best_size, best_path)
+        return []
+    # Shared inventory: only movie directories whose mtime changed since the last run are re-listed.
+    # The root is resolved so paths compare directly with the (resolved) claimed paths.
+    root = MOVIES_DIR.resolve()
+    with Inventory() as inv:
+        inv.refresh([root])
+        return inv.largest(n, [root], min_size=int(min_gb * 1024**3), exclude=exclude_paths or set())
+
+
+def find_largest_movie(min_gb: float, exclude_paths: set[str] | None = None) -> tuple[int, Path] | None:
+    """Return (size_bytes, path) for the largest movie file >= min_gb, or None. Excludes paths in exclude_paths."""
+    top = find_largest_movies(min_gb, 1, exclude_paths)
+    return top[0] if top else None
 
 
 def parse_movie_query(movie_path: Path) -> str:
@@ -159,10 +166,42 @@ def parse_movie_query(movie_path: Path) -> str:
     return parent.replace(".", " ").strip()
 
 
+class _RateLimiter:
+    """Spaces calls at least 1/rate seconds apart across threads (rate <= 0: no limit)."""
+
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self._lock = threading.Lock()
+        self._next = 0.0
+
+    def wait(self) -> None:
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next)
+            self._next = start + self.interval
+        if start > now:
+            time.sleep(start - now)
+
+
+_apibay_limit = _RateLimiter(APIBAY_MAX_RPS)
+# requests.Session is not thread-safe (cookie jar, connection pool), so each --batch search worker keeps its own.
+_local = threading.local()
+
+
+def http_session() -> requests.Session:
+    """Return this thread's pooled requests session, creating it on first use."""
+    session = getattr(_local, "session", None)
+    if session is None:
+        session = _local.session = requests.Session()
+        session.headers["User-Agent"] = USER_AGENT
+    return session
+
+
 def search_apibay(query: str, cat: int = APIBAY_CAT_MOVIES) -> list[dict]:
     """Search Apibay for torrents. Returns list of dicts with id, name, info_hash, size, seeders, leechers."""
+    _apibay_limit.wait()
     try:
-        r = SESSION.get(
+        r = http_session().get(
             f"{APIBAY_BASE}/q.php",
             params={"q": query, "cat": cat},
             timeout=15,
@@ -181,6 +220,16 @@ def search_apibay(query: str, cat: int = APIBAY_CAT_MOVIES) -> list[dict]:
     ]
 
 
+def search_with_fallback(query: str) -> list[dict]:
+    """search_apibay, retried without a trailing year ('Heat 1995' -> 'Heat') when nothing is found."""
+    torrents = search_apibay(query)
+    if not torrents and re.search(r"\s\d{4}$", query.strip()):
+        fallback_query = re.sub(r"\s+\d{4}$", "", query.strip())
+        log(f"No results for '{query}'; trying without year: {fallback_query}")
+        torrents = search_apibay(fallback_query)
+    return torrents
+
+
 def build_magnet(info_hash: str, name: str) -> str:
     info_hash = (info_hash or "").strip().upper()
     if len(info_hash) != 40 or not re.match(r"^[0-9A-Fa-f]+$", info_hash):
@@ -253,6 +302,21 @@ def get_qbit_client() -> qbittorrentapi.Client:
     return client
 
 
+def replacement_add_options() -> dict:
+    """Keyword arguments for torrents_add: category, save path (see QBIT_SAVE_PATH_REPLACEMENT) and queue position."""
+    if QBIT_SAVE_PATH_REPLACEMENT.strip():
+        save_path = QBIT_SAVE_PATH_REPLACEMENT.strip()
+    elif CATEGORY == "radarr":
+        save_path = "/downloads"
+    else:
+        save_path = str(DOWNLOADS_DIR / REPLACEMENT_SUBDIR)
+        Path(save_path).mkdir(parents=True, exist_ok=True)
+    options = {"category": CATEGORY, "add_to_top_of_queue": True}
+    if save_path:
+        options["save_path"] = save_path
+    return options
+
+
 def to_host_path(p: str) -> Path:
     """Map qBittorrent container path to host path (downloads)."""
     s = str(p or "")
@@ -267,20 +331,8 @@ def find_main_video(content_path: Path) -> Path | None:
     """Return the largest video file under content_path (file or directory)."""
     if content_path.is_file() and content_path.suffix.lower() in VIDEO_EXTENSIONS:
         return content_path
-    best: Path | None = None
-    best_size = 0
-    for ext in VIDEO_EXTENSIONS:
-        for f in content_path.rglob(f"*{ext}"):
-            if not f.is_file():
-                continue
-            try:
-                size = f.stat().st_size
-            except OSError:
-                continue
-            if size > best_size:
-                best_size = size
-                best = f
-    return best
+    top = largest_files(content_path, 1)
+    return top[0][1] if top else None
 
 
 def wait_for_completion(
@@ -288,18 +340,21 @@ def wait_for_completion(
     info_hash: str,
     poll_interval: int = POLL_INTERVAL,
     timeout_hours: float = POLL_TIMEOUT_HOURS,
-) -> bool:
-    """Poll until torrent is 100% complete or timeout. Returns True if completed."""
-    deadline = time.monotonic() + timeout_hours * 3600
-    while time.monotonic() < deadline:
-        for t in client.torrents_info():
-            if (t.hash or "").upper() == (info_hash or "").upper():
-                if t.progress >= 1.0:
-                    return True
-                log(f"  Progress {t.progress * 100:.0f}%")
-                break
-        time.sleep(poll_interval)
-    return False
+) -> str:
+    """Follow the torrent via incremental sync/maindata until 100% complete, errored or timeout.
+    Polls at most every poll_interval seconds, sooner as the ETA gets short. Returns the outcome:
+    "complete", "timeout", "error" (error/missingFiles state) or "removed" (deleted from qBittorrent)."""
+
+    def progress(_hash: str, t: dict) -> None:
+        eta = t.get("eta", ETA_UNKNOWN)
+        eta_text = "" if eta >= ETA_UNKNOWN else f", ETA {eta // 60} min" if eta >= 60 else ", ETA <1 min"
+        log(f"  Progress {t.get('progress', 0) * 100:.0f}% ({t.get('state', '?')}{eta_text})")
+
+    def failed(_hash: str, t: dict) -> None:
+        log(f"  Torrent {t.get('state', 'failed')}: {t.get('name', info_hash)}")
+
+    watcher = TorrentWatcher(client, [info_hash], on_progress=progress, on_error=failed, max_interval=poll_interval)
+    return watcher.run(timeout=timeout_hours * 3600).get(info_hash.lower(), "timeout")
 
 
 def verify_video(path: Path) -> bool:
@@ -320,23 +375,242 @@ def verify_video(path: Path) -> bool:
         return False
 
 
+def run_batch(count: int, min_size_gb: float, dry_run: bool) -> int:
+    """Queue replacements for the count largest unclaimed movies: one library query, concurrent
+    rate-limited Apibay searches, one qBittorrent login and a single add. Added paths stay claimed."""
+    candidates = find_largest_movies(min_size_gb, count, exclude_paths=read_claimed_paths())
+    if not candidates:
+        log(f"No movie >= {min_size_gb} GB found in {MOVIES_DIR}")
+        return 0
+    log(f"Searching Apibay for {len(candidates)} movie(s) ({APIBAY_CONCURRENCY} at a time, max {APIBAY_MAX_RPS:g}/s)")
+    with ThreadPoolExecutor(max_workers=max(1, APIBAY_CONCURRENCY)) as pool:
+        results = list(pool.map(lambda c: search_with_fallback(parse_movie_query(c[1])), candidates))
+
+    # One row per candidate: [size, path, chosen torrent or None, magnet, status]
+    rows = []
+    for (size, path), torrents in zip(candidates, results):
+        chosen = pick_smaller_torrent(torrents, size) if torrents else None
+        magnet = build_magnet(chosen.get("info_hash", ""), chosen.get("name", "")) if chosen else ""
+        if not torrents:
+            status = "no results"
+        elif not chosen:
+            status = "no smaller release"
+        elif not magnet:
+            status = "invalid info_hash"
+        else:
+            status = "would add" if dry_run else "queued"
+        rows.append([size, path, chosen if magnet else None, magnet, status])
+
+    for row in rows:
+        if row[4] == "queued" and not add_claimed_path(row[1], detached=True):
+            row[4] = "claimed elsewhere"
+    queued = [row for row in rows if row[4] == "queued"]
+    if queued:
+        try:
+            client = get_qbit_client()
+            options = replacement_add_options()
+            client.torrents_add(urls=[row[3] for row in queued], **options)
+            log(f"Added {len(queued)} torrent(s) to qBittorrent (category={CATEGORY}, save_path={options.get('save_path') or 'default'})")
+            status = "added"
+        except Exception as e:
+            log(f"qBittorrent add failed: {e}")
+            for row in queued:
+                remove_claimed_path(row[1])
+            status = "add failed"
+        for row in queued:
+            row[4] = status
+
+    print_batch_summary(rows)
+    return 0
+
+
+def print_batch_summary(rows: list[list]) -> None:
+    """Print one line per candidate (current size, replacement size, projected savings) and the total."""
+    gb = 1024**3
+    print(f"{'Movie':<44} {'Current':>9} {'New':>9} {'Saves':>9} {'Seeds':>6}  Status")
+    saved = 0
+    for size, path, chosen, _magnet, status in rows:
+        movie = path.parent.name if path.parent != MOVIES_DIR.resolve() else path.stem
+        if len(movie) > 44:
+            movie = movie[:41] + "..."
+        if chosen:
+            new_size = int(chosen.get("size") or 0)
+            if status in ("added", "would add"):
+                saved += size - new_size
+            print(
+                f"{movie:<44} {size / gb:>6.1f} GB {new_size / gb:>6.1f} GB {(size - new_size) / gb:>6.1f} GB "
+                f"{int(chosen.get('seeders') or 0):>6}  {status}"
+            )
+        else:
+            print(f"{movie:<44} {size / gb:>6.1f} GB {'-':>9} {'-':>9} {'-':>6}  {status}")
+    n = sum(1 for row in rows if row[4] in ("added", "would add"))
+    print(f"Projected savings: {saved / gb:.1f} GB across {n} movie(s)")
+
+
+def replace_one(dry_run: bool, add_only: bool, min_size_gb: float, movie_path_arg: str, remove_torrent_after: bool) -> int:
+    """Replace the largest unclaimed movie (or movie_path_arg): search, add, wait, then import or move."""
+    claimed = read_claimed_paths()
+
+    # 1. Pick largest movie (or use --movie-path)
+    if movie_path_arg:
+        movie_path = Path(movie_path_arg).resolve()
+        if not movie_path.is_file():
+            log(f"File not found: {movie_path}")
+            return 0
+        if str(movie_path) in claimed:
+            log("Requested movie path is claimed by another run; skipping.")
+            return 0
+        current_size = movie_path.stat().st_size
+        if current_size < int(min_size_gb * 1024**3):
+            log(f"File smaller than --min-size-gb ({min_size_gb} GB); use a larger file or lower --min-size-gb")
+            return 0
+        result = (current_size, movie_path)
+    else:
+        result = find_largest_movie(min_size_gb, exclude_paths=claimed)
+    if not result:
+        log(f"No movie >= {min_size_gb} GB found in {MOVIES_DIR}")
+        return 0
+    current_size, movie_path = result
+    size_gb = current_size / (1024**3)
+    log(f"Largest movie: {movie_path} ({size_gb:.1f} GB)")
+
+    query = parse_movie_query(movie_path)
+    log(f"Search query: {query}")
+
+    # 2. Search Apibay (fallback: try without year if no results)
+    torrents = search_with_fallback(query)
+    if not torrents:
+        log("No Apibay results.")
+        return 0
+    log(f"Found {len(torrents)} torrent(s)")
+
+    chosen = pick_smaller_torrent(torrents, current_size)
+    if not chosen:
+        log("No smaller, well-seeded movie release found.")
+        return 0
+
+    name = chosen.get("name", "Unknown")
+    size_bytes = int(chosen.get("size") or 0)
+    seeders = int(chosen.get("seeders") or 0)
+    info_hash = (chosen.get("info_hash") or "").strip().upper()
+    log(f"Chosen: {name} ({size_bytes / (1024**3):.2f} GB, {seeders} seeders)")
+
+    if dry_run:
+        log("Dry run: would delete old file first, then add torrent, wait for completion, then Radarr imports.")
+        if remove_torrent_after:
+            log("Dry run: would remove torrent from qBittorrent after replacement.")
+        return 0
+
+    if not add_claimed_path(movie_path):
+        log("Movie could not be claimed (another run holds it, or see the error above); skipping.")
+        return 0
+    try:
+        magnet = build_magnet(info_hash, name)
+        if not magnet:
+            log("Invalid info_hash; cannot build magnet.")
+            return 0
+
+        # Delete old library file first to free space before downloading (avoids disk overflow).
+        if not add_only:
+            log(f"Deleting old library file to free space before download: {movie_path}")
+            movie_path.unlink(missing_ok=True)
+            log(f"Freed {size_gb:.1f} GB.")
+
+        # Add to qBittorrent (category "radarr" so Radarr will import to movies when done)
+        try:
+            client = get_qbit_client()
+            options = replacement_add_options()
+            client.torrents_add(urls=magnet, **options)
+            log(f"Added torrent to qBittorrent (category={CATEGORY}, save_path={options.get('save_path') or 'default'})")
+        except Exception as e:
+            log(f"qBittorrent add failed: {e}")
+            return 0
+
+        if add_only:
+            log("Add-only: exiting.")
+            return 0
+
+        # Wait for completion
+        log("Waiting for download to complete (polling)...")
+        outcome = wait_for_completion(client, info_hash)
+        if outcome == "timeout":
+            log(f"Timeout after {POLL_TIMEOUT_HOURS:g} h waiting for completion; the torrent stays in qBittorrent. Exiting; you can move the file manually when done.")
+            return 0
+        if outcome != "complete":
+            if outcome == "error":
+                # error/missingFiles is often a storage problem (full disk, unmounted share) that a
+                # recheck recovers from, so keep the torrent and its data for the operator to inspect.
+                log("Download failed (torrent in an error state); pausing it in qBittorrent and keeping its files.")
+                log("Fix the cause (disk space, mount), then force a recheck and resume it, or delete it from qBittorrent.")
+                try:
+                    client.torrents_pause(torrent_hashes=[info_hash.lower()])
+                except Exception as e:
+                    log(f"Warning: could not pause torrent in qBittorrent: {e}")
+            else:
+                log("Torrent was removed from qBittorrent before it finished; nothing to import.")
+            log(f"The old library file was already deleted; re-request {movie_path.name} (e.g. search for it in Radarr).")
+            return 0
+
+        if CATEGORY == "radarr":
+            log("Done. Radarr will import the new file to /mnt/media-storage/movies.")
+            return 0
+
+        # 5. Locate new file (non-Radarr)
+        found = client.torrents_info(torrent_hashes=info_hash.lower())
+        torrent = found[0] if found else None
+        if not torrent:
+            log("Torrent not found after completion.")
+            return 0
+        content_path = to_host_path(torrent.content_path) if torrent.content_path else None
+        if not content_path or not content_path.exists():
+            save_path_host = to_host_path(torrent.save_path) if torrent.save_path else (DOWNLOADS_DIR / REPLACEMENT_SUBDIR)
+            content_path = (Path(save_path_host) / torrent.name).resolve()
+        if not content_path.exists():
+            log(f"Content path not found: {content_path}")
+            return 0
+
+        new_file = find_main_video(content_path)
+        if not new_file or not new_file.is_file():
+            log("No video file found in downloaded content.")
+            return 0
+
+        if not verify_video(new_file):
+            log("New file failed ffprobe verification; aborting replace.")
+            return 0
+
+        old_file = movie_path
+        dest_file = old_file.parent / (old_file.stem + new_file.suffix)
+        if dest_file.resolve() == new_file.resolve():
+            log("New file already at destination.")
+        else:
+            if dest_file.exists():
+                dest_file.unlink()
+            log(f"Moving {new_file} -> {dest_file}")
+            shutil.move(str(new_file), str(dest_file))
+            log(f"Removing old file: {old_file}")
+            old_file.unlink(missing_ok=True)
+            log("Replacement done.")
+
+        if remove_torrent_after:
+            try:
+                client.torrents_delete(delete_files=True, torrent_hashes=[torrent.hash])
+                log("Removed torrent from qBittorrent (and deleted its data).")
+            except Exception as e:
+                log(f"Warning: could not remove torrent from qBittorrent: {e}")
+        return 0
+    finally:
+        remove_claimed_path(movie_path)
+
+
 def main() -> int:
     parser = argparse.ArgumentParser(description="Replace a large movie with a smaller TPB release.")
     parser.add_argument("--dry-run", action="store_true", help="Only print what would be done")
     parser.add_argument("--add-only", action="store_true", help="Add torrent and exit (do not wait or replace)")
     parser.add_argument("--min-size-gb", type=float, default=MIN_SIZE_GB, help=f"Min movie size in GB (default {MIN_SIZE_GB})")
-    parser.add_argument("--movie-path", type=str, default="", help="Use this movie file instead of scanning for largest (skips slow scan)")
+    parser.add_argument("--movie-path", type=str, default="", help="Use this movie file instead of picking the largest")
     parser.add_argument("--remove-torrent-after", action="store_true", help="Remove the torrent (and its data) from qBittorrent after successful replacement")
-    parser.add_argument("--batch", type=int, default=0, metavar="N", help="Add torrents for N next-biggest movies (implies --add-only); paths stay claimed")
+    parser.add_argument("--batch", type=int, default=0, metavar="N", help="Add torrents for the N largest movies in one pass (implies --add-only) and print projected savings; paths stay claimed for BATCH_CLAIM_HOURS")
     args = parser.parse_args()
-    dry_run = args.dry_run
-    add_only = args.add_only
-    min_size_gb = args.min_size_gb
-    movie_path_arg = (args.movie_path or "").strip()
-    remove_torrent_after = args.remove_torrent_after
-    batch_count = max(0, args.batch)
-    if batch_count > 0:
-        add_only = True
 
     log("=== replace-movie-with-smaller ===")
 
@@ -345,167 +619,9 @@ def main() -> int:
         log("compress-media-nightly is running (lock held); exiting to avoid collision.")
         return 0
 
-    batch_mode = batch_count > 0
-    added = 0
-    for _ in range(batch_count) if batch_mode else [0]:
-        claimed = read_claimed_paths()
-
-        # 1. Pick largest movie (or use --movie-path; only when not in batch)
-        if movie_path_arg and not batch_mode:
-            movie_path = Path(movie_path_arg).resolve()
-            if not movie_path.is_file():
-                log(f"File not found: {movie_path}")
-                break
-            if str(movie_path) in claimed:
-                log("Requested movie path is claimed by another run; skipping.")
-                break
-            current_size = movie_path.stat().st_size
-            if current_size < int(min_size_gb * 1024**3):
-                log(f"File smaller than --min-size-gb ({min_size_gb} GB); use a larger file or lower --min-size-gb")
-                break
-            result = (current_size, movie_path)
-        else:
-            result = find_largest_movie(min_size_gb, exclude_paths=claimed)
-        if not result:
-            log(f"No movie >= {min_size_gb} GB found in {MOVIES_DIR}")
-            break
-        current_size, movie_path = result
-        size_gb = current_size / (1024**3)
-        log(f"Largest movie: {movie_path} ({size_gb:.1f} GB)")
-
-        query = parse_movie_query(movie_path)
-        log(f"Search query: {query}")
-
-        # 2. Search Apibay (fallback: try without year if no results)
-        torrents = search_apibay(query)
-        if not torrents and re.search(r"\s\d{4}$", query.strip()):
-            fallback_query = re.sub(r"\s+\d{4}$", "", query.strip())
-            log(f"No results; trying without year: {fallback_query}")
-            torrents = search_apibay(fallback_query)
-        if not torrents:
-            log("No Apibay results.")
-            break
-        log(f"Found {len(torrents)} torrent(s)")
-
-        chosen = pick_smaller_torrent(torrents, current_size)
-        if not chosen:
-            log("No smaller, well-seeded movie release found.")
-            break
-
-        name = chosen.get("name", "Unknown")
-        size_bytes = int(chosen.get("size") or 0)
-        seeders = int(chosen.get("seeders") or 0)
-        info_hash = (chosen.get("info_hash") or "").strip().upper()
-        log(f"Chosen: {name} ({size_bytes / (1024**3):.2f} GB, {seeders} seeders)")
-
-        if dry_run:
-            log("Dry run: would delete old file first, then add torrent, wait for completion, then Radarr imports.")
-            if remove_torrent_after:
-                log("Dry run: would remove torrent from qBittorrent after replacement.")
-            break
-
-        add_claimed_path(movie_path)
-        try:
-            magnet = build_magnet(info_hash, name)
-            if not magnet:
-                log("Invalid info_hash; cannot build magnet.")
-                break
-
-            # Delete old library file first to free space before downloading (avoids disk overflow).
-            if not add_only:
-                log(f"Deleting old library file to free space before download: {movie_path}")
-                movie_path.unlink(missing_ok=True)
-                log(f"Freed {size_gb:.1f} GB.")
-
-            # Add to qBittorrent (category "radarr" so Radarr will import to movies when done)
-            if QBIT_SAVE_PATH_REPLACEMENT.strip():
-                save_path_for_add = QBIT_SAVE_PATH_REPLACEMENT.strip()
-            elif CATEGORY == "radarr":
-                save_path_for_add = "/downloads"
-            else:
-                save_path_for_add = str(DOWNLOADS_DIR / REPLACEMENT_SUBDIR)
-                Path(save_path_for_add).mkdir(parents=True, exist_ok=True)
-            add_kw = {"urls": magnet, "category": CATEGORY, "add_to_top_of_queue": True}
-            if save_path_for_add:
-                add_kw["save_path"] = save_path_for_add
-            try:
-                client = get_qbit_client()
-                client.torrents_add(**add_kw)
-                log(f"Added torrent to qBittorrent (category={CATEGORY}, save_path={save_path_for_add or 'default'})")
-            except Exception as e:
-                log(f"qBittorrent add failed: {e}")
-                break
-            added += 1
-
-            if add_only:
-                log("Add-only: exiting." if not batch_mode else "Queued for replacement.")
-                if batch_mode:
-                    continue
-                break
-
-            # Wait for completion
-            log("Waiting for download to complete (polling)...")
-            if not wait_for_completion(client, info_hash):
-                log("Timeout waiting for completion. Exiting; you can move the file manually when done.")
-                break
-
-            if CATEGORY == "radarr":
-                log("Done. Radarr will import the new file to /mnt/media-storage/movies.")
-                break
-
-            # 5. Locate new file (non-Radarr)
-            torrent = None
-            for t in client.torrents_info():
-                if (t.hash or "").upper() == info_hash:
-                    torrent = t
-                    break
-            if not torrent:
-                log("Torrent not found after completion.")
-                break
-            content_path = to_host_path(torrent.content_path) if torrent.content_path else None
-            if not content_path or not content_path.exists():
-                save_path_host = to_host_path(torrent.save_path) if torrent.save_path else (DOWNLOADS_DIR / REPLACEMENT_SUBDIR)
-                content_path = (Path(save_path_host) / torrent.name).resolve()
-            if not content_path.exists():
-                log(f"Content path not found: {content_path}")
-                break
-
-            new_file = find_main_video(content_path)
-            if not new_file or not new_file.is_file():
-                log("No video file found in downloaded content.")
-                break
-
-            if not verify_video(new_file):
-                log("New file failed ffprobe verification; aborting replace.")
-                break
-
-            old_file = movie_path
-            dest_file = old_file.parent / (old_file.stem + new_file.suffix)
-            if dest_file.resolve() == new_file.resolve():
-                log("New file already at destination.")
-            else:
-                if dest_file.exists():
-                    dest_file.unlink()
-                log(f"Moving {new_file} -> {dest_file}")
-                shutil.move(str(new_file), str(dest_file))
-                log(f"Removing old file: {old_file}")
-                old_file.unlink(missing_ok=True)
-                log("Replacement done.")
-
-            if remove_torrent_after:
-                try:
-                    client.torrents_delete(delete_files=True, torrent_hashes=[torrent.hash])
-                    log("Removed torrent from qBittorrent (and deleted its data).")
-                except Exception as e:
-                    log(f"Warning: could not remove torrent from qBittorrent: {e}")
-            break
-        finally:
-            if not batch_mode:
-                remove_claimed_path(movie_path)
-
-    if batch_mode:
-        log(f"Added {added} torrent(s) for replacement.")
-    return 0
+    if args.batch > 0:
+        return run_batch(args.batch, args.min_size_gb, args.dry_run)
+    return replace_one(args.dry_run, args.add_only, args.min_size_gb, (args.movie_path or "").strip(), args.remove_torrent_after)
 
 
 if __name__ == "__main__":